@@ -21,4 +21,7 @@ urlpatterns = [
     path('generate-roadmap/', views.generate_career_roadmap, name='generate_career_roadmap'),
     path('analyze-resume/', views.analyze_resume, name='analyze_resume'),
     path('career-quiz/', views.career_quiz_recommendation, name='career_quiz_recommendation'),
+    
+    # LLM operations
+    path('llm/stats/', views.llm_stats, name='llm_stats'),
 ] 
\ No newline at end of file
@@ -3,27 +3,182 @@ from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
+from django.http import StreamingHttpResponse
 from django.conf import settings
 from django.utils import timezone
 from django.db import models
-import openai
+import contextvars
 import json
 import logging
+import textwrap
 import time
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Iterator
+from core.llm import get_gateway, get_response_cache, PromptTemplate, fit_messages_to_budget, record_fallback
+from core.llm.prompts import normalize_whitespace
+from core.llm.resilience import breaker_states
+from core.llm.routing import tier_stats
 from .models import ChatConversation, ChatMessage, AIInsight, UserAIPreferences
 
 logger = logging.getLogger(__name__)
 
+# Static prefixes first so every call shares a cacheable prompt prefix
+CHAT_TEMPLATE = PromptTemplate(
+    'chat',
+    """
+    You are CareerForge AI, an expert career counselor and mentor with deep knowledge of:
+    - Career development and planning
+    - Job market trends and opportunities
+    - Resume optimization and interview preparation
+    - Skill development and learning paths
+    - Salary negotiation and career advancement
+    - Industry insights and networking strategies
+    """,
+    """
+    Guidelines:
+    1. Always provide actionable, practical advice
+    2. Be encouraging and supportive
+    3. Ask clarifying questions when needed
+    4. Reference current industry trends when relevant
+    5. Suggest specific resources, tools, or next steps
+    6. Be honest about challenges while remaining optimistic
+    7. Personalize advice based on the user's profile below
+    8. If you don't know something, admit it and suggest how to find the answer
+
+    Remember: You're helping someone build their career and achieve their professional goals.
+    """
+)
+
+DAILY_INSIGHT_TEMPLATE = PromptTemplate(
+    'daily_insight',
+    "You are a career expert generating personalized daily insights. Be practical and actionable.",
+    "Generate a personalized daily career insight for the user described in the next message.",
+    """
+    Create a helpful, actionable insight in JSON format:
+    {
+        "insight_type": "career_advice|skill_recommendation|job_market_trend|learning_path|resume_tip|interview_prep|networking_tip|salary_insight",
+        "title": "Brief, engaging title",
+        "content": "Detailed, actionable content (2-3 paragraphs)",
+        "priority": "low|medium|high",
+        "is_actionable": true,
+        "confidence": 0.85
+    }
+
+    Focus on something timely, relevant, and actionable for their career stage and goals.
+    """
+)
+
+CAREER_ROADMAP_TEMPLATE = PromptTemplate(
+    'career_roadmap',
+    "You are an expert career counselor and learning path designer. Create detailed, practical roadmaps that help people achieve their career goals.",
+    "Create a detailed career roadmap for the goal, timeframe and background in the next message.",
+    """
+    Please provide a structured roadmap in JSON format with the following structure:
+    {
+        "title": "Career Roadmap Title",
+        "goal": "The goal as given",
+        "timeframe": "The timeframe as given",
+        "difficulty": "beginner|intermediate|advanced",
+        "phases": [
+            {
+                "phase_number": 1,
+                "title": "Foundation Phase",
+                "duration": "2 months",
+                "description": "Build core fundamentals",
+                "skills": ["skill1", "skill2", "skill3"],
+                "projects": [
+                    {
+                        "name": "Project Name",
+                        "description": "Brief description",
+                        "estimated_hours": 20
+                    }
+                ],
+                "resources": [
+                    {
+                        "name": "Resource Name",
+                        "type": "course|book|tutorial|certification",
+                        "url": "optional",
+                        "description": "Why this resource"
+                    }
+                ]
+            }
+        ],
+        "milestones": [
+            {
+                "title": "Milestone Name",
+                "description": "What you'll achieve",
+                "target_month": 2
+            }
+        ],
+        "estimated_total_hours": 200,
+        "success_metrics": ["metric1", "metric2"],
+        "next_steps": "What to do after completing this roadmap"
+    }
+
+    Make it specific, actionable, and tailored to their background. Include real resources and practical projects.
+    """
+)
+
+ASSISTANT_RESUME_ANALYSIS_TEMPLATE = PromptTemplate(
+    'assistant_resume_analysis',
+    "You are an expert resume reviewer and career counselor. Provide detailed, actionable feedback to help people improve their resumes.",
+    "Analyze the resume in the next message for the target role given there and provide specific improvement suggestions.",
+    """
+    Provide analysis in JSON format:
+    {
+        "overall_score": 75,
+        "strengths": ["strength1", "strength2"],
+        "weaknesses": ["weakness1", "weakness2"],
+        "suggestions": [
+            {
+                "category": "formatting|content|keywords|achievements",
+                "priority": "high|medium|low",
+                "suggestion": "Specific improvement suggestion",
+                "example": "Example of how to implement this"
+            }
+        ],
+        "missing_keywords": ["keyword1", "keyword2"],
+        "recommended_sections": ["section1", "section2"],
+        "ats_score": 80,
+        "next_steps": "What to focus on first"
+    }
+    """
+)
+
+CAREER_QUIZ_TEMPLATE = PromptTemplate(
+    'career_quiz',
+    "You are a career counselor specializing in tech careers. Provide personalized, realistic recommendations.",
+    "Based on the career quiz answers and user profile in the next message, suggest 3-5 suitable tech career paths.",
+    """
+    Provide recommendations in JSON format:
+    {
+        "recommendations": [
+            {
+                "title": "Career Title",
+                "match_percentage": 85,
+                "difficulty": "beginner|intermediate|advanced",
+                "description": "Brief description of the role",
+                "key_skills": ["skill1", "skill2", "skill3"],
+                "salary_range": "$50k - $80k",
+                "growth_potential": "high|medium|low",
+                "why_good_fit": "Explanation of why this matches their profile"
+            }
+        ],
+        "next_steps": "What they should do next",
+        "learning_priority": "What to focus on first"
+    }
+    """
+)
+
+
 class CareerAIAssistant:
     """AI-powered career assistant using OpenAI GPT-4"""
     
     def __init__(self):
         try:
-            self.client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
+            self.llm = get_gateway()
         except Exception as e:
-            logger.warning(f"Failed to initialize OpenAI client: {str(e)}. Using fallback responses.")
-            self.client = None
+            logger.warning(f"Failed to initialize LLM gateway: {str(e)}. Using fallback responses.")
+            self.llm = None
     
     def get_system_prompt(self, user_profile: Dict[str, Any], preferences: Dict[str, Any]) -> str:
         """Generate system prompt based on user profile and preferences"""
@@ -43,15 +198,14 @@ class CareerAIAssistant:
             'detailed': "Give comprehensive, thorough responses with examples and explanations."
         }
         
-        return f"""
-        You are CareerForge AI, an expert career counselor and mentor with deep knowledge of:
-        - Career development and planning
-        - Job market trends and opportunities
-        - Resume optimization and interview preparation
-        - Skill development and learning paths
-        - Salary negotiation and career advancement
-        - Industry insights and networking strategies
-
+        # The static instructions come first and are identical for every user, so the
+        # provider can reuse its cached prefix; style and profile vary per user
+        style = textwrap.dedent(f"""
+        Communication Style:
+        - Tone: {tone_instructions.get(tone, tone_instructions['friendly'])}
+        - Detail Level: {detail_instructions.get(detail_level, detail_instructions['moderate'])}
+        """).strip()
+        profile = textwrap.dedent(f"""
         User Profile:
         - Skills: {user_profile.get('skills', [])}
         - Experience Level: {user_profile.get('experience_level', 'entry')}
@@ -60,23 +214,8 @@ class CareerAIAssistant:
         - Target Role: {user_profile.get('target_role', '')}
         - Current Role: {user_profile.get('current_role', '')}
         - Goals: {user_profile.get('goals', '')}
-
-        Communication Style:
-        - Tone: {tone_instructions.get(tone, tone_instructions['friendly'])}
-        - Detail Level: {detail_instructions.get(detail_level, detail_instructions['moderate'])}
-
-        Guidelines:
-        1. Always provide actionable, practical advice
-        2. Be encouraging and supportive
-        3. Ask clarifying questions when needed
-        4. Reference current industry trends when relevant
-        5. Suggest specific resources, tools, or next steps
-        6. Be honest about challenges while remaining optimistic
-        7. Personalize advice based on the user's profile
-        8. If you don't know something, admit it and suggest how to find the answer
-
-        Remember: You're helping someone build their career and achieve their professional goals.
-        """
+        """).strip()
+        return f"{CHAT_TEMPLATE.system}\n\n{style}\n\n{profile}"
     
     def generate_response(self, user_message: str, conversation_history: List[Dict], user_profile: Dict[str, Any], preferences: Dict[str, Any]) -> Dict[str, Any]:
         """Generate AI response to user message"""
@@ -84,7 +223,7 @@ class CareerAIAssistant:
             start_time = time.time()
             
             # Check if OpenAI API key is available or client failed to initialize
-            if not settings.OPENAI_API_KEY or settings.OPENAI_API_KEY == 'your-openai-api-key-here' or self.client is None:
+            if not settings.OPENAI_API_KEY or settings.OPENAI_API_KEY == 'your-openai-api-key-here' or self.llm is None:
                 # Fallback to intelligent mock responses
                 mock_responses = {
                     'hello': "Hello! I'm excited to help you with your career journey. What specific area would you like to focus on today?",
@@ -116,49 +255,30 @@ class CareerAIAssistant:
                 }
             
             # Use actual OpenAI API
-            # Build conversation context
-            messages = [
-                {
-                    "role": "system",
-                    "content": self.get_system_prompt(user_profile, preferences)
-                }
-            ]
-            
-            # Add conversation history (last 10 messages for context)
-            for msg in conversation_history[-10:]:
-                messages.append({
-                    "role": "user" if msg['message_type'] == 'user' else "assistant",
-                    "content": msg['content']
-                })
+            messages = self._build_chat_messages(user_message, conversation_history, user_profile, preferences)
             
-            # Add current user message
-            messages.append({
-                "role": "user",
-                "content": user_message
-            })
-            
-            response = self.client.chat.completions.create(
-                model="gpt-4",
+            response = self.llm.complete(
+                call_site="chat",
                 messages=messages,
-                max_tokens=1500,
                 temperature=0.7,
                 presence_penalty=0.1,
                 frequency_penalty=0.1
             )
             
             response_time = time.time() - start_time
-            response_content = response.choices[0].message.content
-            tokens_used = response.usage.total_tokens if hasattr(response, 'usage') else 0
+            response_content = response['content']
+            tokens_used = response['total_tokens']
             
             return {
                 'content': response_content,
                 'tokens_used': tokens_used,
                 'response_time': response_time,
-                'model': 'gpt-4'
+                'model': response['model']
             }
             
         except Exception as e:
             logger.error(f"Error generating AI response: {str(e)}")
+            record_fallback('chat')
             return {
                 'content': "I apologize, but I'm having trouble processing your request right now. Please try again in a moment, or feel free to rephrase your question.",
                 'tokens_used': 0,
@@ -166,52 +286,109 @@ class CareerAIAssistant:
                 'model': 'fallback'
             }
     
+    def stream_response(self, user_message: str, conversation_history: List[Dict], user_profile: Dict[str, Any], preferences: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """
+        Stream an AI response to a user message
+        
+        Yields {'type': 'delta', 'content': ...} events as text arrives and a final
+        {'type': 'done', ...} event with the full content, token usage and timings.
+        """
+        if not settings.OPENAI_API_KEY or settings.OPENAI_API_KEY == 'your-openai-api-key-here' or self.llm is None:
+            # Mock responses are produced in one piece
+            ai_response = self.generate_response(user_message, conversation_history, user_profile, preferences)
+            yield {'type': 'delta', 'content': ai_response['content']}
+            yield dict(ai_response, type='done', first_token_time=ai_response['response_time'])
+            return
+        
+        content_parts = []
+        try:
+            messages = self._build_chat_messages(user_message, conversation_history, user_profile, preferences)
+            
+            for event in self.llm.stream(
+                call_site="chat",
+                messages=messages,
+                temperature=0.7,
+                presence_penalty=0.1,
+                frequency_penalty=0.1
+            ):
+                if event['type'] == 'delta':
+                    content_parts.append(event['content'])
+                    yield event
+                else:
+                    yield {
+                        'type': 'done',
+                        'content': ''.join(content_parts),
+                        'tokens_used': event['total_tokens'],
+                        'response_time': event['response_time'],
+                        'first_token_time': event['first_token_time'],
+                        'model': event['model']
+                    }
+                    
+        except Exception as e:
+            logger.error(f"Error streaming AI response: {str(e)}")
+            record_fallback('chat')
+            if content_parts:
+                # Keep what the user has already seen rather than replacing it
+                content = ''.join(content_parts)
+            else:
+                content = "I apologize, but I'm having trouble processing your request right now. Please try again in a moment, or feel free to rephrase your question."
+                yield {'type': 'delta', 'content': content}
+            yield {
+                'type': 'done',
+                'content': content,
+                'tokens_used': 0,
+                'response_time': 0.0,
+                'first_token_time': 0.0,
+                'model': 'fallback'
+            }
+    
+    def _build_chat_messages(self, user_message: str, conversation_history: List[Dict], user_profile: Dict[str, Any], preferences: Dict[str, Any]) -> List[Dict[str, str]]:
+        """Build the chat completion messages from the system prompt and conversation history"""
+        messages = [
+            {
+                "role": "system",
+                "content": self.get_system_prompt(user_profile, preferences)
+            }
+        ]
+        
+        # Add conversation history (last 10 messages for context)
+        for msg in conversation_history[-10:]:
+            messages.append({
+                "role": "user" if msg['message_type'] == 'user' else "assistant",
+                "content": msg['content']
+            })
+        
+        # Add current user message
+        messages.append({
+            "role": "user",
+            "content": user_message
+        })
+        
+        # Drop the oldest turns if the context is over the chat token budget
+        return fit_messages_to_budget(messages, 'chat')
+    
     def generate_daily_insight(self, user_profile: Dict[str, Any]) -> Dict[str, Any]:
         """Generate daily career insight for user"""
         try:
             prompt = f"""
-            Generate a personalized daily career insight for this user:
-
             User Profile:
             - Skills: {user_profile.get('skills', [])}
             - Experience Level: {user_profile.get('experience_level', 'entry')}
             - Career Interests: {user_profile.get('career_interests', [])}
             - Target Role: {user_profile.get('target_role', '')}
             - Goals: {user_profile.get('goals', '')}
-
-            Create a helpful, actionable insight in JSON format:
-            {{
-                "insight_type": "career_advice|skill_recommendation|job_market_trend|learning_path|resume_tip|interview_prep|networking_tip|salary_insight",
-                "title": "Brief, engaging title",
-                "content": "Detailed, actionable content (2-3 paragraphs)",
-                "priority": "low|medium|high",
-                "is_actionable": true,
-                "confidence": 0.85
-            }}
-
-            Focus on something timely, relevant, and actionable for their career stage and goals.
             """
             
-            if not self.client:
+            if not self.llm:
                 return self._get_fallback_insight()
                 
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a career expert generating personalized daily insights. Be practical and actionable."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                max_tokens=800,
+            response = self.llm.complete(
+                call_site="daily_insight",
+                messages=DAILY_INSIGHT_TEMPLATE.messages(prompt),
                 temperature=0.8
             )
             
-            response_text = response.choices[0].message.content
+            response_text = response['content']
             
             # Extract JSON from response
             start_idx = response_text.find('{')
@@ -230,6 +407,7 @@ class CareerAIAssistant:
     
     def _get_fallback_insight(self) -> Dict[str, Any]:
         """Provide fallback insight when AI fails"""
+        record_fallback('daily_insight')
         return {
             "insight_type": "career_advice",
             "title": "Keep Learning and Growing",
@@ -243,7 +421,8 @@ class CareerAIAssistant:
         """Generate a personalized career roadmap using GPT"""
         try:
             prompt = f"""
-            Create a detailed {timeframe} career roadmap for someone who wants to become a {goal}.
+            Goal: Become a {goal}
+            Timeframe: {timeframe}
 
             User Background:
             - Current Skills: {', '.join(user_profile.get('skills', []))}
@@ -251,73 +430,19 @@ class CareerAIAssistant:
             - Career Interests: {', '.join(user_profile.get('career_interests', []))}
             - Education: {user_profile.get('education_level', 'bachelor')}
             - Current Role: {user_profile.get('current_role', 'Not specified')}
-
-            Please provide a structured roadmap in JSON format with the following structure:
-            {{
-                "title": "Career Roadmap Title",
-                "goal": "{goal}",
-                "timeframe": "{timeframe}",
-                "difficulty": "beginner|intermediate|advanced",
-                "phases": [
-                    {{
-                        "phase_number": 1,
-                        "title": "Foundation Phase",
-                        "duration": "2 months",
-                        "description": "Build core fundamentals",
-                        "skills": ["skill1", "skill2", "skill3"],
-                        "projects": [
-                            {{
-                                "name": "Project Name",
-                                "description": "Brief description",
-                                "estimated_hours": 20
-                            }}
-                        ],
-                        "resources": [
-                            {{
-                                "name": "Resource Name",
-                                "type": "course|book|tutorial|certification",
-                                "url": "optional",
-                                "description": "Why this resource"
-                            }}
-                        ]
-                    }}
-                ],
-                "milestones": [
-                    {{
-                        "title": "Milestone Name",
-                        "description": "What you'll achieve",
-                        "target_month": 2
-                    }}
-                ],
-                "estimated_total_hours": 200,
-                "success_metrics": ["metric1", "metric2"],
-                "next_steps": "What to do after completing this roadmap"
-            }}
-
-            Make it specific, actionable, and tailored to their background. Include real resources and practical projects.
             """
             
-            if not settings.OPENAI_API_KEY or settings.OPENAI_API_KEY == 'your-openai-api-key-here' or not self.client:
+            if not settings.OPENAI_API_KEY or settings.OPENAI_API_KEY == 'your-openai-api-key-here' or not self.llm:
                 # Fallback roadmap for demo
                 return self._get_fallback_roadmap(goal, timeframe, user_profile)
             
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert career counselor and learning path designer. Create detailed, practical roadmaps that help people achieve their career goals."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                max_tokens=2000,
+            response = self.llm.complete(
+                call_site="career_roadmap",
+                messages=CAREER_ROADMAP_TEMPLATE.messages(prompt),
                 temperature=0.7
             )
             
-            response_text = response.choices[0].message.content
+            response_text = response['content']
             
             # Extract JSON from response
             start_idx = response_text.find('{')
@@ -336,6 +461,7 @@ class CareerAIAssistant:
     
     def _get_fallback_roadmap(self, goal: str, timeframe: str, user_profile: Dict[str, Any]) -> Dict[str, Any]:
         """Provide fallback roadmap when GPT fails"""
+        record_fallback('career_roadmap')
         return {
             "title": f"{goal} Learning Path",
             "goal": goal,
@@ -379,56 +505,25 @@ class CareerAIAssistant:
     def analyze_resume(self, resume_text: str, target_role: str, user_profile: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze resume and provide improvement suggestions"""
         try:
-            prompt = f"""
-            Analyze this resume for a {target_role} position and provide specific improvement suggestions.
-
-            Resume Content:
-            {resume_text}
-
+            builder = ASSISTANT_RESUME_ANALYSIS_TEMPLATE.builder()
+            builder.add('context', f"""
             Target Role: {target_role}
             User's Career Interests: {', '.join(user_profile.get('career_interests', []))}
             Experience Level: {user_profile.get('experience_level', 'entry')}
-
-            Provide analysis in JSON format:
-            {{
-                "overall_score": 75,
-                "strengths": ["strength1", "strength2"],
-                "weaknesses": ["weakness1", "weakness2"],
-                "suggestions": [
-                    {{
-                        "category": "formatting|content|keywords|achievements",
-                        "priority": "high|medium|low",
-                        "suggestion": "Specific improvement suggestion",
-                        "example": "Example of how to implement this"
-                    }}
-                ],
-                "missing_keywords": ["keyword1", "keyword2"],
-                "recommended_sections": ["section1", "section2"],
-                "ats_score": 80,
-                "next_steps": "What to focus on first"
-            }}
-            """
+            """)
+            builder.add('resume', f"Resume Content:\n{normalize_whitespace(resume_text)}", priority=10, trimmable=True)
+            prompt = builder.build()
             
-            if not settings.OPENAI_API_KEY or settings.OPENAI_API_KEY == 'your-openai-api-key-here' or not self.client:
+            if not settings.OPENAI_API_KEY or settings.OPENAI_API_KEY == 'your-openai-api-key-here' or not self.llm:
                 return self._get_fallback_resume_analysis(target_role)
             
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert resume reviewer and career counselor. Provide detailed, actionable feedback to help people improve their resumes."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                max_tokens=1500,
+            response = self.llm.complete(
+                call_site="assistant_resume_analysis",
+                messages=ASSISTANT_RESUME_ANALYSIS_TEMPLATE.messages(prompt),
                 temperature=0.7
             )
             
-            response_text = response.choices[0].message.content
+            response_text = response['content']
             
             # Extract JSON from response
             start_idx = response_text.find('{')
@@ -447,6 +542,7 @@ class CareerAIAssistant:
     
     def _get_fallback_resume_analysis(self, target_role: str) -> Dict[str, Any]:
         """Provide fallback resume analysis"""
+        record_fallback('assistant_resume_analysis')
         return {
             "overall_score": 75,
             "strengths": ["Clear formatting", "Relevant experience"],
@@ -541,7 +637,7 @@ def chat_conversations(request):
 @api_view(['GET', 'POST', 'DELETE'])
 @permission_classes([permissions.IsAuthenticated])
 def chat_conversation_detail(request, conversation_id):
-    """Get conversation messages, send new message, or delete conversation"""
+    """Get conversation messages, send new message (streamed as SSE with ?stream=true), or delete conversation"""
     user = request.user
     conversation = get_object_or_404(ChatConversation, id=conversation_id, user=user)
     
@@ -609,6 +705,18 @@ def chat_conversation_detail(request, conversation_id):
         
         # Generate AI response
         assistant = CareerAIAssistant()
+        
+        if request.query_params.get('stream', '').lower() == 'true':
+            response = StreamingHttpResponse(
+                _in_request_context(
+                    _stream_chat_reply(assistant, conversation, user_msg, history, user_profile, preferences)
+                ),
+                content_type='text/event-stream'
+            )
+            response['Cache-Control'] = 'no-cache'
+            response['X-Accel-Buffering'] = 'no'
+            return response
+        
         ai_response = assistant.generate_response(user_message, history, user_profile, preferences)
         
         # Save AI response
@@ -647,6 +755,74 @@ def chat_conversation_detail(request, conversation_id):
         }, status=status.HTTP_204_NO_CONTENT)
 
 
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format a Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _in_request_context(events: Iterator[str]) -> Iterator[str]:
+    """
+    Run a streaming body in a copy of the request's context, so the request
+    deadline and per-user LLM quota still apply after the view has returned.
+    """
+    context = contextvars.copy_context()
+
+    def run():
+        while True:
+            try:
+                yield context.run(next, events)
+            except StopIteration:
+                return
+
+    return run()
+
+
+def _stream_chat_reply(assistant, conversation, user_msg, history, user_profile, preferences):
+    """Relay a streamed AI reply as SSE and persist the final message when the stream closes"""
+    stream = assistant.stream_response(user_msg.content, history, user_profile, preferences)
+    
+    yield _sse_event('start', {
+        'user_message': {
+            'id': user_msg.id,
+            'content': user_msg.content,
+            'created_at': user_msg.created_at
+        }
+    })
+    
+    content_parts = []
+    final = None
+    try:
+        for event in stream:
+            if event['type'] == 'delta':
+                content_parts.append(event['content'])
+                yield _sse_event('delta', {'content': event['content']})
+            else:
+                final = event
+    finally:
+        # Persist even if the client disconnects mid-stream
+        ai_msg = ChatMessage.objects.create(
+            conversation=conversation,
+            message_type='assistant',
+            content=final['content'] if final else ''.join(content_parts),
+            ai_model=final['model'] if final else 'gpt-4',
+            tokens_used=final['tokens_used'] if final else 0,
+            response_time=final['response_time'] if final else 0.0
+        )
+        conversation.last_message_at = timezone.now()
+        conversation.save()
+    
+    yield _sse_event('done', {
+        'ai_response': {
+            'id': ai_msg.id,
+            'content': ai_msg.content,
+            'created_at': ai_msg.created_at,
+            'tokens_used': ai_msg.tokens_used,
+            'response_time': ai_msg.response_time,
+            'first_token_time': final['first_token_time'] if final else 0.0
+        }
+    })
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def ai_insights(request):
@@ -955,31 +1131,11 @@ def career_quiz_recommendation(request):
     
     try:
         prompt = f"""
-        Based on these career quiz answers and user profile, suggest 3-5 suitable tech career paths.
-
         Quiz Answers: {json.dumps(quiz_answers)}
         User Profile: {json.dumps(user_profile)}
-
-        Provide recommendations in JSON format:
-        {{
-            "recommendations": [
-                {{
-                    "title": "Career Title",
-                    "match_percentage": 85,
-                    "difficulty": "beginner|intermediate|advanced",
-                    "description": "Brief description of the role",
-                    "key_skills": ["skill1", "skill2", "skill3"],
-                    "salary_range": "$50k - $80k",
-                    "growth_potential": "high|medium|low",
-                    "why_good_fit": "Explanation of why this matches their profile"
-                }}
-            ],
-            "next_steps": "What they should do next",
-            "learning_priority": "What to focus on first"
-        }}
         """
         
-        if not settings.OPENAI_API_KEY or settings.OPENAI_API_KEY == 'your-openai-api-key-here' or not assistant.client:
+        if not settings.OPENAI_API_KEY or settings.OPENAI_API_KEY == 'your-openai-api-key-here' or not assistant.llm:
             # Fallback recommendations
             recommendations = {
                 "recommendations": [
@@ -1008,23 +1164,13 @@ def career_quiz_recommendation(request):
                 "learning_priority": "Focus on foundational programming skills first"
             }
         else:
-            response = assistant.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a career counselor specializing in tech careers. Provide personalized, realistic recommendations."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                max_tokens=1500,
+            response = assistant.llm.complete(
+                call_site="career_quiz",
+                messages=CAREER_QUIZ_TEMPLATE.messages(prompt),
                 temperature=0.7
             )
             
-            response_text = response.choices[0].message.content
+            response_text = response['content']
             start_idx = response_text.find('{')
             end_idx = response_text.rfind('}') + 1
             
@@ -1032,6 +1178,7 @@ def career_quiz_recommendation(request):
                 json_str = response_text[start_idx:end_idx]
                 recommendations = json.loads(json_str)
             else:
+                record_fallback('career_quiz')
                 recommendations = {
                     "recommendations": [],
                     "next_steps": "Continue exploring your interests",
@@ -1048,3 +1195,14 @@ def career_quiz_recommendation(request):
         return Response({
             'error': 'Failed to generate recommendations'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def llm_stats(request):
+    """Report LLM cache counters, per-tier latency/token totals and breaker states for this worker"""
+    return Response({
+        'cache': get_response_cache().stats(),
+        'tiers': tier_stats.snapshot(),
+        'circuit_breakers': breaker_states()
+    })
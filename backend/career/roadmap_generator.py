@@ -1,21 +1,99 @@
-import openai
 import json
 import logging
 from django.conf import settings
 from typing import Dict, List, Any
+from core.llm import get_gateway, PromptTemplate, record_fallback
 from .models import CareerRoadmap, RoadmapTask, LearningResource
 
 logger = logging.getLogger(__name__)
 
-# Set OpenAI API key
-openai.api_key = settings.OPENAI_API_KEY
+# Static prefixes first so every call shares a cacheable prompt prefix
+ROADMAP_TEMPLATE = PromptTemplate(
+    'roadmap',
+    "You are an expert career counselor and mentor with deep knowledge of various industries, skills, and career paths. Generate detailed, actionable career roadmaps.",
+    "Create a detailed career roadmap for the duration, transition and user profile in the next message.",
+    """
+    Please provide a comprehensive roadmap in the following JSON format:
+    {
+        "title": "Career Roadmap Title",
+        "description": "Brief description of the roadmap",
+        "duration_months": 6,
+        "skills_to_learn": ["skill1", "skill2", "skill3"],
+        "tools_to_master": ["tool1", "tool2", "tool3"],
+        "certifications": ["cert1", "cert2"],
+        "projects": [
+            {
+                "title": "Project Title",
+                "description": "Project description",
+                "skills_used": ["skill1", "skill2"],
+                "estimated_weeks": 2
+            }
+        ],
+        "learning_resources": [
+            {
+                "title": "Resource Title",
+                "type": "course|book|article|video",
+                "url": "https://example.com",
+                "description": "Resource description",
+                "difficulty": "beginner|intermediate|advanced"
+            }
+        ],
+        "weekly_tasks": [
+            {
+                "week": 1,
+                "tasks": [
+                    {
+                        "title": "Task Title",
+                        "description": "Task description",
+                        "type": "skill|project|certification|reading|practice",
+                        "estimated_hours": 5,
+                        "priority": "low|medium|high|critical"
+                    }
+                ]
+            }
+        ]
+    }
+
+    Set "duration_months" to the requested duration.
+
+    Focus on:
+    1. Practical, actionable steps
+    2. Industry-relevant skills and tools
+    3. Progressive difficulty
+    4. Real-world projects
+    5. Networking opportunities
+    6. Portfolio building
+    7. Interview preparation
+
+    Make sure the roadmap is realistic and achievable within the specified timeframe.
+    """
+)
+
+LEARNING_RESOURCES_TEMPLATE = PromptTemplate(
+    'learning_resources',
+    "You are a learning resource curator.",
+    """
+    Suggest 5-10 high-quality learning resources for the skills in the next message.
+
+    For each resource, provide:
+    - Title
+    - Type (course, book, article, video, tutorial)
+    - URL (if available)
+    - Description
+    - Difficulty level (beginner, intermediate, advanced)
+    - Provider (if applicable)
+
+    Focus on free and popular resources when possible.
+    Format as JSON array.
+    """
+)
 
 
 class RoadmapGenerator:
     """AI-powered career roadmap generator using OpenAI GPT-4"""
     
     def __init__(self):
-        self.client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
+        self.llm = get_gateway()
     
     def generate_roadmap(self, user_profile: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -30,23 +108,13 @@ class RoadmapGenerator:
         try:
             prompt = self._create_roadmap_prompt(user_profile)
             
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert career counselor and mentor with deep knowledge of various industries, skills, and career paths. Generate detailed, actionable career roadmaps."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                max_tokens=3000,
+            response = self.llm.complete(
+                call_site="roadmap",
+                messages=ROADMAP_TEMPLATE.messages(prompt),
                 temperature=0.7
             )
             
-            roadmap_text = response.choices[0].message.content
+            roadmap_text = response['content']
             roadmap_data = self._parse_roadmap_response(roadmap_text)
             
             return roadmap_data
@@ -56,7 +124,7 @@ class RoadmapGenerator:
             return self._get_fallback_roadmap(user_profile)
     
     def _create_roadmap_prompt(self, user_profile: Dict[str, Any]) -> str:
-        """Create a detailed prompt for GPT-4 based on user profile"""
+        """Create the per-user part of the roadmap prompt; instructions live in ROADMAP_TEMPLATE"""
         
         current_role = user_profile.get('current_role', 'Entry Level')
         target_role = user_profile.get('target_role', 'Software Developer')
@@ -68,7 +136,8 @@ class RoadmapGenerator:
         duration_months = user_profile.get('duration_months', 6)
         
         prompt = f"""
-        Create a detailed {duration_months}-month career roadmap for someone transitioning from "{current_role}" to "{target_role}".
+        Duration: {duration_months} months
+        Transition: from "{current_role}" to "{target_role}"
 
         User Profile:
         - Current Role: {current_role}
@@ -78,58 +147,6 @@ class RoadmapGenerator:
         - Current Skills: {', '.join(skills) if skills else 'None specified'}
         - Career Interests: {', '.join(interests) if interests else 'None specified'}
         - Goals: {goals if goals else 'Career advancement'}
-
-        Please provide a comprehensive roadmap in the following JSON format:
-        {{
-            "title": "Career Roadmap Title",
-            "description": "Brief description of the roadmap",
-            "duration_months": {duration_months},
-            "skills_to_learn": ["skill1", "skill2", "skill3"],
-            "tools_to_master": ["tool1", "tool2", "tool3"],
-            "certifications": ["cert1", "cert2"],
-            "projects": [
-                {{
-                    "title": "Project Title",
-                    "description": "Project description",
-                    "skills_used": ["skill1", "skill2"],
-                    "estimated_weeks": 2
-                }}
-            ],
-            "learning_resources": [
-                {{
-                    "title": "Resource Title",
-                    "type": "course|book|article|video",
-                    "url": "https://example.com",
-                    "description": "Resource description",
-                    "difficulty": "beginner|intermediate|advanced"
-                }}
-            ],
-            "weekly_tasks": [
-                {{
-                    "week": 1,
-                    "tasks": [
-                        {{
-                            "title": "Task Title",
-                            "description": "Task description",
-                            "type": "skill|project|certification|reading|practice",
-                            "estimated_hours": 5,
-                            "priority": "low|medium|high|critical"
-                        }}
-                    ]
-                }}
-            ]
-        }}
-
-        Focus on:
-        1. Practical, actionable steps
-        2. Industry-relevant skills and tools
-        3. Progressive difficulty
-        4. Real-world projects
-        5. Networking opportunities
-        6. Portfolio building
-        7. Interview preparation
-
-        Make sure the roadmap is realistic and achievable within the specified timeframe.
         """
         
         return prompt
@@ -200,6 +217,7 @@ class RoadmapGenerator:
     
     def _get_fallback_roadmap(self, user_profile: Dict[str, Any]) -> Dict[str, Any]:
         """Provide a fallback roadmap when AI generation fails"""
+        record_fallback('roadmap')
         target_role = user_profile.get('target_role', 'Software Developer')
         
         return {
@@ -295,33 +313,15 @@ class RoadmapGenerator:
     def suggest_learning_resources(self, skills: List[str]) -> List[Dict[str, Any]]:
         """Suggest learning resources for specific skills"""
         try:
-            skills_str = ', '.join(skills)
-            prompt = f"""
-            Suggest 5-10 high-quality learning resources for these skills: {skills_str}
-            
-            For each resource, provide:
-            - Title
-            - Type (course, book, article, video, tutorial)
-            - URL (if available)
-            - Description
-            - Difficulty level (beginner, intermediate, advanced)
-            - Provider (if applicable)
-            
-            Focus on free and popular resources when possible.
-            Format as JSON array.
-            """
+            prompt = f"Skills: {', '.join(skills)}"
             
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a learning resource curator."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=1500,
+            response = self.llm.complete(
+                call_site="learning_resources",
+                messages=LEARNING_RESOURCES_TEMPLATE.messages(prompt),
                 temperature=0.5
             )
             
-            resources_text = response.choices[0].message.content
+            resources_text = response['content']
             
             # Try to parse JSON response
             try:
@@ -334,8 +334,10 @@ class RoadmapGenerator:
             except:
                 pass
             
+            record_fallback('learning_resources')
             return []
             
         except Exception as e:
             logger.error(f"Error suggesting resources: {str(e)}")
+            record_fallback('learning_resources')
             return [] 
\ No newline at end of file
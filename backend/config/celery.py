@@ -0,0 +1,16 @@
+"""
+Celery app for CareerForge AI background tasks.
+
+Start a worker with ``celery -A config worker``; tasks are discovered
+from each app's tasks module.
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+app = Celery('careerforge')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
@@ -26,6 +26,7 @@ DJANGO_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 ]
 
 THIRD_PARTY_APPS = [
@@ -53,6 +54,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.LLMDeadlineMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -165,6 +167,234 @@ AUTH_USER_MODEL = 'core.User'
 
 # OpenAI Configuration
 OPENAI_API_KEY = config('OPENAI_API_KEY', default='')
+# Point at an OpenAI-compatible server, e.g. `manage.py llm_standin` for offline benchmarks
+OPENAI_BASE_URL = config('OPENAI_BASE_URL', default='')
+
+# LLM gateway connection pool (one pool per worker process)
+LLM_POOL_MAX_CONNECTIONS = config('LLM_POOL_MAX_CONNECTIONS', default=20, cast=int)
+LLM_POOL_MAX_KEEPALIVE = config('LLM_POOL_MAX_KEEPALIVE', default=10, cast=int)
+LLM_POOL_KEEPALIVE_EXPIRY = config('LLM_POOL_KEEPALIVE_EXPIRY', default=60.0, cast=float)
+LLM_CONNECT_TIMEOUT = config('LLM_CONNECT_TIMEOUT', default=5.0, cast=float)
+LLM_READ_TIMEOUT = config('LLM_READ_TIMEOUT', default=60.0, cast=float)
+LLM_POOL_TIMEOUT = config('LLM_POOL_TIMEOUT', default=5.0, cast=float)
+LLM_SDK_MAX_RETRIES = config('LLM_SDK_MAX_RETRIES', default=0, cast=int)
+
+# LLM resilience: request deadlines, retries, circuit breaker and hedging
+LLM_REQUEST_DEADLINE = config('LLM_REQUEST_DEADLINE', default=25.0, cast=float)
+LLM_MIN_CALL_TIME = config('LLM_MIN_CALL_TIME', default=1.0, cast=float)
+LLM_MAX_RETRIES = config('LLM_MAX_RETRIES', default=2, cast=int)
+LLM_RETRY_BASE_DELAY = config('LLM_RETRY_BASE_DELAY', default=0.5, cast=float)
+LLM_RETRY_MAX_DELAY = config('LLM_RETRY_MAX_DELAY', default=8.0, cast=float)
+LLM_BREAKER_WINDOW = config('LLM_BREAKER_WINDOW', default=20, cast=int)
+LLM_BREAKER_MIN_CALLS = config('LLM_BREAKER_MIN_CALLS', default=5, cast=int)
+LLM_BREAKER_FAILURE_RATE = config('LLM_BREAKER_FAILURE_RATE', default=0.5, cast=float)
+LLM_BREAKER_COOLDOWN = config('LLM_BREAKER_COOLDOWN', default=30.0, cast=float)
+LLM_HEDGED_CALL_SITES = ['chat']
+LLM_HEDGE_DELAY = config('LLM_HEDGE_DELAY', default=6.0, cast=float)
+
+# LLM model routing: each task maps to a tier; tiers downgrade when the breaker
+# is open or the request deadline leaves less than min_time seconds
+LLM_MODEL_TIERS = {
+    'quality': {
+        'model': config('LLM_QUALITY_MODEL', default='gpt-4'),
+        'timeout': 60.0,
+        'min_time': 12.0,
+        'downgrade_to': 'fast',
+    },
+    'fast': {
+        'model': config('LLM_FAST_MODEL', default='gpt-3.5-turbo'),
+        'timeout': 30.0,
+        'downgrade_to': None,
+    },
+}
+
+LLM_TASK_ROUTES = {
+    'default': {'tier': 'quality', 'max_tokens': 1000},
+    'resume_parse': {'tier': 'fast', 'max_tokens': 2000},
+    'resume_analysis': {'tier': 'quality', 'max_tokens': 2500},
+    'assistant_resume_analysis': {'tier': 'quality', 'max_tokens': 1500},
+    'job_match': {'tier': 'quality', 'max_tokens': 2000},
+    'job_match_batch': {'tier': 'quality', 'max_tokens': 3000},
+    'job_recommendations': {'tier': 'quality', 'max_tokens': 3000},
+    'daily_insight': {'tier': 'fast', 'max_tokens': 800},
+    'chat': {'tier': 'quality', 'max_tokens': 1500},
+    'career_roadmap': {'tier': 'quality', 'max_tokens': 2000},
+    'career_quiz': {'tier': 'quality', 'max_tokens': 1500},
+    'roadmap': {'tier': 'quality', 'max_tokens': 3000},
+    'learning_resources': {'tier': 'fast', 'max_tokens': 1500},
+}
+
+# LLM response cache: in-process LRU plus optional shared Redis tier
+LLM_CACHE_ENABLED = config('LLM_CACHE_ENABLED', default=True, cast=bool)
+LLM_CACHE_MAX_ENTRIES = config('LLM_CACHE_MAX_ENTRIES', default=2048, cast=int)
+LLM_CACHE_DEFAULT_TTL = config('LLM_CACHE_DEFAULT_TTL', default=0, cast=int)
+LLM_CACHE_REDIS_URL = config('LLM_CACHE_REDIS_URL', default='')
+LLM_CACHE_SHARED_ALIAS = 'llm' if LLM_CACHE_REDIS_URL else ''
+
+# Per-call-site TTLs in seconds; 0 opts a call site out of caching
+LLM_CACHE_TTLS = {
+    'chat': 0,
+    'daily_insight': 0,
+    'job_match': 24 * 60 * 60,
+    'job_match_batch': 24 * 60 * 60,
+    'job_recommendations': 6 * 60 * 60,
+    'resume_parse': 7 * 24 * 60 * 60,
+    'resume_analysis': 24 * 60 * 60,
+    'assistant_resume_analysis': 24 * 60 * 60,
+    'career_roadmap': 24 * 60 * 60,
+    'career_quiz': 24 * 60 * 60,
+    'roadmap': 24 * 60 * 60,
+    'learning_resources': 7 * 24 * 60 * 60,
+}
+
+# Prompt token budgets per call site; low-value sections are trimmed to fit
+LLM_PROMPT_DEFAULT_BUDGET = config('LLM_PROMPT_DEFAULT_BUDGET', default=5000, cast=int)
+LLM_PROMPT_BUDGETS = {
+    'resume_parse': 5000,
+    'resume_analysis': 3000,
+    'assistant_resume_analysis': 4000,
+    'job_match': 2000,
+    'job_match_batch': 4500,
+    'chat': 5000,
+}
+
+# LLM quota: token buckets per model (tiers may set their own 'rpm'/'tpm') and per
+# user. Queued calls wait up to the request deadline; batch work leaves headroom
+# for interactive calls. Bucket state is shared through Redis when configured.
+LLM_RATELIMIT_ENABLED = config('LLM_RATELIMIT_ENABLED', default=True, cast=bool)
+LLM_RATELIMIT_REDIS_URL = config('LLM_RATELIMIT_REDIS_URL', default=LLM_CACHE_REDIS_URL)
+LLM_GLOBAL_RPM = config('LLM_GLOBAL_RPM', default=500, cast=int)
+LLM_GLOBAL_TPM = config('LLM_GLOBAL_TPM', default=150000, cast=int)
+LLM_USER_RPM = config('LLM_USER_RPM', default=30, cast=int)
+LLM_USER_TPM = config('LLM_USER_TPM', default=40000, cast=int)
+LLM_RATELIMIT_MAX_WAIT = config('LLM_RATELIMIT_MAX_WAIT', default=30.0, cast=float)
+LLM_RATELIMIT_BATCH_HEADROOM = config('LLM_RATELIMIT_BATCH_HEADROOM', default=0.2, cast=float)
+# 0 = interactive, 1 = normal (default), 2 = batch
+LLM_CALL_SITE_PRIORITIES = {
+    'chat': 0,
+    'career_quiz': 0,
+    'daily_insight': 1,
+    'job_match': 2,
+    'job_match_batch': 2,
+    'job_recommendations': 2,
+}
+
+# Single-flight: identical concurrent LLM calls share one upstream request.
+# With a shared Redis cache the coalescing also spans workers and nodes.
+LLM_SINGLEFLIGHT_ENABLED = config('LLM_SINGLEFLIGHT_ENABLED', default=True, cast=bool)
+LLM_SINGLEFLIGHT_SHARED = config('LLM_SINGLEFLIGHT_SHARED', default=bool(LLM_CACHE_SHARED_ALIAS), cast=bool)
+LLM_SINGLEFLIGHT_LOCK_TTL = config('LLM_SINGLEFLIGHT_LOCK_TTL', default=60, cast=int)
+LLM_SINGLEFLIGHT_RESULT_TTL = config('LLM_SINGLEFLIGHT_RESULT_TTL', default=10, cast=int)
+LLM_SINGLEFLIGHT_POLL_INTERVAL = config('LLM_SINGLEFLIGHT_POLL_INTERVAL', default=0.1, cast=float)
+
+# LLM telemetry served at /metrics in Prometheus format; set METRICS_TOKEN to
+# require "Authorization: Bearer <token>" from the scraper
+LLM_LATENCY_BUCKETS = [0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0]
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+if LLM_CACHE_REDIS_URL:
+    CACHES['llm'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': LLM_CACHE_REDIS_URL,
+    }
+
+# Job match fan-out: concurrent LLM scoring per request
+JOB_MATCH_MAX_CONCURRENCY = config('JOB_MATCH_MAX_CONCURRENCY', default=8, cast=int)
+JOB_MATCH_DEADLINE = config('JOB_MATCH_DEADLINE', default=20.0, cast=float)
+
+# Batched job matching: several jobs scored per completion (1 disables batching)
+JOB_MATCH_BATCH_SIZE = config('JOB_MATCH_BATCH_SIZE', default=5, cast=int)
+JOB_MATCH_BATCH_MAX_CHARS = config('JOB_MATCH_BATCH_MAX_CHARS', default=12000, cast=int)
+JOB_MATCH_BATCH_TOKENS_PER_JOB = config('JOB_MATCH_BATCH_TOKENS_PER_JOB', default=600, cast=int)
+
+# First-stage local ranking: every candidate is scored with NumPy, only the top-k per endpoint reach the LLM
+JOB_RANK_WEIGHTS = {
+    'skills': config('JOB_RANK_WEIGHT_SKILLS', default=0.55, cast=float),
+    'experience': config('JOB_RANK_WEIGHT_EXPERIENCE', default=0.2, cast=float),
+    'location': config('JOB_RANK_WEIGHT_LOCATION', default=0.15, cast=float),
+    'salary': config('JOB_RANK_WEIGHT_SALARY', default=0.1, cast=float),
+    # Profile-to-listing embedding similarity; only counted when JOB_SEMANTIC_ENABLED
+    'semantic': config('JOB_RANK_WEIGHT_SEMANTIC', default=0.3, cast=float),
+}
+JOB_MATCH_TOP_K = {
+    'job_list': config('JOB_MATCH_TOP_K_LIST', default=10, cast=int),
+    'search_jobs': config('JOB_MATCH_TOP_K_SEARCH', default=5, cast=int),
+}
+JOB_RANK_MAX_CANDIDATES = config('JOB_RANK_MAX_CANDIDATES', default=5000, cast=int)
+# Keyset pagination of job list and search results; clients pick ?page_size= up to the cap
+JOB_PAGE_SIZE = config('JOB_PAGE_SIZE', default=20, cast=int)
+JOB_PAGE_SIZE_MAX = config('JOB_PAGE_SIZE_MAX', default=100, cast=int)
+# Text search configuration for the weighted JobListing.search_vector (PostgreSQL)
+JOB_SEARCH_CONFIG = config('JOB_SEARCH_CONFIG', default='english')
+# Job search backend: 'database' (full-text search above) or 'bm25' (in-process index in jobs.bm25)
+JOB_SEARCH_BACKEND = config('JOB_SEARCH_BACKEND', default='database')
+JOB_SEARCH_FIELD_BOOSTS = {
+    'title': config('JOB_SEARCH_BOOST_TITLE', default=3.0, cast=float),
+    'skills_required': config('JOB_SEARCH_BOOST_SKILLS', default=2.5, cast=float),
+    'company': config('JOB_SEARCH_BOOST_COMPANY', default=1.5, cast=float),
+    'requirements': config('JOB_SEARCH_BOOST_REQUIREMENTS', default=1.0, cast=float),
+    'description': config('JOB_SEARCH_BOOST_DESCRIPTION', default=1.0, cast=float),
+}
+JOB_SEARCH_BM25_K1 = config('JOB_SEARCH_BM25_K1', default=1.2, cast=float)
+JOB_SEARCH_BM25_B = config('JOB_SEARCH_BM25_B', default=0.75, cast=float)
+# Snapshot written by build_search_index so workers start without re-tokenizing the catalog
+JOB_SEARCH_SNAPSHOT_PATH = config('JOB_SEARCH_SNAPSHOT_PATH', default=str(BASE_DIR / 'search_index' / 'jobs_bm25.npz'))
+JOB_SEARCH_REFRESH_INTERVAL = config('JOB_SEARCH_REFRESH_INTERVAL', default=300, cast=int)
+
+# In-process job x skill sparse index, built at worker start and kept current by signals and periodic catch-up
+JOB_SKILL_INDEX_ENABLED = config('JOB_SKILL_INDEX_ENABLED', default=True, cast=bool)
+JOB_SKILL_INDEX_REFRESH_INTERVAL = config('JOB_SKILL_INDEX_REFRESH_INTERVAL', default=300, cast=int)
+JOB_SKILL_INDEX_SYNC_OVERLAP = config('JOB_SKILL_INDEX_SYNC_OVERLAP', default=60, cast=int)
+JOB_SKILL_INDEX_COMPACT_RATIO = config('JOB_SKILL_INDEX_COMPACT_RATIO', default=0.1, cast=float)
+JOB_SKILL_INDEX_COMPACT_MIN = config('JOB_SKILL_INDEX_COMPACT_MIN', default=1000, cast=int)
+
+# Local semantic retrieval: spaCy static word vectors embed listings, profiles and search text on the CPU,
+# an in-process IVF index (jobs.semantic) finds nearest listings. Needs: python -m spacy download en_core_web_md
+JOB_SEMANTIC_ENABLED = config('JOB_SEMANTIC_ENABLED', default=False, cast=bool)
+JOB_EMBEDDING_MODEL = config('JOB_EMBEDDING_MODEL', default='en_core_web_md')
+JOB_EMBEDDING_FIELD_WEIGHTS = {
+    'title': config('JOB_EMBEDDING_WEIGHT_TITLE', default=2.0, cast=float),
+    'skills_required': config('JOB_EMBEDDING_WEIGHT_SKILLS', default=1.5, cast=float),
+    'description': config('JOB_EMBEDDING_WEIGHT_DESCRIPTION', default=1.0, cast=float),
+}
+JOB_EMBEDDING_MAX_CHARS = config('JOB_EMBEDDING_MAX_CHARS', default=2000, cast=int)
+# IVF lists (0: about sqrt of the catalog size) and lists scanned per query; exact scan below MIN_TRAIN jobs
+JOB_SEMANTIC_LISTS = config('JOB_SEMANTIC_LISTS', default=0, cast=int)
+JOB_SEMANTIC_PROBES = config('JOB_SEMANTIC_PROBES', default=8, cast=int)
+JOB_SEMANTIC_MIN_TRAIN = config('JOB_SEMANTIC_MIN_TRAIN', default=2000, cast=int)
+# Nearest listings added to the candidates of the job list and search, and the similarity they must reach;
+# in ranking, similarity is rescaled from MIN_SIMILARITY (0) to 1
+JOB_SEMANTIC_CANDIDATES = config('JOB_SEMANTIC_CANDIDATES', default=500, cast=int)
+JOB_SEMANTIC_MIN_SIMILARITY = config('JOB_SEMANTIC_MIN_SIMILARITY', default=0.5, cast=float)
+JOB_SEMANTIC_SNAPSHOT_PATH = config(
+    'JOB_SEMANTIC_SNAPSHOT_PATH', default=str(BASE_DIR / 'search_index' / 'jobs_semantic.npz')
+)
+JOB_SEMANTIC_REFRESH_INTERVAL = config('JOB_SEMANTIC_REFRESH_INTERVAL', default=300, cast=int)
+# Removed rows are compacted away once they exceed this share of the index and COMPACT_MIN
+JOB_SEMANTIC_COMPACT_RATIO = config('JOB_SEMANTIC_COMPACT_RATIO', default=0.2, cast=float)
+JOB_SEMANTIC_COMPACT_MIN = config('JOB_SEMANTIC_COMPACT_MIN', default=1000, cast=int)
+
+# Shared job feature store (jobs.feature_store): ingest publishes versioned .npy files that every worker
+# memory-maps read-only, so skill and embedding indexes cost one copy per node; workers swap within CHECK_INTERVAL
+JOB_FEATURE_STORE_ENABLED = config('JOB_FEATURE_STORE_ENABLED', default=False, cast=bool)
+JOB_FEATURE_STORE_DIR = config('JOB_FEATURE_STORE_DIR', default=str(BASE_DIR / 'feature_store'))
+JOB_FEATURE_STORE_KEEP = config('JOB_FEATURE_STORE_KEEP', default=3, cast=int)
+JOB_FEATURE_STORE_CHECK_INTERVAL = config('JOB_FEATURE_STORE_CHECK_INTERVAL', default=30, cast=int)
+
+# Offline gazetteer (core.geo) resolving job and profile locations to place ids and coordinates at write time;
+# the bundled city list is used unless GAZETTEER_PATH names a GeoNames cities*.txt dump. No network geocoding.
+GAZETTEER_PATH = config('GAZETTEER_PATH', default='')
+# Radius (km) of a location search without ?radius_km=, and the largest radius a client may ask for
+JOB_GEO_DEFAULT_RADIUS_KM = config('JOB_GEO_DEFAULT_RADIUS_KM', default=30.0, cast=float)
+JOB_GEO_MAX_RADIUS_KM = config('JOB_GEO_MAX_RADIUS_KM', default=500.0, cast=float)
+# On-site location fit in ranking decays with distance over this many km
+JOB_GEO_DISTANCE_SCALE_KM = config('JOB_GEO_DISTANCE_SCALE_KM', default=50.0, cast=float)
 
 # Cloudinary Configuration
 CLOUDINARY_URL = config('CLOUDINARY_URL', default='')
@@ -176,6 +406,62 @@ DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 # Celery Configuration (for background tasks)
 CELERY_BROKER_URL = config('REDIS_URL', default='redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = config('REDIS_URL', default='redis://localhost:6379/0')
+CELERY_TASK_ACKS_LATE = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_TASK_ALWAYS_EAGER = config('CELERY_TASK_ALWAYS_EAGER', default=False, cast=bool)
+
+# Background match precomputation; run workers with -Q matches_interactive,matches_batch
+JOB_MATCH_PRECOMPUTE_ENABLED = config('JOB_MATCH_PRECOMPUTE_ENABLED', default=False, cast=bool)
+# Set False once workers precompute, so list views only read stored or local matches
+JOB_MATCH_ON_REQUEST = config('JOB_MATCH_ON_REQUEST', default=True, cast=bool)
+JOB_MATCH_PRECOMPUTE_TOP_K = config('JOB_MATCH_PRECOMPUTE_TOP_K', default=25, cast=int)
+JOB_MATCH_PRECOMPUTE_CHUNK = config('JOB_MATCH_PRECOMPUTE_CHUNK', default=10, cast=int)
+JOB_MATCH_PRECOMPUTE_MIN_SKILL_FIT = config('JOB_MATCH_PRECOMPUTE_MIN_SKILL_FIT', default=0.5, cast=float)
+JOB_MATCH_PRECOMPUTE_ACTIVE_DAYS = config('JOB_MATCH_PRECOMPUTE_ACTIVE_DAYS', default=30, cast=int)
+JOB_MATCH_PRECOMPUTE_USER_BLOCK = config('JOB_MATCH_PRECOMPUTE_USER_BLOCK', default=2000, cast=int)
+JOB_MATCH_INTERACTIVE_QUEUE = 'matches_interactive'
+JOB_MATCH_BATCH_QUEUE = 'matches_batch'
+
+# Server-side job ingestion (python manage.py ingest_jobs, or celery beat with -Q ingestion)
+ADZUNA_APP_ID = config('ADZUNA_APP_ID', default='')
+ADZUNA_APP_KEY = config('ADZUNA_APP_KEY', default='')
+ADZUNA_COUNTRY = config('ADZUNA_COUNTRY', default='us')
+ADZUNA_BASE_URL = config('ADZUNA_BASE_URL', default='https://api.adzuna.com/v1/api/jobs')
+JOOBLE_API_KEY = config('JOOBLE_API_KEY', default='')
+JOOBLE_BASE_URL = config('JOOBLE_BASE_URL', default='https://jooble.org/api')
+CAREERJET_AFFILIATE_ID = config('CAREERJET_AFFILIATE_ID', default='')
+CAREERJET_BASE_URL = config('CAREERJET_BASE_URL', default='https://public-api.careerjet.com/search')
+CAREERJET_USER_IP = config('CAREERJET_USER_IP', default='127.0.0.1')
+# "keywords|location" pairs separated by ";", swept against every configured provider
+JOB_INGEST_QUERIES = [
+    tuple((entry.strip().split('|') + [''])[:2])
+    for entry in config('JOB_INGEST_QUERIES', default='software engineer|remote').split(';') if entry.strip()
+]
+JOB_INGEST_PROVIDER_LIMITS = {
+    'adzuna': {'per_second': 1.0, 'daily': config('ADZUNA_DAILY_LIMIT', default=33, cast=int)},
+    'jooble': {'per_second': 1.0, 'daily': config('JOOBLE_DAILY_LIMIT', default=500, cast=int)},
+    'careerjet': {'per_second': 1.0, 'daily': config('CAREERJET_DAILY_LIMIT', default=1000, cast=int)},
+}
+JOB_INGEST_MAX_PAGES = config('JOB_INGEST_MAX_PAGES', default=5, cast=int)
+JOB_INGEST_BATCH_SIZE = config('JOB_INGEST_BATCH_SIZE', default=500, cast=int)
+JOB_INGEST_TIMEOUT = config('JOB_INGEST_TIMEOUT', default=30.0, cast=float)
+JOB_INGEST_USER_AGENT = 'CareerForge-Ingestion/1.0'
+JOB_INGEST_INTERVAL = config('JOB_INGEST_INTERVAL', default=3600, cast=int)
+JOB_INGEST_QUEUE = 'ingestion'
+# Near-duplicate detection at ingest: MinHash over word shingles of title, company and description,
+# LSH banding (NUM_PERM / BANDS rows per band) for candidates, THRESHOLD estimated Jaccard to cluster
+JOB_DEDUP_ENABLED = config('JOB_DEDUP_ENABLED', default=True, cast=bool)
+JOB_DEDUP_SHINGLE_SIZE = config('JOB_DEDUP_SHINGLE_SIZE', default=3, cast=int)
+JOB_DEDUP_NUM_PERM = config('JOB_DEDUP_NUM_PERM', default=128, cast=int)
+JOB_DEDUP_BANDS = config('JOB_DEDUP_BANDS', default=32, cast=int)
+JOB_DEDUP_THRESHOLD = config('JOB_DEDUP_THRESHOLD', default=0.8, cast=float)
+CELERY_BEAT_SCHEDULE = {
+    'ingest-jobs': {
+        'task': 'jobs.tasks.ingest_jobs',
+        'schedule': JOB_INGEST_INTERVAL,
+        'options': {'queue': JOB_INGEST_QUEUE},
+    },
+}
 
 # Logging
 LOGGING = {
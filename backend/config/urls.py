@@ -5,6 +5,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from core.views import metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -13,6 +14,7 @@ urlpatterns = [
     path('api/resume/', include('resume.urls')),
     path('api/jobs/', include('jobs.urls')),
     path('api/ai/', include('ai_assistant.urls')),
+    path('metrics', metrics, name='metrics'),
 ]
 
 # Serve media files in development
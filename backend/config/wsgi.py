@@ -13,4 +13,13 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_wsgi_application() 
\ No newline at end of file
+application = get_wsgi_application() 
+
+# Build in-process job indexes per worker at start rather than on the first request
+from jobs.bm25 import warm_search_index  # noqa: E402
+from jobs.semantic import warm_semantic_index  # noqa: E402
+from jobs.skill_index import warm_skill_index  # noqa: E402
+
+warm_skill_index()
+warm_search_index()
+warm_semantic_index()
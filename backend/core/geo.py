@@ -0,0 +1,299 @@
+import csv
+import functools
+import math
+import re
+import logging
+import unicodedata
+import numpy as np
+from collections import defaultdict
+from pathlib import Path
+from django.conf import settings
+from django.db.models import FloatField, Value
+from django.db.models.functions import ACos, Cos, Greatest, Least, Radians, Sin
+from typing import Dict, List, Any, Iterable, NamedTuple, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+BUNDLED_GAZETTEER = Path(__file__).resolve().parent / 'data' / 'gazetteer.csv'
+
+# Location text that names no place ("Remote", "Hybrid - London" keeps London)
+NON_PLACES = {
+    'remote', 'fully remote', 'anywhere', 'worldwide', 'global', 'hybrid', 'onsite', 'on site', 'in office',
+    'home', 'home based', 'work from home', 'wfh', 'flexible', 'multiple locations', 'various', 'various locations',
+}
+PART_SEPARATORS = re.compile(r'[,;/|()\[\]]|\s[-–—]\s')
+
+# Ways a location names a country after the city ("Berlin, Germany"); ISO codes always count
+COUNTRY_NAMES = {
+    'US': ('united states', 'united states of america', 'usa', 'america'),
+    'CA': ('canada',),
+    'GB': ('united kingdom', 'uk', 'great britain', 'britain'),
+    'IE': ('ireland', 'republic of ireland'),
+    'FR': ('france',),
+    'DE': ('germany', 'deutschland'),
+    'NL': ('netherlands', 'the netherlands', 'holland'),
+    'BE': ('belgium',),
+    'LU': ('luxembourg',),
+    'CH': ('switzerland',),
+    'AT': ('austria',),
+    'ES': ('spain',),
+    'PT': ('portugal',),
+    'IT': ('italy',),
+    'DK': ('denmark',),
+    'SE': ('sweden',),
+    'NO': ('norway',),
+    'FI': ('finland',),
+    'EE': ('estonia',),
+    'PL': ('poland',),
+    'CZ': ('czechia', 'czech republic'),
+    'HU': ('hungary',),
+    'RO': ('romania',),
+    'GR': ('greece',),
+    'TR': ('turkey', 'turkiye'),
+    'UA': ('ukraine',),
+    'IL': ('israel',),
+    'AE': ('united arab emirates', 'uae'),
+    'SA': ('saudi arabia', 'ksa'),
+    'EG': ('egypt',),
+    'ZA': ('south africa',),
+    'NG': ('nigeria',),
+    'KE': ('kenya',),
+    'IN': ('india',),
+    'PK': ('pakistan',),
+    'BD': ('bangladesh',),
+    'SG': ('singapore',),
+    'MY': ('malaysia',),
+    'ID': ('indonesia',),
+    'PH': ('philippines',),
+    'TH': ('thailand',),
+    'VN': ('vietnam', 'viet nam'),
+    'HK': ('hong kong',),
+    'TW': ('taiwan',),
+    'CN': ('china',),
+    'JP': ('japan',),
+    'KR': ('south korea', 'korea'),
+    'AU': ('australia',),
+    'NZ': ('new zealand',),
+    'MX': ('mexico',),
+    'BR': ('brazil', 'brasil'),
+    'AR': ('argentina',),
+    'CO': ('colombia',),
+    'CL': ('chile',),
+    'PE': ('peru',),
+}
+
+
+class Place(NamedTuple):
+    """A gazetteer entry; place_id is stable across gazetteer reloads"""
+    place_id: str
+    name: str
+    country: str
+    admin1: str
+    latitude: float
+    longitude: float
+    population: int
+
+
+def normalize_place(text: str) -> str:
+    """Lowercase, accent-free, punctuation-free form of a place name ("Zürich" -> "zurich", "St. Louis" -> "st louis")"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char)).lower().replace('&', ' and ')
+    return ' '.join(re.findall(r'[a-z0-9]+', text))
+
+
+class Gazetteer:
+    """
+    Offline place-name lookup: normalized names and alternate names of
+    cities to their canonical place, with its coordinates
+
+    Names shared by several places ("London", "Portland") resolve by the
+    qualifiers after the city ("London, Ontario", "Portland, ME"), then by
+    population.
+    """
+
+    def __init__(self):
+        self.places: Dict[str, Place] = {}
+        self.names: Dict[str, List[Place]] = defaultdict(list)
+        # Country and region names and codes each place answers to, and all of them together
+        self.qualifiers: Dict[str, Set[str]] = {}
+        self.known_qualifiers: Set[str] = set()
+        self.max_name_tokens = 1
+
+    def __len__(self):
+        return len(self.places)
+
+    def add(self, place: Place, names: Iterable[str], admin1_name: str = ''):
+        """Register a place under its name, ascii name and alternate names"""
+        self.places[place.place_id] = place
+        for name in {normalize_place(name) for name in [place.name, *names]}:
+            if name:
+                self.names[name].append(place)
+                self.max_name_tokens = max(self.max_name_tokens, len(name.split()))
+        qualifiers = {place.country.lower(), place.admin1.lower(), normalize_place(admin1_name)}
+        qualifiers.update(COUNTRY_NAMES.get(place.country, ()))
+        qualifiers.discard('')
+        self.qualifiers[place.place_id] = qualifiers
+        self.known_qualifiers |= qualifiers
+
+    def resolve(self, text: str) -> Optional[Place]:
+        """
+        The place a free-text location names, or None ("Remote", unknown towns)
+
+        Comma-separated parts are tried in order as place names, the other
+        parts qualifying them; failing that, the longest known name inside
+        the text ("Greater Austin Area", "Austin TX 78701").
+        """
+        parts = [normalize_place(part) for part in PART_SEPARATORS.split(text or '')]
+        parts = [part for part in parts if part and part not in NON_PLACES]
+        for index, part in enumerate(parts):
+            place = self._best(self.names.get(part, []), parts[:index] + parts[index + 1:])
+            if place is not None:
+                return place
+
+        tokens = [token for token in ' '.join(parts).split() if token not in NON_PLACES]
+        for size in range(min(len(tokens), self.max_name_tokens), 0, -1):
+            for start in range(len(tokens) - size + 1):
+                name = ' '.join(tokens[start:start + size])
+                # Two-letter fragments are region codes far more often than city names
+                if len(name) < 3 or name not in self.names:
+                    continue
+                rest = ' '.join(tokens[:start] + tokens[start + size:])
+                place = self._best(self.names[name], [rest] if rest else [])
+                if place is not None:
+                    return place
+        return None
+
+    def _best(self, candidates: List[Place], qualifiers: List[str]) -> Optional[Place]:
+        """
+        The candidate agreeing with the most qualifiers, largest first on ties;
+        a candidate contradicting a recognizable qualifier ("Paris, TX" for
+        Paris, France) is out
+        """
+        best, best_key = None, None
+        for place in candidates:
+            vocabulary = self.qualifiers[place.place_id]
+            matched = 0
+            for qualifier in qualifiers:
+                terms = [qualifier] if qualifier in self.known_qualifiers else \
+                    [token for token in qualifier.split() if token in self.known_qualifiers]
+                if not terms:
+                    continue
+                if not any(term in vocabulary for term in terms):
+                    break
+                matched += 1
+            else:
+                key = (matched, place.population)
+                if best_key is None or key > best_key:
+                    best, best_key = place, key
+        return best
+
+
+def load_bundled_gazetteer(path: Path) -> Gazetteer:
+    """Gazetteer from the bundled CSV (place_id, name, country, admin1, admin1_name, coordinates, population, alternate_names)"""
+    gazetteer = Gazetteer()
+    with open(path, newline='', encoding='utf-8') as gazetteer_file:
+        for row in csv.DictReader(gazetteer_file):
+            place = Place(
+                row['place_id'], row['name'], row['country'], row['admin1'],
+                float(row['latitude']), float(row['longitude']), int(row['population'] or 0)
+            )
+            gazetteer.add(place, (row['alternate_names'] or '').split('|'), row['admin1_name'])
+    return gazetteer
+
+
+def load_geonames_gazetteer(path: Path) -> Gazetteer:
+    """
+    Gazetteer from a GeoNames cities dump (cities500/1000/5000/15000.txt,
+    tab-separated, from download.geonames.org/export/dump)
+
+    Place ids are "geonames:<geonameid>"; regions are matched by their
+    GeoNames admin1 code (US state abbreviations, numeric elsewhere).
+    """
+    gazetteer = Gazetteer()
+    with open(path, newline='', encoding='utf-8') as gazetteer_file:
+        for columns in csv.reader(gazetteer_file, delimiter='\t', quoting=csv.QUOTE_NONE):
+            if len(columns) < 15:
+                continue
+            place = Place(
+                f'geonames:{columns[0]}', columns[1], columns[8], columns[10],
+                float(columns[4]), float(columns[5]), int(columns[14] or 0)
+            )
+            # Alternate names include airport and postal codes; short ones only add ambiguity
+            alternates = [name for name in columns[3].split(',') if len(name) > 3]
+            gazetteer.add(place, [columns[2], *alternates])
+    return gazetteer
+
+
+@functools.lru_cache(maxsize=1)
+def get_gazetteer() -> Gazetteer:
+    """The process' gazetteer: GAZETTEER_PATH when set, otherwise the bundled city list"""
+    if settings.GAZETTEER_PATH:
+        gazetteer = load_geonames_gazetteer(Path(settings.GAZETTEER_PATH))
+    else:
+        gazetteer = load_bundled_gazetteer(BUNDLED_GAZETTEER)
+    logger.info(f"Loaded gazetteer with {len(gazetteer)} places")
+    return gazetteer
+
+
+@functools.lru_cache(maxsize=20000)
+def resolve_location(text: str) -> Optional[Place]:
+    """The gazetteer place a location string names, or None"""
+    if not (text or '').strip():
+        return None
+    return get_gazetteer().resolve(text)
+
+
+def place_fields(text: str) -> Dict[str, Any]:
+    """place_id, latitude and longitude model field values for a location string"""
+    place = resolve_location(text)
+    if place is None:
+        return {'place_id': '', 'latitude': None, 'longitude': None}
+    return {'place_id': place.place_id, 'latitude': place.latitude, 'longitude': place.longitude}
+
+
+def locate(instance):
+    """Set a model instance's place fields from its location; called before it is saved"""
+    for field, value in place_fields(instance.location).items():
+        setattr(instance, field, value)
+
+
+def haversine_km(latitude: float, longitude: float, latitudes, longitudes):
+    """Great-circle distance in km from one point to each of the given points (NumPy arrays or floats)"""
+    latitude, longitude = np.radians(latitude), np.radians(longitude)
+    latitudes, longitudes = np.radians(latitudes), np.radians(longitudes)
+    a = (np.sin((latitudes - latitude) / 2) ** 2 +
+         np.cos(latitude) * np.cos(latitudes) * np.sin((longitudes - longitude) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def bounding_box(latitude: float, longitude: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """
+    (min latitude, max latitude, min longitude, max longitude) of a box
+    holding every point within radius_km; the full longitude range when the
+    circle reaches a pole or crosses the antimeridian
+    """
+    angle = radius_km / EARTH_RADIUS_KM
+    min_latitude = latitude - math.degrees(angle)
+    max_latitude = latitude + math.degrees(angle)
+    if min_latitude <= -90 or max_latitude >= 90:
+        return max(min_latitude, -90.0), min(max_latitude, 90.0), -180.0, 180.0
+    spread = math.degrees(math.asin(min(math.sin(angle) / math.cos(math.radians(latitude)), 1.0)))
+    if longitude - spread < -180 or longitude + spread > 180:
+        return min_latitude, max_latitude, -180.0, 180.0
+    return min_latitude, max_latitude, longitude - spread, longitude + spread
+
+
+def distance_expression(latitude: float, longitude: float):
+    """
+    ORM expression for the great-circle distance in km from a point to each
+    row's latitude/longitude fields (NULL for rows without coordinates)
+    """
+    cosine = (
+        Sin(Radians('latitude')) * Value(math.sin(math.radians(latitude))) +
+        Cos(Radians('latitude')) * Value(math.cos(math.radians(latitude))) *
+        Cos(Radians('longitude') - Value(math.radians(longitude)))
+    )
+    # Rounding can push the cosine of a zero distance past 1
+    cosine = Least(Greatest(cosine, Value(-1.0)), Value(1.0), output_field=FloatField())
+    return ACos(cosine) * Value(EARTH_RADIUS_KM)
@@ -0,0 +1,21 @@
+"""
+Shared LLM access layer for CareerForge AI.
+
+All OpenAI traffic goes through a single gateway per worker process so that
+connections are pooled and kept alive across requests, and identical prompts
+are answered from a content-addressed response cache.
+"""
+from .cache import LLMResponseCache, get_response_cache
+from .gateway import LLMGateway, get_gateway, complete
+from .resilience import LLMUnavailableError, DeadlineExceededError, CircuitOpenError
+from .ratelimit import RateLimitedError
+from .prompts import PromptBuilder, PromptTemplate, compact_json, count_tokens, fit_messages_to_budget
+from .telemetry import LLMTelemetry, get_telemetry, record_fallback
+
+__all__ = [
+    'LLMGateway', 'get_gateway', 'complete',
+    'LLMResponseCache', 'get_response_cache',
+    'PromptBuilder', 'PromptTemplate', 'compact_json', 'count_tokens', 'fit_messages_to_budget',
+    'LLMUnavailableError', 'DeadlineExceededError', 'CircuitOpenError', 'RateLimitedError',
+    'LLMTelemetry', 'get_telemetry', 'record_fallback',
+]
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import threading
+import time
+import logging
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from typing import Dict, List, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(model: str, messages: List[Dict[str, str]], params: Dict[str, Any]) -> str:
+    """Content-address a completion request by hashing model, messages and sampling params"""
+    payload = json.dumps(
+        {'model': model, 'messages': messages, 'params': params},
+        sort_keys=True,
+        separators=(',', ':'),
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LRUCache:
+    """Bounded in-process LRU cache with per-entry expiry"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, expires_at: float):
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class LLMResponseCache:
+    """
+    Two-tier completion cache: a local LRU in front of an optional shared
+    Django cache (e.g. Redis) so workers can reuse each other's responses.
+    """
+
+    KEY_PREFIX = 'llm:response:'
+
+    def __init__(self, max_entries: int, shared_alias: str = ''):
+        self.local = LRUCache(max_entries)
+        self.shared_alias = shared_alias
+        self._stats_lock = threading.Lock()
+        self._stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'stores': 0}
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias] if self.shared_alias else None
+
+    def ttl_for(self, call_site: str) -> int:
+        """TTL in seconds for a call site; 0 means the call site is not cached"""
+        if not settings.LLM_CACHE_ENABLED:
+            return 0
+        return settings.LLM_CACHE_TTLS.get(call_site, settings.LLM_CACHE_DEFAULT_TTL)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.local.get(key)
+        if value is not None:
+            self._count('local_hits')
+            return value
+
+        if self.shared is not None:
+            try:
+                entry = self.shared.get(self.KEY_PREFIX + key)
+            except Exception as e:
+                logger.warning(f"Shared LLM cache unavailable: {str(e)}")
+                entry = None
+            if entry is not None:
+                self.local.set(key, entry['value'], entry['expires_at'])
+                self._count('shared_hits')
+                return entry['value']
+
+        self._count('misses')
+        return None
+
+    def set(self, key: str, value: Dict[str, Any], ttl: int):
+        expires_at = time.time() + ttl
+        self.local.set(key, value, expires_at)
+        if self.shared is not None:
+            try:
+                self.shared.set(self.KEY_PREFIX + key, {'expires_at': expires_at, 'value': value}, ttl)
+            except Exception as e:
+                logger.warning(f"Shared LLM cache unavailable: {str(e)}")
+        self._count('stores')
+
+    def clear(self):
+        self.local.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_rate'] = round((lookups - stats['misses']) / lookups, 4) if lookups else 0.0
+        stats['local_entries'] = len(self.local)
+        stats['shared_enabled'] = bool(self.shared_alias)
+        return stats
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> LLMResponseCache:
+    """Return the process-wide response cache"""
+    global _response_cache
+
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = LLMResponseCache(
+                    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+                    shared_alias=settings.LLM_CACHE_SHARED_ALIAS,
+                )
+    return _response_cache
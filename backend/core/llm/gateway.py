@@ -0,0 +1,344 @@
+import os
+import threading
+import time
+import logging
+import httpx
+import openai
+from django.conf import settings
+from typing import Dict, List, Any, Iterator, Optional
+from .cache import get_response_cache, make_cache_key
+from .prompts import count_message_tokens, count_tokens
+from .ratelimit import current_user_key, get_rate_limiter
+from .resilience import LLMUnavailableError, call_with_retries, call_hedged
+from .routing import resolve_route, tier_stats
+from .singleflight import get_single_flight
+from .telemetry import get_telemetry
+
+logger = logging.getLogger(__name__)
+
+
+class LLMGateway:
+    """Process-wide OpenAI client backed by a tuned, keep-alive httpx pool"""
+
+    def __init__(self, api_key: str, base_url: Optional[str] = None):
+        self.http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=settings.LLM_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_POOL_MAX_KEEPALIVE,
+                keepalive_expiry=settings.LLM_POOL_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(
+                settings.LLM_READ_TIMEOUT,
+                connect=settings.LLM_CONNECT_TIMEOUT,
+                pool=settings.LLM_POOL_TIMEOUT,
+            ),
+        )
+        self.client = openai.OpenAI(
+            api_key=api_key,
+            base_url=base_url or None,
+            http_client=self.http_client,
+            max_retries=settings.LLM_SDK_MAX_RETRIES,
+        )
+        self.cache = get_response_cache()
+        self.telemetry = get_telemetry()
+        self.single_flight = get_single_flight()
+        self.rate_limiter = get_rate_limiter()
+
+    def complete(self, messages: List[Dict[str, str]], model: Optional[str] = None,
+                 max_tokens: Optional[int] = None, temperature: float = 0.7,
+                 call_site: str = "default", cache_ttl: Optional[int] = None,
+                 **params) -> Dict[str, Any]:
+        """
+        Run a chat completion and return a plain, serializable result
+
+        Args:
+            messages: OpenAI chat messages
+            model: Model name; by default the call site's routed tier picks it
+            max_tokens: Completion token limit; defaults to the call site's route
+            temperature: Sampling temperature
+            call_site: Name of the calling feature, used for routing, cache TTLs and logging
+            cache_ttl: Override the call site's cache TTL in seconds (0 disables caching)
+            **params: Extra sampling parameters passed to the API
+
+        Returns:
+            Dictionary with content, model, tier, token usage (including provider-cached
+            prompt tokens), response time, cache status and whether the result was
+            shared with an identical in-flight call
+        """
+        route = self._route(call_site, model, max_tokens)
+        model = route['model']
+        max_tokens = route['max_tokens']
+
+        request_key = make_cache_key(
+            model, messages, dict(params, max_tokens=max_tokens, temperature=temperature)
+        )
+        ttl = self.cache.ttl_for(call_site) if cache_ttl is None else cache_ttl
+        if ttl > 0:
+            cached = self.cache.get(request_key)
+            if cached is not None:
+                self.telemetry.record_call(call_site, model, route['tier'], 0.0, cached=True)
+                return dict(cached, cached=True, response_time=0.0)
+
+        def call():
+            return self._call_api(call_site, route, messages, temperature, params,
+                                  cache_key=request_key if ttl > 0 else None, ttl=ttl)
+
+        if not settings.LLM_SINGLEFLIGHT_ENABLED:
+            return call()
+
+        # Identical concurrent requests (app retries, two devices) share one upstream call
+        result, source = self.single_flight.do(request_key, call)
+        if source != 'leader':
+            self.telemetry.record_coalesced(call_site, source)
+            return dict(result, coalesced=True)
+        return result
+
+    def _call_api(self, call_site: str, route: Dict[str, Any], messages: List[Dict[str, str]],
+                  temperature: float, params: Dict[str, Any], cache_key: Optional[str],
+                  ttl: int) -> Dict[str, Any]:
+        """Make the completion call, record stats and store the result in the response cache"""
+        model = route['model']
+        max_tokens = route['max_tokens']
+
+        reservation = self._reserve(call_site, route, messages)
+        # A failed call returns its whole estimate: nothing was generated
+        used_tokens = 0
+        try:
+            start_time = time.time()
+            try:
+                response = self._create(
+                    call_site,
+                    timeout=route['timeout'],
+                    hedged=call_site in settings.LLM_HEDGED_CALL_SITES,
+                    model=model,
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    **params
+                )
+            except Exception as e:
+                self._record_failure(call_site, route, time.time() - start_time, e)
+                raise
+            response_time = time.time() - start_time
+
+            usage = getattr(response, 'usage', None)
+            logger.debug(f"LLM call {call_site} ({model}) took {response_time:.2f}s")
+
+            result = {
+                'content': response.choices[0].message.content or '',
+                'model': response.model or model,
+                'tier': route['tier'],
+                'prompt_tokens': usage.prompt_tokens if usage else 0,
+                'completion_tokens': usage.completion_tokens if usage else 0,
+                'total_tokens': usage.total_tokens if usage else 0,
+                'cached_prompt_tokens': cached_prompt_tokens(usage),
+                'response_time': response_time,
+                'cached': False,
+                'coalesced': False,
+            }
+            used_tokens = result['total_tokens']
+
+            tier_stats.record(
+                route['tier'], response_time, result['prompt_tokens'], result['completion_tokens'],
+                downgraded=bool(route['downgraded_from'])
+            )
+            self.telemetry.record_call(
+                call_site, model, route['tier'], response_time,
+                result['prompt_tokens'], result['completion_tokens'],
+                cached_prompt_tokens=result['cached_prompt_tokens']
+            )
+
+            if cache_key and result['content']:
+                self.cache.set(cache_key, result, ttl)
+
+            return result
+        finally:
+            if reservation:
+                reservation.settle(used_tokens)
+
+    def stream(self, messages: List[Dict[str, str]], model: Optional[str] = None,
+               max_tokens: Optional[int] = None, temperature: float = 0.7,
+               call_site: str = "default", **params) -> Iterator[Dict[str, Any]]:
+        """
+        Stream a chat completion as it is generated
+
+        Yields {'type': 'delta', 'content': ...} events for each text fragment,
+        followed by a single {'type': 'done', ...} event carrying the model,
+        token usage, total response time and time to first token.
+        Streamed responses are never cached.
+        """
+        route = self._route(call_site, model, max_tokens)
+        model = route['model']
+        max_tokens = route['max_tokens']
+
+        reservation = self._reserve(call_site, route, messages)
+        start_time = time.time()
+        first_token_time = None
+        usage = None
+        response_model = model
+        streamed = []
+
+        # Retries and the breaker cover opening the stream, not a stream that fails midway
+        try:
+            response_stream = self._create(
+                call_site,
+                timeout=route['timeout'],
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=True,
+                stream_options={'include_usage': True},
+                **params
+            )
+        except Exception as e:
+            self._record_failure(call_site, route, time.time() - start_time, e)
+            if reservation:
+                reservation.settle(0)
+            raise
+        try:
+            for chunk in response_stream:
+                if chunk.model:
+                    response_model = chunk.model
+                if chunk.usage:
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    if first_token_time is None:
+                        first_token_time = time.time() - start_time
+                    streamed.append(delta)
+                    yield {'type': 'delta', 'content': delta}
+        except Exception as e:
+            self._record_failure(call_site, route, time.time() - start_time, e)
+            raise
+        finally:
+            response_stream.close()
+            # Also runs when the client disconnects and the generator is closed mid-stream
+            if reservation:
+                reservation.settle(usage.total_tokens if usage else streamed_tokens(messages, streamed))
+
+        response_time = time.time() - start_time
+        logger.debug(f"LLM stream {call_site} ({model}) took {response_time:.2f}s")
+
+        tier_stats.record(
+            route['tier'], response_time,
+            usage.prompt_tokens if usage else 0, usage.completion_tokens if usage else 0,
+            downgraded=bool(route['downgraded_from'])
+        )
+        self.telemetry.record_call(
+            call_site, model, route['tier'], response_time,
+            usage.prompt_tokens if usage else 0, usage.completion_tokens if usage else 0,
+            cached_prompt_tokens=cached_prompt_tokens(usage),
+            first_token_time=first_token_time
+        )
+
+        yield {
+            'type': 'done',
+            'model': response_model,
+            'tier': route['tier'],
+            'prompt_tokens': usage.prompt_tokens if usage else 0,
+            'completion_tokens': usage.completion_tokens if usage else 0,
+            'total_tokens': usage.total_tokens if usage else 0,
+            'cached_prompt_tokens': cached_prompt_tokens(usage),
+            'response_time': response_time,
+            'first_token_time': first_token_time or response_time,
+        }
+
+    def _route(self, call_site: str, model: Optional[str], max_tokens: Optional[int]) -> Dict[str, Any]:
+        """
+        Resolve the call site's route. An explicit model pins the call and skips
+        downgrades; an explicit max_tokens can only lower the route's limit.
+        """
+        route = resolve_route(call_site)
+        if model and model != route['model']:
+            route = dict(route, tier='pinned', model=model, downgraded_from=None)
+        if max_tokens:
+            route['max_tokens'] = min(max_tokens, route['max_tokens'])
+        return route
+
+    def _reserve(self, call_site: str, route: Dict[str, Any], messages: List[Dict[str, str]]):
+        """
+        Wait for rate-limit quota for a call of up to prompt + max_tokens tokens;
+        unused tokens are returned when the call settles.
+        """
+        if not settings.LLM_RATELIMIT_ENABLED:
+            return None
+        tokens = count_message_tokens(messages) + route['max_tokens']
+        try:
+            return self.rate_limiter.acquire(call_site, route['model'], tokens, user_key=current_user_key())
+        except LLMUnavailableError as e:
+            self._record_failure(call_site, route, 0.0, e)
+            raise
+
+    def _record_failure(self, call_site: str, route: Dict[str, Any], elapsed: float, error: Exception):
+        """Count a failed call; calls skipped by the deadline or breaker are 'unavailable'"""
+        outcome = 'unavailable' if isinstance(error, LLMUnavailableError) else 'error'
+        self.telemetry.record_call(call_site, route['model'], route['tier'], elapsed, outcome=outcome)
+
+    def _create(self, call_site: str, timeout: float, hedged: bool = False, **create_kwargs):
+        """Call the completions API with deadline-capped timeouts, retries, the circuit breaker and optional hedging"""
+        model = create_kwargs['model']
+
+        def attempt():
+            return call_with_retries(
+                lambda timeout: self.client.chat.completions.create(timeout=timeout, **create_kwargs),
+                model=model,
+                call_site=call_site,
+                default_timeout=timeout,
+            )
+
+        if hedged:
+            return call_hedged(attempt, settings.LLM_HEDGE_DELAY)
+        return attempt()
+
+    def close(self):
+        """Close pooled connections"""
+        self.http_client.close()
+
+
+def streamed_tokens(messages: List[Dict[str, str]], streamed: List[str]) -> int:
+    """Estimated tokens of a stream that ended without usage: the prompt and the text sent so far, or 0 for none"""
+    if not streamed:
+        return 0
+    return count_message_tokens(messages) + count_tokens(''.join(streamed))
+
+
+def cached_prompt_tokens(usage) -> int:
+    """Prompt tokens the provider served from its prefix cache, 0 if not reported"""
+    details = getattr(usage, 'prompt_tokens_details', None)
+    return getattr(details, 'cached_tokens', None) or 0
+
+
+_gateway = None
+_gateway_pid = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway() -> LLMGateway:
+    """
+    Return the gateway for the current process, creating it on first use.
+
+    The pid check rebuilds the pool after a fork so gunicorn workers never
+    share sockets inherited from the master process.
+    """
+    global _gateway, _gateway_pid
+
+    pid = os.getpid()
+    if _gateway is not None and _gateway_pid == pid:
+        return _gateway
+
+    with _gateway_lock:
+        if _gateway is None or _gateway_pid != pid:
+            _gateway = LLMGateway(
+                api_key=settings.OPENAI_API_KEY,
+                base_url=getattr(settings, 'OPENAI_BASE_URL', None),
+            )
+            _gateway_pid = pid
+    return _gateway
+
+
+def complete(messages: List[Dict[str, str]], **kwargs) -> Dict[str, Any]:
+    """Run a chat completion through the shared gateway"""
+    return get_gateway().complete(messages, **kwargs)
@@ -0,0 +1,250 @@
+import json
+import math
+import re
+import textwrap
+import threading
+import logging
+from django.conf import settings
+from typing import Dict, List, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+TRUNCATION_MARKER = "[...truncated]"
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    """Load the tiktoken encoding once; None if tiktoken or its BPE file is unavailable"""
+    global _encoding, _encoding_loaded
+
+    if not _encoding_loaded:
+        with _encoding_lock:
+            if not _encoding_loaded:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding('cl100k_base')
+                except Exception as e:
+                    logger.warning(f"tiktoken unavailable, estimating token counts: {str(e)}")
+                    _encoding = None
+                _encoding_loaded = True
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens offline with tiktoken, falling back to a ~4 chars/token estimate"""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / 4)
+
+
+def count_message_tokens(messages: List[Dict[str, str]]) -> int:
+    """Count tokens for a list of chat messages, including per-message overhead"""
+    return sum(count_tokens(message.get('content', '')) + 4 for message in messages) + 3
+
+
+def compact_json(data: Any) -> str:
+    """Serialize data for a prompt without indentation or padding whitespace"""
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False, default=str)
+
+
+def normalize_whitespace(text: str) -> str:
+    """Collapse runs of spaces and blank lines, e.g. in extracted resume text"""
+    text = re.sub(r'[ \t\r\f\v]+', ' ', text or '')
+    text = re.sub(r' ?\n ?', '\n', text)
+    return re.sub(r'\n{3,}', '\n\n', text).strip()
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text down to roughly max_tokens, preferring a line or word boundary"""
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    # Leave room for the marker so the result stays within max_tokens
+    keep_tokens = max_tokens - count_tokens(TRUNCATION_MARKER) - 1
+    if keep_tokens <= 0:
+        return ''
+
+    encoding = _get_encoding()
+    if encoding is not None:
+        truncated = encoding.decode(encoding.encode(text, disallowed_special=())[:keep_tokens])
+    else:
+        truncated = text[:keep_tokens * 4]
+
+    boundary = max(truncated.rfind('\n'), truncated.rfind(' '))
+    if boundary > len(truncated) * 0.8:
+        truncated = truncated[:boundary]
+    return truncated.rstrip() + f" {TRUNCATION_MARKER}"
+
+
+class PromptBuilder:
+    """
+    Assemble a prompt from named sections under a per-call-site token budget.
+
+    Sections are emitted in insertion order. When the prompt is over budget,
+    trimmable sections are cut back starting with the lowest priority until
+    it fits. Token counts before and after trimming are kept in ``stats``.
+    """
+
+    def __init__(self, call_site: str, budget: Optional[int] = None):
+        self.call_site = call_site
+        self.budget = budget or settings.LLM_PROMPT_BUDGETS.get(call_site, settings.LLM_PROMPT_DEFAULT_BUDGET)
+        self.sections = []
+        self.stats = {}
+
+    def add(self, name: str, text: str, priority: int = 100, trimmable: bool = False) -> 'PromptBuilder':
+        """
+        Add a section to the prompt
+
+        Args:
+            name: Section name, used in stats and logs
+            text: Section text; indentation is stripped
+            priority: Higher priority sections are trimmed last
+            trimmable: Whether the section may be shortened to fit the budget
+        """
+        self.sections.append({
+            'name': name,
+            'text': textwrap.dedent(text).strip(),
+            'priority': priority,
+            'trimmable': trimmable,
+        })
+        return self
+
+    def build(self) -> str:
+        """Return the prompt text, trimming low-value sections if over budget"""
+        for section in self.sections:
+            section['tokens'] = count_tokens(section['text'])
+
+        tokens_before = self._total_tokens()
+        overflow = tokens_before - self.budget
+        trimmed = []
+
+        if overflow > 0:
+            priorities = sorted({section['priority'] for section in self.sections if section['trimmable']})
+            for priority in priorities:
+                if overflow <= 0:
+                    break
+                group = [
+                    section for section in self.sections
+                    if section['trimmable'] and section['priority'] == priority
+                ]
+                for section, keep in zip(group, self._water_fill([s['tokens'] for s in group], overflow)):
+                    if keep >= section['tokens']:
+                        continue
+                    section['text'] = truncate_to_tokens(section['text'], keep)
+                    new_tokens = count_tokens(section['text'])
+                    overflow -= section['tokens'] - new_tokens
+                    section['tokens'] = new_tokens
+                    trimmed.append(section['name'])
+
+        tokens_after = self._total_tokens()
+        self.stats = {
+            'call_site': self.call_site,
+            'budget': self.budget,
+            'tokens_before': tokens_before,
+            'tokens_after': tokens_after,
+            'trimmed_sections': trimmed,
+        }
+
+        if trimmed:
+            logger.info(
+                f"Prompt for {self.call_site} trimmed from {tokens_before} to {tokens_after} tokens "
+                f"(budget {self.budget}, sections: {', '.join(trimmed)})"
+            )
+        elif tokens_after > self.budget:
+            logger.warning(f"Prompt for {self.call_site} is {tokens_after} tokens, over budget {self.budget}")
+
+        return "\n\n".join(section['text'] for section in self.sections if section['text'])
+
+    @staticmethod
+    def _water_fill(sizes: List[int], overflow: int) -> List[int]:
+        """
+        Share a token cut across equal-priority sections by lowering the largest
+        ones to a common ceiling, so short sections are left untouched.
+        """
+        if overflow >= sum(sizes):
+            return [0] * len(sizes)
+
+        ordered = sorted(sizes, reverse=True)
+        removed = 0
+        ceiling = ordered[0]
+        for index, size in enumerate(ordered):
+            next_size = ordered[index + 1] if index + 1 < len(ordered) else 0
+            step = (size - next_size) * (index + 1)
+            if removed + step >= overflow:
+                ceiling = size - math.ceil((overflow - removed) / (index + 1))
+                break
+            removed += step
+        return [min(size, ceiling) for size in sizes]
+
+    def _total_tokens(self) -> int:
+        # Account for the blank-line separators between sections
+        return sum(section['tokens'] for section in self.sections) + 2 * max(len(self.sections) - 1, 0)
+
+
+class PromptTemplate:
+    """
+    A prompt split into a static prefix and per-call data.
+
+    The static sections (role, instructions, output schema) are dedented and
+    joined once, when the template is defined, and sent as the system
+    message. Every call therefore starts with a byte-identical prefix that
+    the provider can serve from its prompt cache; user data follows in the
+    user message.
+    """
+
+    def __init__(self, call_site: str, *static_sections: str):
+        self.call_site = call_site
+        self.system = "\n\n".join(textwrap.dedent(section).strip() for section in static_sections)
+        self._system_tokens = None
+
+    @property
+    def system_tokens(self) -> int:
+        # Counted lazily so defining a template never loads the tokenizer
+        if self._system_tokens is None:
+            self._system_tokens = count_tokens(self.system)
+        return self._system_tokens
+
+    def builder(self, budget: Optional[int] = None) -> PromptBuilder:
+        """PromptBuilder for the per-call part, with the static prefix taken off the call site's budget"""
+        budget = budget or settings.LLM_PROMPT_BUDGETS.get(self.call_site, settings.LLM_PROMPT_DEFAULT_BUDGET)
+        return PromptBuilder(self.call_site, max(budget - self.system_tokens, 1))
+
+    def messages(self, user_content: str) -> List[Dict[str, str]]:
+        """Chat messages: the static prefix as the system message, then the per-call content"""
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": textwrap.dedent(user_content).strip()},
+        ]
+
+
+def fit_messages_to_budget(messages: List[Dict[str, str]], call_site: str,
+                           budget: Optional[int] = None) -> List[Dict[str, str]]:
+    """
+    Drop the oldest conversation turns until chat messages fit the budget.
+
+    The leading system message and the final user message are always kept.
+    """
+    budget = budget or settings.LLM_PROMPT_BUDGETS.get(call_site, settings.LLM_PROMPT_DEFAULT_BUDGET)
+    tokens_before = count_message_tokens(messages)
+    if tokens_before <= budget or len(messages) <= 2:
+        return messages
+
+    head = messages[:1] if messages[0].get('role') == 'system' else []
+    history = messages[len(head):-1]
+    tail = messages[-1:]
+
+    while history and count_message_tokens(head + history + tail) > budget:
+        history.pop(0)
+
+    fitted = head + history + tail
+    logger.info(
+        f"Chat context for {call_site} trimmed from {tokens_before} to "
+        f"{count_message_tokens(fitted)} tokens (budget {budget})"
+    )
+    return fitted
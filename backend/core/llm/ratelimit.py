@@ -0,0 +1,284 @@
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+import logging
+from django.conf import settings
+from typing import List, Optional
+from .resilience import LLMUnavailableError, remaining_time
+from .telemetry import get_telemetry
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 0
+NORMAL = 1
+BATCH = 2
+
+
+class RateLimitedError(LLMUnavailableError):
+    """The call could not get quota before its deadline"""
+
+
+# Django request being served, so the limiter can find the authenticated user
+# after DRF has run authentication (DRF copies request.user back onto it)
+_current_request = contextvars.ContextVar('llm_current_request', default=None)
+
+
+def set_current_request(request):
+    return _current_request.set(request)
+
+
+def reset_current_request(token):
+    _current_request.reset(token)
+
+
+def current_user_key() -> Optional[str]:
+    """Key of the authenticated user for the current request, or None"""
+    request = _current_request.get()
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return None
+    return str(user.pk)
+
+
+class LocalTokenBucket:
+    """Token bucket kept in this process"""
+
+    def __init__(self, capacity: float, per_second: float):
+        self.capacity = capacity
+        self.per_second = per_second
+        self.level = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, amount: float, reserve: float = 0.0) -> float:
+        """
+        Take amount if the bucket stays at or above reserve afterwards.
+
+        Returns 0 on success, otherwise the seconds until enough has refilled.
+        A negative amount returns unused tokens to the bucket.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.per_second)
+            self.updated = now
+            if amount > 0 and self.level - amount < reserve:
+                return (amount + reserve - self.level) / self.per_second
+            self.level = min(self.capacity, self.level - amount)
+            return 0.0
+
+
+class RedisTokenBucket:
+    """Token bucket stored in Redis so every worker draws from the same quota"""
+
+    SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local per_second = tonumber(ARGV[2])
+    local amount = tonumber(ARGV[3])
+    local reserve = tonumber(ARGV[4])
+    local now = tonumber(ARGV[5])
+    local state = redis.call('HMGET', KEYS[1], 'level', 'updated')
+    local level = tonumber(state[1]) or capacity
+    local updated = tonumber(state[2]) or now
+    level = math.min(capacity, level + math.max(0, now - updated) * per_second)
+    local wait = 0
+    if amount > 0 and level - amount < reserve then
+        wait = (amount + reserve - level) / per_second
+    else
+        level = math.min(capacity, level - amount)
+    end
+    redis.call('HSET', KEYS[1], 'level', level, 'updated', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / per_second) + 60)
+    return tostring(wait)
+    """
+
+    def __init__(self, client, key: str, capacity: float, per_second: float):
+        self.key = key
+        self.capacity = capacity
+        self.per_second = per_second
+        self.script = client.register_script(self.SCRIPT)
+        # Used while Redis is unreachable
+        self.fallback = LocalTokenBucket(capacity, per_second)
+
+    def take(self, amount: float, reserve: float = 0.0) -> float:
+        try:
+            return float(self.script(
+                keys=[self.key],
+                args=[self.capacity, self.per_second, amount, reserve, time.time()],
+            ))
+        except Exception as e:
+            logger.warning(f"Shared LLM rate limit unavailable, using local bucket: {str(e)}")
+            return self.fallback.take(amount, reserve)
+
+
+class Reservation:
+    """Token quota taken for one call; settle() returns what the call did not use"""
+
+    def __init__(self, token_buckets: List[tuple]):
+        # (bucket, tokens taken from it)
+        self.token_buckets = token_buckets
+
+    def settle(self, used_tokens: int):
+        for bucket, taken in self.token_buckets:
+            unused = taken - used_tokens
+            if unused > 0:
+                bucket.take(-unused)
+        self.token_buckets = []
+
+
+class LLMRateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute token buckets, globally per
+    model and per user.
+
+    A call first takes its user's quota, then waits in a priority queue for
+    the model's global quota: interactive calls are served before batch
+    work, and batch work may not draw the global buckets below a headroom
+    reserved for interactive traffic. Waiting stops at the request deadline.
+    """
+
+    def __init__(self, redis_url: str = ''):
+        self.redis = None
+        if redis_url:
+            import redis
+            self.redis = redis.Redis.from_url(redis_url)
+        self._buckets = {}
+        self._buckets_lock = threading.Lock()
+        self._queues = {}
+        self._condition = threading.Condition()
+        self._sequence = itertools.count()
+
+    def acquire(self, call_site: str, model: str, tokens: int,
+                user_key: Optional[str] = None) -> Reservation:
+        """
+        Wait for quota for one call of about ``tokens`` tokens
+
+        Raises:
+            RateLimitedError: if the quota is not available before the deadline
+        """
+        priority = settings.LLM_CALL_SITE_PRIORITIES.get(call_site, NORMAL)
+        remaining = remaining_time()
+        deadline = time.monotonic() + (settings.LLM_RATELIMIT_MAX_WAIT if remaining is None
+                                       else min(remaining, settings.LLM_RATELIMIT_MAX_WAIT))
+        start_time = time.monotonic()
+
+        user_taken = []
+        if user_key is not None:
+            user_rpm, user_tpm = self._user_buckets(user_key)
+            self._wait_for(
+                lambda: self._take_all([(user_rpm, 1, 0.0), (user_tpm, tokens, 0.0)], user_taken),
+                deadline, call_site
+            )
+
+        rpm, tpm = self._model_buckets(model)
+        reserve = settings.LLM_RATELIMIT_BATCH_HEADROOM if priority >= BATCH else 0.0
+        ticket = (priority, next(self._sequence))
+        queue = self._queues.setdefault(model, [])
+        global_taken = []
+
+        with self._condition:
+            heapq.heappush(queue, ticket)
+            try:
+                while True:
+                    wait = None
+                    if queue[0] == ticket:
+                        wait = self._take_all(
+                            [(rpm, 1, reserve * rpm.capacity), (tpm, tokens, reserve * tpm.capacity)],
+                            global_taken,
+                        )
+                        if wait == 0:
+                            heapq.heappop(queue)
+                            self._condition.notify_all()
+                            break
+                    left = deadline - time.monotonic()
+                    if left <= 0 or (wait is not None and wait > left):
+                        raise RateLimitedError(f"No LLM quota for {call_site} ({model}) before the deadline")
+                    self._condition.wait(min(wait, left) if wait is not None else left)
+            except BaseException:
+                if ticket in queue:
+                    queue.remove(ticket)
+                    heapq.heapify(queue)
+                    self._condition.notify_all()
+                for bucket, amount in user_taken:
+                    bucket.take(-amount)
+                raise
+
+        waited = time.monotonic() - start_time
+        get_telemetry().record_queue_wait(call_site, waited)
+        if waited > 1:
+            logger.info(f"LLM call {call_site} ({model}) waited {waited:.2f}s for quota")
+
+        # Request buckets are spent for good; token buckets get unused tokens back
+        return Reservation(global_taken[1:] + user_taken[1:])
+
+    def _take_all(self, requests: List[tuple], taken: List[tuple]) -> float:
+        """
+        Take (bucket, amount, reserve) from every bucket or from none.
+
+        Returns 0 on success or the wait before the first short bucket has
+        refilled; ``taken`` receives the (bucket, amount) pairs taken.
+        """
+        taken.clear()
+        for bucket, amount, reserve in requests:
+            # A call larger than the whole bucket waits for a full bucket instead of forever
+            amount = min(amount, bucket.capacity - reserve)
+            wait = bucket.take(amount, reserve)
+            if wait > 0:
+                for done_bucket, done_amount in taken:
+                    done_bucket.take(-done_amount)
+                taken.clear()
+                return wait
+            taken.append((bucket, amount))
+        return 0.0
+
+    def _wait_for(self, attempt, deadline: float, call_site: str):
+        while True:
+            wait = attempt()
+            if wait == 0:
+                return
+            left = deadline - time.monotonic()
+            if wait > left:
+                raise RateLimitedError(f"Per-user LLM quota exhausted for {call_site}")
+            time.sleep(wait)
+
+    def _model_buckets(self, model: str) -> tuple:
+        limits = next(
+            (tier for tier in settings.LLM_MODEL_TIERS.values() if tier['model'] == model), {}
+        )
+        return (
+            self._bucket(f'model:{model}:rpm', limits.get('rpm', settings.LLM_GLOBAL_RPM)),
+            self._bucket(f'model:{model}:tpm', limits.get('tpm', settings.LLM_GLOBAL_TPM)),
+        )
+
+    def _user_buckets(self, user_key: str) -> tuple:
+        return (
+            self._bucket(f'user:{user_key}:rpm', settings.LLM_USER_RPM),
+            self._bucket(f'user:{user_key}:tpm', settings.LLM_USER_TPM),
+        )
+
+    def _bucket(self, name: str, per_minute: int):
+        with self._buckets_lock:
+            bucket = self._buckets.get(name)
+            if bucket is None:
+                if self.redis is not None:
+                    bucket = RedisTokenBucket(self.redis, f'llm:ratelimit:{name}', per_minute, per_minute / 60.0)
+                else:
+                    bucket = LocalTokenBucket(per_minute, per_minute / 60.0)
+                self._buckets[name] = bucket
+            return bucket
+
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> LLMRateLimiter:
+    """Return the process-wide rate limiter"""
+    global _rate_limiter
+
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                _rate_limiter = LLMRateLimiter(redis_url=settings.LLM_RATELIMIT_REDIS_URL)
+    return _rate_limiter
@@ -0,0 +1,241 @@
+import contextvars
+import random
+import threading
+import time
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import openai
+from django.conf import settings
+from typing import Any, Callable, Dict, Optional
+from .telemetry import get_telemetry
+
+logger = logging.getLogger(__name__)
+
+
+class LLMUnavailableError(Exception):
+    """Raised when an LLM call is skipped or abandoned; callers use their fallback"""
+
+
+class DeadlineExceededError(LLMUnavailableError):
+    """The request deadline leaves no time for an LLM call"""
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """The circuit breaker for a model is open"""
+
+
+# Deadline (absolute time.monotonic() value) for the HTTP request being served
+_request_deadline = contextvars.ContextVar('llm_request_deadline', default=None)
+
+
+def set_request_deadline(seconds: float):
+    """Start a deadline for the current request; returns a token for reset_request_deadline"""
+    return _request_deadline.set(time.monotonic() + seconds)
+
+
+def reset_request_deadline(token):
+    _request_deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """Seconds left before the current request's deadline, or None if there is none"""
+    deadline = _request_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def call_timeout(default: float) -> float:
+    """Timeout for one LLM call: the configured timeout capped by the request deadline"""
+    remaining = remaining_time()
+    if remaining is None:
+        return default
+    if remaining < settings.LLM_MIN_CALL_TIME:
+        raise DeadlineExceededError(f"Only {remaining:.2f}s left before the request deadline")
+    return min(default, remaining)
+
+
+def is_retryable(error: Exception) -> bool:
+    """Connection problems, timeouts, rate limits and server errors are worth retrying"""
+    if isinstance(error, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in (408, 409) or error.status_code >= 500
+    return False
+
+
+def backoff_delay(attempt: int, error: Optional[Exception] = None) -> float:
+    """Exponential backoff with full jitter, honouring Retry-After on rate limits"""
+    ceiling = min(settings.LLM_RETRY_MAX_DELAY, settings.LLM_RETRY_BASE_DELAY * (2 ** attempt))
+    delay = random.uniform(0, ceiling)
+
+    response = getattr(error, 'response', None)
+    if response is not None:
+        try:
+            retry_after = float(response.headers.get('retry-after', 0))
+        except (TypeError, ValueError):
+            retry_after = 0
+        delay = max(delay, min(retry_after, settings.LLM_RETRY_MAX_DELAY))
+    return delay
+
+
+class CircuitBreaker:
+    """
+    Rolling-window circuit breaker.
+
+    Opens when the failure rate over the last ``window_size`` calls reaches
+    ``failure_threshold`` (with at least ``min_calls`` recorded), fails fast
+    while open, and lets a single probe through after ``cooldown`` seconds.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, window_size: int, min_calls: int,
+                 failure_threshold: float, cooldown: float):
+        self.name = name
+        self.window_size = window_size
+        self.min_calls = min_calls
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self._outcomes = deque(maxlen=window_size)
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                logger.info(f"Circuit breaker for {self.name} closed")
+                self.state = self.CLOSED
+                self._outcomes.clear()
+            self._outcomes.append(True)
+
+    def record_failure(self):
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._trip()
+                return
+            self._outcomes.append(False)
+            failures = self._outcomes.count(False)
+            if (self.state == self.CLOSED and len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.failure_threshold):
+                self._trip()
+
+    def _trip(self):
+        logger.warning(f"Circuit breaker for {self.name} opened")
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+        self._outcomes.clear()
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self.state == self.OPEN and time.monotonic() - self._opened_at < self.cooldown
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(model: str) -> CircuitBreaker:
+    """Return the process-wide circuit breaker for a model"""
+    with _breakers_lock:
+        if model not in _breakers:
+            _breakers[model] = CircuitBreaker(
+                name=model,
+                window_size=settings.LLM_BREAKER_WINDOW,
+                min_calls=settings.LLM_BREAKER_MIN_CALLS,
+                failure_threshold=settings.LLM_BREAKER_FAILURE_RATE,
+                cooldown=settings.LLM_BREAKER_COOLDOWN,
+            )
+        return _breakers[model]
+
+
+def call_with_retries(func: Callable[[float], Any], model: str, call_site: str,
+                      default_timeout: float) -> Any:
+    """
+    Call func(timeout) under the model's circuit breaker, retrying retryable
+    errors with jittered exponential backoff while the request deadline allows.
+    """
+    breaker = get_circuit_breaker(model)
+    attempt = 0
+
+    while True:
+        # Before the breaker grants a call: a half-open probe must always record an outcome
+        timeout = call_timeout(default_timeout)
+        if not breaker.allow_request():
+            raise CircuitOpenError(f"Circuit breaker open for {model}")
+
+        try:
+            result = func(timeout)
+        except Exception as e:
+            if not is_retryable(e):
+                # Caller errors (bad request, auth) say nothing about provider health
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+
+            if attempt >= settings.LLM_MAX_RETRIES:
+                raise
+            delay = backoff_delay(attempt, e)
+            remaining = remaining_time()
+            if remaining is not None and remaining - delay < settings.LLM_MIN_CALL_TIME:
+                raise
+            logger.warning(
+                f"LLM call {call_site} ({model}) failed with {type(e).__name__}, "
+                f"retry {attempt + 1}/{settings.LLM_MAX_RETRIES} in {delay:.2f}s"
+            )
+            get_telemetry().record_retry(call_site, model, e)
+            time.sleep(delay)
+            attempt += 1
+            continue
+
+        breaker.record_success()
+        return result
+
+
+_hedge_executor = ThreadPoolExecutor(thread_name_prefix='llm-hedge')
+
+
+def call_hedged(func: Callable[[], Any], hedge_delay: float) -> Any:
+    """
+    Run func, and if it hasn't finished after hedge_delay seconds start an
+    identical backup call; return whichever succeeds first.
+    """
+    futures = [_hedge_executor.submit(contextvars.copy_context().run, func)]
+    done, _ = wait(futures, timeout=hedge_delay)
+    if not done:
+        futures.append(_hedge_executor.submit(contextvars.copy_context().run, func))
+
+    pending = set(futures)
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+def breaker_states() -> Dict[str, str]:
+    """Current state of every circuit breaker, keyed by model"""
+    with _breakers_lock:
+        return {model: breaker.state for model, breaker in _breakers.items()}
@@ -0,0 +1,83 @@
+import threading
+import logging
+from django.conf import settings
+from typing import Dict, Any
+from .resilience import get_circuit_breaker, remaining_time
+
+logger = logging.getLogger(__name__)
+
+
+def resolve_route(call_site: str) -> Dict[str, Any]:
+    """
+    Pick the model tier, model, max_tokens and timeout for a task.
+
+    The task's configured tier is downgraded along its ``downgrade_to`` chain
+    while that tier's circuit breaker is open or the request deadline leaves
+    less time than the tier typically needs.
+    """
+    tiers = settings.LLM_MODEL_TIERS
+    task = settings.LLM_TASK_ROUTES.get(call_site, settings.LLM_TASK_ROUTES['default'])
+    tier_name = task['tier']
+    downgraded_from = None
+
+    remaining = remaining_time()
+    while True:
+        tier = tiers[tier_name]
+        next_tier = tier.get('downgrade_to')
+        if not next_tier:
+            break
+        if get_circuit_breaker(tier['model']).is_open:
+            reason = 'circuit breaker open'
+        elif remaining is not None and remaining < tier.get('min_time', 0):
+            reason = f'{remaining:.1f}s left before deadline'
+        else:
+            break
+        logger.info(f"Routing {call_site} from {tier_name} to {next_tier} tier ({reason})")
+        downgraded_from = downgraded_from or tier_name
+        tier_name = next_tier
+
+    tier = tiers[tier_name]
+    return {
+        'tier': tier_name,
+        'model': tier['model'],
+        'max_tokens': min(task['max_tokens'], tier.get('max_tokens', task['max_tokens'])),
+        'timeout': tier['timeout'],
+        'downgraded_from': downgraded_from,
+    }
+
+
+class TierStats:
+    """Per-tier call counts, latency and token totals for this worker"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tiers = {}
+
+    def record(self, tier: str, latency: float, prompt_tokens: int, completion_tokens: int,
+               downgraded: bool = False):
+        with self._lock:
+            stats = self._tiers.setdefault(tier, {
+                'calls': 0,
+                'downgraded_calls': 0,
+                'total_latency': 0.0,
+                'max_latency': 0.0,
+                'prompt_tokens': 0,
+                'completion_tokens': 0,
+            })
+            stats['calls'] += 1
+            stats['downgraded_calls'] += int(downgraded)
+            stats['total_latency'] += latency
+            stats['max_latency'] = max(stats['max_latency'], latency)
+            stats['prompt_tokens'] += prompt_tokens
+            stats['completion_tokens'] += completion_tokens
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            snapshot = {}
+            for tier, stats in self._tiers.items():
+                snapshot[tier] = dict(stats)
+                snapshot[tier]['avg_latency'] = round(stats['total_latency'] / stats['calls'], 4)
+            return snapshot
+
+
+tier_stats = TierStats()
@@ -0,0 +1,151 @@
+import threading
+import time
+import uuid
+import logging
+from django.conf import settings
+from django.core.cache import caches
+from typing import Any, Callable, Tuple
+from .resilience import DeadlineExceededError, remaining_time
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """One in-progress call that other threads can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce identical concurrent calls so only one reaches the API.
+
+    Within a process the first caller for a key runs the call and later
+    callers wait for its result. With a shared Django cache (Redis) the
+    in-process leader also takes a short lock there; leaders in other
+    workers then poll for the result instead of calling the API themselves.
+    """
+
+    LOCK_PREFIX = 'llm:flight:lock:'
+    RESULT_PREFIX = 'llm:flight:result:'
+
+    def __init__(self, shared_alias: str = ''):
+        self.shared_alias = shared_alias
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias] if self.shared_alias else None
+
+    def do(self, key: str, func: Callable[[], Any]) -> Tuple[Any, str]:
+        """
+        Run func once per key across concurrent callers
+
+        Returns:
+            (result, source) where source is 'leader' if this caller ran func,
+            'local' if it shared another thread's call and 'shared' if it used
+            a result produced by another worker
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            if not flight.done.wait(self._wait_timeout()):
+                raise DeadlineExceededError("Timed out waiting for an identical in-flight LLM call")
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, 'local'
+
+        try:
+            flight.result, source = self._run(key, func)
+            return flight.result, source
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _run(self, key: str, func: Callable[[], Any]) -> Tuple[Any, str]:
+        shared = self.shared
+        if shared is None:
+            return func(), 'leader'
+
+        token = uuid.uuid4().hex
+        lock_key = self.LOCK_PREFIX + key
+        result_key = self.RESULT_PREFIX + key
+        try:
+            acquired = shared.add(lock_key, token, timeout=settings.LLM_SINGLEFLIGHT_LOCK_TTL)
+        except Exception as e:
+            logger.warning(f"Shared single-flight lock unavailable: {str(e)}")
+            return func(), 'leader'
+
+        if acquired:
+            try:
+                result = func()
+                try:
+                    shared.set(result_key, result, timeout=settings.LLM_SINGLEFLIGHT_RESULT_TTL)
+                except Exception as e:
+                    logger.warning(f"Could not publish single-flight result: {str(e)}")
+                return result, 'leader'
+            finally:
+                try:
+                    if shared.get(lock_key) == token:
+                        shared.delete(lock_key)
+                except Exception:
+                    pass
+
+        # Another worker holds the lock: wait for it to publish its result
+        deadline = time.monotonic() + self._wait_timeout()
+        try:
+            while time.monotonic() < deadline:
+                result = shared.get(result_key)
+                if result is not None:
+                    return result, 'shared'
+                if shared.get(lock_key) is None:
+                    # The holder failed or gave up without a result; make the call here
+                    break
+                time.sleep(settings.LLM_SINGLEFLIGHT_POLL_INTERVAL)
+            else:
+                raise DeadlineExceededError("Timed out waiting for an identical LLM call in another worker")
+        except DeadlineExceededError:
+            raise
+        except Exception as e:
+            logger.warning(f"Shared single-flight wait failed: {str(e)}")
+        return func(), 'leader'
+
+    @staticmethod
+    def _wait_timeout() -> float:
+        remaining = remaining_time()
+        if remaining is None:
+            return settings.LLM_SINGLEFLIGHT_LOCK_TTL
+        return max(remaining, 0.0)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._flights)
+
+
+_single_flight = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    """Return the process-wide single-flight group"""
+    global _single_flight
+
+    if _single_flight is None:
+        with _single_flight_lock:
+            if _single_flight is None:
+                _single_flight = SingleFlight(
+                    shared_alias=settings.LLM_CACHE_SHARED_ALIAS if settings.LLM_SINGLEFLIGHT_SHARED else ''
+                )
+    return _single_flight
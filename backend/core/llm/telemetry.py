@@ -0,0 +1,207 @@
+import bisect
+import threading
+import logging
+from django.conf import settings
+from typing import Dict, List, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = 'careerforge_llm'
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with a fixed set of label names"""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple[str, ...], amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def collect(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}')
+        return lines
+
+    def snapshot(self) -> Dict[Tuple[str, ...], float]:
+        with self._lock:
+            return dict(self._values)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus exposition layout"""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...], buckets: List[float]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = sorted(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+            series['counts'][bisect.bisect_left(self.buckets, value)] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def collect(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + [float('inf')], series['counts']):
+                    cumulative += count
+                    le = _format_labels(self.label_names, labels, f'le="{_format_value(float(bound))}"')
+                    lines.append(f'{self.name}_bucket{le} {cumulative}')
+                label_text = _format_labels(self.label_names, labels)
+                lines.append(f'{self.name}_sum{label_text} {_format_value(series["sum"])}')
+                lines.append(f'{self.name}_count{label_text} {series["count"]}')
+        return lines
+
+
+class LLMTelemetry:
+    """
+    In-process counters and histograms for every LLM call.
+
+    Each worker process keeps its own numbers; Prometheus scrapes every
+    worker and sums across instances.
+    """
+
+    def __init__(self, latency_buckets: Optional[List[float]] = None):
+        buckets = latency_buckets or settings.LLM_LATENCY_BUCKETS
+        self.requests = Counter(
+            f'{METRIC_PREFIX}_requests_total',
+            'LLM completion calls by call site, model, outcome and cache result',
+            ('call_site', 'model', 'tier', 'outcome', 'cache'),
+        )
+        self.latency = Histogram(
+            f'{METRIC_PREFIX}_request_duration_seconds',
+            'Wall time of LLM completion calls that reached the API, including retries',
+            ('call_site', 'model'), buckets,
+        )
+        self.first_token = Histogram(
+            f'{METRIC_PREFIX}_time_to_first_token_seconds',
+            'Time to the first streamed token',
+            ('call_site', 'model'), buckets,
+        )
+        self.queue_wait = Histogram(
+            f'{METRIC_PREFIX}_queue_wait_seconds',
+            'Time spent waiting for rate-limit quota before calling the API',
+            ('call_site',), buckets,
+        )
+        self.tokens = Counter(
+            f'{METRIC_PREFIX}_tokens_total',
+            'Tokens reported by the API, by call site, model and kind (prompt, completion, cached_prompt)',
+            ('call_site', 'model', 'kind'),
+        )
+        self.retries = Counter(
+            f'{METRIC_PREFIX}_retries_total',
+            'Retried LLM API attempts',
+            ('call_site', 'model', 'error'),
+        )
+        self.coalesced = Counter(
+            f'{METRIC_PREFIX}_coalesced_total',
+            'Calls answered by an identical in-flight call, in this worker (local) or another (shared)',
+            ('call_site', 'scope'),
+        )
+        self.fallbacks = Counter(
+            f'{METRIC_PREFIX}_fallbacks_total',
+            'Responses served from a local fallback instead of the LLM',
+            ('call_site',),
+        )
+
+    def record_call(self, call_site: str, model: str, tier: str, latency: float,
+                    prompt_tokens: int = 0, completion_tokens: int = 0, cached: bool = False,
+                    outcome: str = 'success', first_token_time: Optional[float] = None,
+                    cached_prompt_tokens: int = 0):
+        """Record one completion call; cache hits count as requests but not as latency or tokens"""
+        self.requests.inc((call_site, model, tier, outcome, 'hit' if cached else 'miss'))
+        if cached:
+            return
+        self.latency.observe((call_site, model), latency)
+        if first_token_time is not None:
+            self.first_token.observe((call_site, model), first_token_time)
+        if prompt_tokens:
+            self.tokens.inc((call_site, model, 'prompt'), prompt_tokens)
+        if completion_tokens:
+            self.tokens.inc((call_site, model, 'completion'), completion_tokens)
+        if cached_prompt_tokens:
+            # A subset of the prompt tokens: served from the provider's prefix cache
+            self.tokens.inc((call_site, model, 'cached_prompt'), cached_prompt_tokens)
+
+    def record_queue_wait(self, call_site: str, seconds: float):
+        self.queue_wait.observe((call_site,), seconds)
+
+    def record_retry(self, call_site: str, model: str, error: Exception):
+        self.retries.inc((call_site, model, type(error).__name__))
+
+    def record_coalesced(self, call_site: str, scope: str):
+        self.coalesced.inc((call_site, scope))
+
+    def record_fallback(self, call_site: str):
+        self.fallbacks.inc((call_site,))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        from .resilience import breaker_states
+
+        lines = []
+        for metric in (self.requests, self.latency, self.first_token, self.queue_wait, self.tokens, self.retries,
+                       self.coalesced, self.fallbacks):
+            lines.extend(metric.collect())
+
+        name = f'{METRIC_PREFIX}_circuit_breaker_open'
+        lines.append(f'# HELP {name} 1 while the circuit breaker for a model is open')
+        lines.append(f'# TYPE {name} gauge')
+        for model, state in sorted(breaker_states().items()):
+            lines.append(f'{name}{_format_labels(("model",), (model,))} {int(state == "open")}')
+
+        return '\n'.join(lines) + '\n'
+
+
+_telemetry = None
+_telemetry_lock = threading.Lock()
+
+
+def get_telemetry() -> LLMTelemetry:
+    """Return the process-wide telemetry registry"""
+    global _telemetry
+
+    if _telemetry is None:
+        with _telemetry_lock:
+            if _telemetry is None:
+                _telemetry = LLMTelemetry()
+    return _telemetry
+
+
+def record_fallback(call_site: str):
+    """Count a response served from a local fallback"""
+    get_telemetry().record_fallback(call_site)
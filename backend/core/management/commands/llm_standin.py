@@ -0,0 +1,326 @@
+import json
+import math
+import os
+import random
+import threading
+import time
+import uuid
+import httpx
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core.llm.cache import make_cache_key
+from core.llm.prompts import count_tokens
+
+FILLER_TEXT = (
+    "This is a synthetic response from the CareerForge local LLM stand-in. "
+    "It lets you benchmark endpoints without calling the real API. "
+)
+
+
+class StandInConfig:
+    """Runtime options shared by all request handlers"""
+
+    def __init__(self, options):
+        self.mode = options['mode']
+        self.latency_dist = options['latency_dist']
+        self.latency_ms = options['latency_ms']
+        self.latency_stddev_ms = options['latency_stddev_ms']
+        self.tokens_per_second = options['tokens_per_second']
+        self.completion_tokens = options['completion_tokens']
+        self.error_rate = options['error_rate']
+        self.error_statuses = [int(code) for code in options['error_status'].split(',') if code]
+        self.fixtures_dir = options['fixtures_dir']
+        self.upstream_url = options['upstream_url'].rstrip('/')
+        self.replay_miss = options['replay_miss']
+        self.random = random.Random(options['seed'])
+        self.random_lock = threading.Lock()
+        self.seen_prefixes = set()
+        self.upstream = httpx.Client(timeout=settings.LLM_READ_TIMEOUT) if self.mode == 'record' else None
+
+    def sample_latency(self) -> float:
+        """Time to first token in seconds, drawn from the configured distribution"""
+        mean = self.latency_ms / 1000.0
+        stddev = self.latency_stddev_ms / 1000.0
+        with self.random_lock:
+            if self.latency_dist == 'fixed':
+                value = mean
+            elif self.latency_dist == 'uniform':
+                value = self.random.uniform(max(mean - stddev, 0), mean + stddev)
+            elif self.latency_dist == 'normal':
+                value = self.random.gauss(mean, stddev)
+            else:
+                # Lognormal with the requested mean and stddev: long tail like a real provider
+                if mean > 0:
+                    sigma2 = math.log(1 + (stddev / mean) ** 2)
+                    value = self.random.lognormvariate(math.log(mean) - sigma2 / 2, math.sqrt(sigma2))
+                else:
+                    value = 0.0
+        return max(value, 0.0)
+
+    def should_fail(self):
+        with self.random_lock:
+            if self.error_statuses and self.random.random() < self.error_rate:
+                return self.random.choice(self.error_statuses)
+        return None
+
+    def cached_prefix_tokens(self, messages) -> int:
+        """
+        Mimic provider prompt caching: a system message seen before is reported
+        as cached in 128-token steps once it is at least 1024 tokens long.
+        """
+        if not messages or messages[0].get('role') != 'system':
+            return 0
+        prefix = messages[0].get('content', '')
+        tokens = count_tokens(prefix)
+        with self.random_lock:
+            seen = prefix in self.seen_prefixes
+            self.seen_prefixes.add(prefix)
+        if not seen or tokens < 1024:
+            return 0
+        return tokens // 128 * 128
+
+    def fixture_path(self, key: str) -> str:
+        return os.path.join(self.fixtures_dir, f"{key}.json")
+
+
+def request_key(body):
+    """Fixture key: the same content hash the gateway uses for its response cache"""
+    params = {
+        name: value for name, value in body.items()
+        if name not in ('model', 'messages', 'stream', 'stream_options')
+    }
+    return make_cache_key(body.get('model', ''), body.get('messages', []), params)
+
+
+def synthetic_content(body, config) -> str:
+    """
+    Echo the JSON example embedded in the prompt when there is one, so call
+    sites parse realistic structures; otherwise return filler text.
+    """
+    # Output schemas usually sit in the static system prefix, so look there too
+    for message in reversed(body.get('messages', [])):
+        prompt = message.get('content', '')
+        # Try the outermost bracket first so an array of objects isn't read as one object
+        pairs = sorted((('{', '}'), ('[', ']')), key=lambda pair: prompt.find(pair[0]) % (len(prompt) + 1))
+        for opener, closer in pairs:
+            start = prompt.find(opener)
+            end = prompt.rfind(closer) + 1
+            if start != -1 and end > start:
+                try:
+                    return json.dumps(json.loads(prompt[start:end]))
+                except ValueError:
+                    continue
+
+    target = min(config.completion_tokens, body.get('max_tokens') or config.completion_tokens)
+    text = ''
+    while count_tokens(text) < target:
+        text += FILLER_TEXT
+    return text
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    config = None
+    stdout = None
+
+    def log_message(self, format, *args):
+        self.stdout.write(f"{self.address_string()} - {format % args}")
+
+    def do_GET(self):
+        if self.path.rstrip('/').endswith('/models'):
+            self._send_json(200, {'object': 'list', 'data': [{'id': 'stand-in', 'object': 'model'}]})
+        else:
+            self._send_json(404, {'error': {'message': 'Not found', 'type': 'invalid_request_error'}})
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json(404, {'error': {'message': 'Not found', 'type': 'invalid_request_error'}})
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length) or b'{}')
+        config = self.config
+
+        status = config.should_fail()
+        if status:
+            time.sleep(config.sample_latency())
+            headers = {'Retry-After': '1'} if status == 429 else {}
+            self._send_json(status, {
+                'error': {'message': f'Injected error {status}', 'type': 'server_error' if status >= 500 else 'requests'}
+            }, headers)
+            return
+
+        key = request_key(body)
+        content = None
+        model = body.get('model', 'stand-in')
+        latency = config.sample_latency()
+
+        if config.mode in ('replay', 'record') and os.path.exists(config.fixture_path(key)):
+            with open(config.fixture_path(key)) as fixture:
+                content = json.load(fixture)['response']['choices'][0]['message']['content']
+        elif config.mode == 'record':
+            content, model, latency = self._record(body, key)
+        elif config.mode == 'replay' and config.replay_miss == 'error':
+            self._send_json(404, {'error': {'message': f'No fixture for {key}', 'type': 'invalid_request_error'}})
+            return
+
+        if content is None:
+            content = synthetic_content(body, config)
+
+        prompt_tokens = sum(count_tokens(message.get('content', '')) + 4 for message in body.get('messages', [])) + 3
+        completion_tokens = count_tokens(content)
+        usage = {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens,
+            'prompt_tokens_details': {'cached_tokens': config.cached_prefix_tokens(body.get('messages', []))},
+        }
+
+        if body.get('stream'):
+            include_usage = (body.get('stream_options') or {}).get('include_usage', False)
+            self._stream(model, content, usage if include_usage else None, latency)
+            return
+
+        time.sleep(latency + completion_tokens / config.tokens_per_second)
+        self._send_json(200, {
+            'id': f'chatcmpl-{uuid.uuid4().hex}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop',
+            }],
+            'usage': usage,
+        })
+
+    def _record(self, body, key):
+        """Forward to the real API, save the response as a fixture and return it"""
+        config = self.config
+        upstream_body = dict(body, stream=False)
+        upstream_body.pop('stream_options', None)
+
+        start_time = time.time()
+        response = config.upstream.post(
+            f"{config.upstream_url}/chat/completions",
+            json=upstream_body,
+            headers={'Authorization': f"Bearer {settings.OPENAI_API_KEY}"},
+        )
+        latency = time.time() - start_time
+        response.raise_for_status()
+        data = response.json()
+
+        os.makedirs(config.fixtures_dir, exist_ok=True)
+        with open(config.fixture_path(key), 'w') as fixture:
+            json.dump({'request': upstream_body, 'response': data, 'latency': latency}, fixture, indent=2)
+        self.stdout.write(f"Recorded fixture {key}")
+
+        # The real call already took its time; don't add synthetic latency on top
+        return data['choices'][0]['message']['content'], data.get('model', body.get('model')), 0.0
+
+    def _stream(self, model, content, usage, latency):
+        """Send content as OpenAI-style SSE chunks paced at the configured token rate"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        completion_id = f'chatcmpl-{uuid.uuid4().hex}'
+        created = int(time.time())
+
+        def chunk(delta, finish_reason=None, chunk_usage=None):
+            payload = {
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'created': created,
+                'model': model,
+                'choices': [] if chunk_usage else [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}],
+            }
+            if chunk_usage:
+                payload['usage'] = chunk_usage
+            self._write_chunk(f"data: {json.dumps(payload)}\n\n")
+
+        time.sleep(latency)
+        # Roughly one token per four characters
+        pieces = [content[i:i + 4] for i in range(0, len(content), 4)]
+        chunk({'role': 'assistant', 'content': ''})
+        for piece in pieces:
+            chunk({'content': piece})
+            time.sleep(1.0 / self.config.tokens_per_second)
+        chunk({}, finish_reason='stop')
+        if usage:
+            chunk({}, chunk_usage=usage)
+        self._write_chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _write_chunk(self, text):
+        data = text.encode('utf-8')
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a local OpenAI-compatible stand-in server for offline benchmarking. "
+        "Point the backend at it with OPENAI_BASE_URL=http://<host>:<port>/v1."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8089)
+        parser.add_argument('--mode', choices=['synthetic', 'record', 'replay'], default='synthetic',
+                            help='synthetic: generate responses; record: proxy to the real API and save fixtures; '
+                                 'replay: serve saved fixtures')
+        parser.add_argument('--fixtures-dir', default=os.path.join(settings.BASE_DIR, 'llm_fixtures'))
+        parser.add_argument('--upstream-url', default='https://api.openai.com/v1',
+                            help='Real API used in record mode')
+        parser.add_argument('--replay-miss', choices=['synthetic', 'error'], default='synthetic',
+                            help='What to do in replay mode when no fixture matches')
+        parser.add_argument('--latency-dist', choices=['fixed', 'uniform', 'normal', 'lognormal'], default='lognormal',
+                            help='Distribution of time to first token')
+        parser.add_argument('--latency-ms', type=float, default=800.0, help='Mean time to first token')
+        parser.add_argument('--latency-stddev-ms', type=float, default=400.0)
+        parser.add_argument('--tokens-per-second', type=float, default=40.0, help='Generation speed')
+        parser.add_argument('--completion-tokens', type=int, default=200,
+                            help='Length of synthetic free-text replies')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests that fail')
+        parser.add_argument('--error-status', default='500,503,429',
+                            help='Comma-separated HTTP statuses used for injected errors')
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        if options['tokens_per_second'] <= 0:
+            raise CommandError('--tokens-per-second must be positive')
+        if options['mode'] == 'record' and not settings.OPENAI_API_KEY:
+            raise CommandError('Record mode needs OPENAI_API_KEY to call the real API')
+
+        handler = type('Handler', (StandInHandler,), {
+            'config': StandInConfig(options),
+            'stdout': self.stdout,
+        })
+        server = ThreadingHTTPServer((options['host'], options['port']), handler)
+        server.daemon_threads = True
+
+        self.stdout.write(self.style.SUCCESS(
+            f"LLM stand-in ({options['mode']}) listening on http://{options['host']}:{options['port']}/v1"
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,33 @@
+from django.conf import settings
+from core.llm.ratelimit import set_current_request, reset_current_request
+from core.llm.resilience import set_request_deadline, reset_request_deadline
+
+
+class LLMDeadlineMiddleware:
+    """
+    Give each request a deadline that bounds every LLM call made while serving it.
+
+    Clients may ask for a shorter budget with an ``X-Request-Timeout`` header
+    (seconds); it can never exceed LLM_REQUEST_DEADLINE. The request is also
+    made available to the LLM rate limiter so it can apply per-user quotas.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        deadline = settings.LLM_REQUEST_DEADLINE
+        try:
+            requested = float(request.headers.get('X-Request-Timeout', ''))
+            if requested > 0:
+                deadline = min(deadline, requested)
+        except ValueError:
+            pass
+
+        token = set_request_deadline(deadline)
+        request_token = set_current_request(request)
+        try:
+            return self.get_response(request)
+        finally:
+            reset_current_request(request_token)
+            reset_request_deadline(token)
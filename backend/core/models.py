@@ -45,6 +45,10 @@ class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     bio = models.TextField(max_length=500, blank=True)
     location = models.CharField(max_length=100, blank=True)
+    # Gazetteer place (core.geo) the location names, set on save
+    place_id = models.CharField(max_length=64, blank=True, default='')
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
     phone = models.CharField(max_length=20, blank=True)
     linkedin_url = models.URLField(blank=True)
     github_url = models.URLField(blank=True)
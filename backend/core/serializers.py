@@ -21,8 +21,8 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         validated_data.pop('password_confirm')
         user = User.objects.create_user(**validated_data)
-        # Create user profile
-        UserProfile.objects.create(user=user)
+        # The post_save signal normally creates the profile already
+        UserProfile.objects.get_or_create(user=user)
         return user
 
 
@@ -59,7 +59,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserProfile
         fields = '__all__'
-        read_only_fields = ('user', 'created_at', 'updated_at')
+        read_only_fields = ('user', 'place_id', 'latitude', 'longitude', 'created_at', 'updated_at')
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -1,5 +1,6 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import pre_save, post_save
 from django.dispatch import receiver
+from .geo import locate
 from .models import User, UserProfile
 
 
@@ -14,4 +15,11 @@ def create_user_profile(sender, instance, created, **kwargs):
 def save_user_profile(sender, instance, **kwargs):
     """Save the UserProfile when the User is saved"""
     if hasattr(instance, 'profile'):
-        instance.profile.save() 
\ No newline at end of file
+        instance.profile.save() 
+
+
+@receiver(pre_save, sender=UserProfile)
+def locate_user_profile(sender, instance, update_fields=None, **kwargs):
+    """Resolve the profile's location to its gazetteer place and coordinates"""
+    if update_fields is None or 'location' in update_fields:
+        locate(instance)
@@ -0,0 +1,148 @@
+from types import SimpleNamespace
+from unittest import mock
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+from .llm.gateway import LLMGateway
+from .llm.resilience import (
+    CircuitBreaker, CircuitOpenError, DeadlineExceededError, call_with_retries, get_circuit_breaker,
+    reset_request_deadline, set_request_deadline
+)
+from .models import User
+
+
+class LastLoginTests(TestCase):
+    """last_login is the activity signal that picks users for precomputed job matches"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='ada@example.com', username='ada', password='Str0ng-pass!', first_name='Ada', last_name='L'
+        )
+
+    def login(self):
+        return self.client.post('/api/auth/login/', {'email': 'ada@example.com', 'password': 'Str0ng-pass!'})
+
+    def test_login_records_last_login(self):
+        self.assertIsNone(self.user.last_login)
+        response = self.login()
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_login)
+
+    def test_register_records_last_login(self):
+        response = self.client.post('/api/auth/register/', {
+            'email': 'grace@example.com', 'username': 'grace', 'first_name': 'Grace', 'last_name': 'H',
+            'password': 'Str0ng-pass!', 'password_confirm': 'Str0ng-pass!',
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNotNone(User.objects.get(email='grace@example.com').last_login)
+
+    def test_token_refresh_records_last_login(self):
+        refresh = self.login().data['tokens']['refresh']
+        User.objects.filter(id=self.user.id).update(last_login=None)
+        response = self.client.post('/api/auth/token/refresh/', {'refresh': refresh})
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_login)
+
+
+class FakeStream:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.closed = False
+
+    def __iter__(self):
+        return iter(self.chunks)
+
+    def close(self):
+        self.closed = True
+
+
+def chunk(content=None, usage=None):
+    choices = [SimpleNamespace(delta=SimpleNamespace(content=content))] if content else []
+    return SimpleNamespace(model='gpt-test', usage=usage, choices=choices)
+
+
+@override_settings(LLM_RATELIMIT_ENABLED=True, LLM_SINGLEFLIGHT_ENABLED=False)
+class GatewayReservationTests(TestCase):
+    """Rate-limit reservations are settled however a call ends"""
+
+    def setUp(self):
+        self.gateway = LLMGateway(api_key='test')
+        self.reservation = mock.Mock()
+        self.gateway.rate_limiter = mock.Mock(acquire=mock.Mock(return_value=self.reservation))
+        self.messages = [{'role': 'user', 'content': 'Hello there'}]
+
+    def tearDown(self):
+        self.gateway.close()
+
+    def test_failed_completion_returns_whole_reservation(self):
+        with mock.patch.object(self.gateway, '_create', side_effect=RuntimeError('boom')):
+            with self.assertRaises(RuntimeError):
+                self.gateway.complete(self.messages, cache_ttl=0)
+        self.reservation.settle.assert_called_once_with(0)
+
+    def test_completion_settles_actual_usage(self):
+        response = SimpleNamespace(
+            model='gpt-test', usage=SimpleNamespace(prompt_tokens=7, completion_tokens=5, total_tokens=12),
+            choices=[SimpleNamespace(message=SimpleNamespace(content='Hi'))],
+        )
+        with mock.patch.object(self.gateway, '_create', return_value=response):
+            self.gateway.complete(self.messages, cache_ttl=0)
+        self.reservation.settle.assert_called_once_with(12)
+
+    def test_abandoned_stream_settles_what_was_streamed(self):
+        stream = FakeStream([chunk('Hello'), chunk(' world'), chunk(usage=SimpleNamespace(total_tokens=20))])
+        with mock.patch.object(self.gateway, '_create', return_value=stream):
+            events = self.gateway.stream(self.messages)
+            self.assertEqual(next(events)['content'], 'Hello')
+            # A client disconnect closes the generator before usage arrives
+            events.close()
+        self.assertTrue(stream.closed)
+        self.reservation.settle.assert_called_once()
+        self.assertGreater(self.reservation.settle.call_args.args[0], 0)
+
+    def test_stream_without_output_returns_whole_reservation(self):
+        stream = FakeStream([chunk(usage=None)])
+        with mock.patch.object(self.gateway, '_create', return_value=stream):
+            events = list(self.gateway.stream(self.messages))
+        self.assertEqual(events[-1]['type'], 'done')
+        self.reservation.settle.assert_called_once_with(0)
+
+    def test_stream_settles_reported_usage(self):
+        stream = FakeStream([chunk('Hi'), chunk(usage=SimpleNamespace(prompt_tokens=8, completion_tokens=1,
+                                                                        total_tokens=9, prompt_tokens_details=None))])
+        with mock.patch.object(self.gateway, '_create', return_value=stream):
+            list(self.gateway.stream(self.messages))
+        self.reservation.settle.assert_called_once_with(9)
+
+
+@override_settings(LLM_MIN_CALL_TIME=0.5, LLM_MAX_RETRIES=0)
+class CircuitBreakerProbeTests(SimpleTestCase):
+    """A half-open breaker lets exactly one probe through, and that probe always settles the state"""
+
+    def setUp(self):
+        self.model = f'gpt-probe-{self._testMethodName}'
+        self.breaker = get_circuit_breaker(self.model)
+        self.breaker._trip()
+        self.breaker._opened_at -= self.breaker.cooldown
+
+    def test_spent_deadline_does_not_strand_probe(self):
+        token = set_request_deadline(0.1)
+        try:
+            with self.assertRaises(DeadlineExceededError):
+                call_with_retries(lambda timeout: 'late', self.model, 'test', default_timeout=5)
+        finally:
+            reset_request_deadline(token)
+
+        self.assertEqual(call_with_retries(lambda timeout: 'ok', self.model, 'test', default_timeout=5), 'ok')
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_concurrent_call_is_refused_while_probe_runs(self):
+        def probe(timeout):
+            with self.assertRaises(CircuitOpenError):
+                call_with_retries(lambda timeout: 'second', self.model, 'test', default_timeout=5)
+            return 'first'
+
+        self.assertEqual(call_with_retries(probe, self.model, 'test', default_timeout=5), 'first')
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
@@ -1,8 +1,17 @@
 from rest_framework import status, generics, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from rest_framework_simplejwt.views import TokenRefreshView
 from django.contrib.auth import update_session_auth_hash
+from django.contrib.auth.models import update_last_login
+from django.utils import timezone
+from django.conf import settings
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+import hmac
+from core.llm import get_telemetry
 from .models import User, UserProfile
 from .serializers import (
     UserRegistrationSerializer, 
@@ -20,6 +29,7 @@ def register(request):
     serializer = UserRegistrationSerializer(data=request.data)
     if serializer.is_valid():
         user = serializer.save()
+        update_last_login(None, user)
         refresh = RefreshToken.for_user(user)
         return Response({
             'message': 'User created successfully',
@@ -39,6 +49,8 @@ def login(request):
     serializer = UserLoginSerializer(data=request.data)
     if serializer.is_valid():
         user = serializer.validated_data['user']
+        # last_login marks the users whose matches are precomputed (JOB_MATCH_PRECOMPUTE_ACTIVE_DAYS)
+        update_last_login(None, user)
         refresh = RefreshToken.for_user(user)
         return Response({
             'message': 'Login successful',
@@ -51,6 +63,17 @@ def login(request):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class ActivityTokenRefreshView(TokenRefreshView):
+    """Token refresh that also records the user as active, since clients stay signed in by refreshing"""
+
+    def post(self, request, *args, **kwargs):
+        response = super().post(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            user_id = AccessToken(response.data['access'])[jwt_settings.USER_ID_CLAIM]
+            User.objects.filter(**{jwt_settings.USER_ID_FIELD: user_id}).update(last_login=timezone.now())
+        return response
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def logout(request):
@@ -241,4 +264,18 @@ def update_notifications(request):
     return Response({
         'message': 'Notification preferences updated successfully',
         'notifications': notifications
-    }, status=status.HTTP_200_OK) 
\ No newline at end of file
+    }, status=status.HTTP_200_OK) 
+
+
+@require_GET
+def metrics(request):
+    """LLM telemetry for this worker in the Prometheus text exposition format"""
+    if settings.METRICS_TOKEN:
+        expected = f"Bearer {settings.METRICS_TOKEN}"
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), expected):
+            return HttpResponse(status=401)
+    
+    return HttpResponse(
+        get_telemetry().render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -0,0 +1,456 @@
+import math
+import functools
+import os
+import re
+import threading
+import time
+import logging
+import numpy as np
+from array import array
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.utils import timezone
+from typing import Dict, List, Any, Optional
+from core.geo import haversine_km
+from .feature_store import Column
+
+logger = logging.getLogger(__name__)
+
+# Keeps tech tokens such as c++, c#, node.js and .net-style dotted names intact
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9]+)*")
+
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or our that the their this to "
+    "we will with you your".split()
+)
+
+INDEXED_FIELDS = ('title', 'skills_required', 'company', 'requirements', 'description')
+# Rows are compacted away once removed ones exceed this share of the index (and COMPACT_MIN)
+COMPACT_RATIO = 0.2
+COMPACT_MIN = 1000
+
+LISTING_FIELDS = INDEXED_FIELDS + (
+    'id', 'is_active', 'canonical', 'is_remote', 'location', 'latitude', 'longitude', 'salary_min', 'salary_max',
+    'employment_type',
+)
+
+
+@functools.lru_cache(maxsize=100000)
+def stem(token: str) -> str:
+    """Light suffix stripping so plurals and -ing/-ed forms meet their base word"""
+    if len(token) <= 3 or not token.isalpha():
+        return token
+    if token.endswith('ies') and len(token) > 4:
+        token = token[:-3] + 'y'
+    elif token.endswith('sses'):
+        token = token[:-2]
+    elif token.endswith('s') and not token.endswith(('ss', 'us', 'is')):
+        token = token[:-1]
+    if token.endswith('ing') and len(token) > 5:
+        token = token[:-3]
+    elif token.endswith('ed') and len(token) > 4:
+        token = token[:-2]
+    elif token.endswith('e') and len(token) > 4:
+        token = token[:-1]
+    # running -> runn -> run, planned -> plann -> plan
+    if len(token) > 3 and token[-1] == token[-2] and token[-1] not in 'aeioulsz':
+        token = token[:-1]
+    return token
+
+
+def analyze(text: str) -> List[str]:
+    """Lowercase, tokenize, drop stop words and stem"""
+    return [stem(token) for token in TOKEN_PATTERN.findall((text or '').lower()) if token not in STOP_WORDS]
+
+
+def field_text(job: Any, field: str) -> str:
+    value = getattr(job, field, '')
+    if isinstance(value, (list, tuple)):
+        return ' '.join(str(item) for item in value)
+    return value or ''
+
+
+class BM25Index:
+    """
+    In-memory BM25F inverted index over active job listings.
+
+    Each field's term frequencies are length-normalised against that
+    field's average length and boosted (JOB_SEARCH_FIELD_BOOSTS) before
+    they are summed into one weighted frequency per term and job, which
+    is what the posting lists store. Updates append new rows and mask
+    replaced or removed ones; the index is rebuilt without them once they
+    make up COMPACT_RATIO of it. Field averages are taken when a job is added,
+    so they drift slightly between rebuilds.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+        self.synced_at = None
+
+    def _reset(self):
+        self.vocabulary = {}
+        self.postings_rows = []
+        self.postings_tfs = []
+        self.document_frequency = []
+        # Forward index per row: (term ids, weighted frequencies, field lengths); None once removed
+        self.documents = []
+        self.row_job_ids = Column(np.int64)
+        self.alive = Column(bool, False)
+        self.is_remote = Column(bool, False)
+        self.salary_min = Column(np.float64, np.nan)
+        self.employment = Column(np.int32, -1)
+        self.employment_types = {}
+        self.locations = []
+        self.latitude = Column(np.float64, np.nan)
+        self.longitude = Column(np.float64, np.nan)
+        self.rows = {}
+        self.dead = 0
+        self.length_totals = np.zeros(len(INDEXED_FIELDS), dtype=np.float64)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, job_id: int):
+        return job_id in self.rows
+
+    def load(self):
+        """(Re)build the index from every active job listing"""
+        from .models import JobListing
+
+        started = timezone.now()
+        start_time = time.time()
+        jobs = JobListing.objects.searchable().only(*LISTING_FIELDS).order_by('id')
+        with self._lock:
+            self._reset()
+            for job in jobs.iterator(chunk_size=2000):
+                self.upsert(job)
+            self.synced_at = started
+        logger.info(f"Built BM25 job index: {len(self)} jobs, {len(self.vocabulary)} terms "
+                    f"in {time.time() - start_time:.2f}s")
+
+    def refresh(self):
+        """
+        Catch up with listings changed since the last sync, including bulk
+        writes and other processes that don't reach this worker's signals
+        """
+        from .models import JobListing
+
+        if self.synced_at is None:
+            return self.load()
+
+        started = timezone.now()
+        # Overlap the window slightly so writes committed during the last sync aren't missed
+        since = self.synced_at - timedelta(seconds=settings.JOB_SKILL_INDEX_SYNC_OVERLAP)
+        changed = JobListing.objects.filter(updated_at__gte=since).only(*LISTING_FIELDS)
+        for job in changed.iterator(chunk_size=2000):
+            if job.is_active and job.canonical_id is None:
+                self.upsert(job)
+            else:
+                self.remove(job.id)
+
+        active_ids = set(JobListing.objects.searchable().values_list('id', flat=True).iterator())
+        with self._lock:
+            deleted = [job_id for job_id in self.rows if job_id not in active_ids]
+        for job_id in deleted:
+            self.remove(job_id)
+        self.synced_at = started
+
+    def upsert(self, job: Any):
+        """Index a job listing, replacing any earlier version of it"""
+        boosts = settings.JOB_SEARCH_FIELD_BOOSTS
+        b = settings.JOB_SEARCH_BM25_B
+        field_tokens = [analyze(field_text(job, field)) for field in INDEXED_FIELDS]
+        lengths = np.array([len(tokens) for tokens in field_tokens], dtype=np.float64)
+
+        with self._lock:
+            if job.id in self.rows:
+                self._remove_row(job.id)
+
+            live_docs = len(self.rows) + 1
+            averages = np.maximum((self.length_totals + lengths) / live_docs, 1.0)
+            weighted = {}
+            for field, tokens, length, average in zip(INDEXED_FIELDS, field_tokens, lengths, averages):
+                if not tokens:
+                    continue
+                norm = 1 - b + b * length / average
+                for term, count in Counter(tokens).items():
+                    weighted[term] = weighted.get(term, 0.0) + boosts.get(field, 1.0) * count / norm
+
+            row = self.row_job_ids.size
+            term_ids = np.empty(len(weighted), dtype=np.int32)
+            frequencies = np.empty(len(weighted), dtype=np.float32)
+            for position, (term, frequency) in enumerate(weighted.items()):
+                term_id = self._term_id(term)
+                self.postings_rows[term_id].append(row)
+                self.postings_tfs[term_id].append(frequency)
+                self.document_frequency[term_id] += 1
+                term_ids[position] = term_id
+                frequencies[position] = frequency
+            self.documents.append((term_ids, frequencies, lengths))
+
+            self.row_job_ids.append(job.id)
+            self.alive.append(True)
+            self.is_remote.append(bool(job.is_remote))
+            self.salary_min.append(job.salary_min if job.salary_min else np.nan)
+            self.employment.append(self.employment_types.setdefault(
+                (job.employment_type or '').lower(), len(self.employment_types)
+            ))
+            self.locations.append((job.location or '').lower())
+            self.latitude.append(job.latitude if job.latitude is not None else np.nan)
+            self.longitude.append(job.longitude if job.longitude is not None else np.nan)
+            self.rows[job.id] = row
+            self.length_totals += lengths
+
+    def remove(self, job_id: int):
+        """Drop a job from the index; unknown ids are ignored"""
+        with self._lock:
+            if job_id in self.rows:
+                self._remove_row(job_id)
+                if self.dead > max(COMPACT_RATIO * self.row_job_ids.size, COMPACT_MIN):
+                    self.compact()
+
+    def search(self, query: str, filters: Optional[Dict[str, Any]] = None, limit: int = 20) -> List[int]:
+        """
+        Rank active jobs for a free-text query
+
+        Args:
+            query: Search text; any query term may match
+            filters: Optional 'remote_only', 'location' (substring),
+                'near' ((latitude, longitude, radius km), with 'location'
+                matching listings without coordinates), 'min_salary'
+                (on salary_min) and 'employment_type'
+            limit: Maximum number of ids to return
+
+        Returns:
+            Job ids, best match first
+        """
+        filters = filters or {}
+        k1 = settings.JOB_SEARCH_BM25_K1
+        terms = list(dict.fromkeys(analyze(query)))
+
+        with self._lock:
+            size = self.row_job_ids.size
+            live_docs = len(self.rows)
+            scores = np.zeros(size, dtype=np.float32)
+            for term in terms:
+                term_id = self.vocabulary.get(term)
+                if term_id is None:
+                    continue
+                rows = np.frombuffer(self.postings_rows[term_id], dtype=np.int32)
+                frequencies = np.frombuffer(self.postings_tfs[term_id], dtype=np.float32)
+                df = self.document_frequency[term_id]
+                idf = math.log(1 + (live_docs - df + 0.5) / (df + 0.5))
+                scores[rows] += idf * frequencies * (k1 + 1) / (frequencies + k1)
+                # Views must not outlive the lock: appends resize the buffers
+                del rows, frequencies
+
+            mask = (scores > 0) & self.alive.view()
+            if filters.get('remote_only'):
+                mask &= self.is_remote.view()
+            if filters.get('min_salary'):
+                mask &= self.salary_min.view() >= filters['min_salary']
+            if filters.get('employment_type'):
+                code = self.employment_types.get(filters['employment_type'].lower(), -2)
+                mask &= self.employment.view() == code
+
+            candidates = np.flatnonzero(mask)
+            location = (filters.get('location') or '').lower()
+            if location:
+                in_text = np.array([location in self.locations[row] for row in candidates], dtype=bool)
+            if filters.get('near'):
+                latitude, longitude, radius_km = filters['near']
+                latitudes = self.latitude.view()[candidates]
+                keep = haversine_km(latitude, longitude, latitudes, self.longitude.view()[candidates]) <= radius_km
+                if location:
+                    # Listings whose location names no known place still match on its text
+                    keep |= np.isnan(latitudes) & in_text
+                candidates = candidates[keep]
+            elif location:
+                candidates = candidates[in_text]
+            row_job_ids = self.row_job_ids.view().copy()
+
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+        # Best score first; ties go to the more recently indexed row
+        order = candidates[np.lexsort((-candidates, -scores[candidates]))]
+        return [int(job_id) for job_id in row_job_ids[order]]
+
+    def compact(self):
+        """Rebuild the posting lists without removed rows"""
+        with self._lock:
+            live_rows = np.flatnonzero(self.alive.view())
+            documents = [self.documents[row] for row in live_rows]
+            terms = list(self.vocabulary)
+            state = {
+                'row_job_ids': self.row_job_ids.view()[live_rows],
+                'is_remote': self.is_remote.view()[live_rows],
+                'salary_min': self.salary_min.view()[live_rows],
+                'employment': self.employment.view()[live_rows],
+                'locations': [self.locations[row] for row in live_rows],
+                'latitude': self.latitude.view()[live_rows],
+                'longitude': self.longitude.view()[live_rows],
+            }
+            employment_types = self.employment_types
+            self._reset()
+            self.employment_types = employment_types
+            self._restore(terms, documents, state)
+
+    def save(self, path: str):
+        """Write a compacted snapshot that load_snapshot() can restore without the database"""
+        with self._lock:
+            self.compact()
+            term_ids = [document[0] for document in self.documents]
+            snapshot = {
+                'terms': np.array(list(self.vocabulary), dtype=str),
+                'doc_indptr': np.cumsum([0] + [len(ids) for ids in term_ids]).astype(np.int64),
+                'doc_term_ids': np.concatenate(term_ids) if term_ids else np.zeros(0, dtype=np.int32),
+                'doc_frequencies': (np.concatenate([document[1] for document in self.documents])
+                                    if self.documents else np.zeros(0, dtype=np.float32)),
+                'doc_lengths': (np.array([document[2] for document in self.documents])
+                                if self.documents else np.zeros((0, len(INDEXED_FIELDS)))),
+                'row_job_ids': self.row_job_ids.view(),
+                'is_remote': self.is_remote.view(),
+                'salary_min': self.salary_min.view(),
+                'employment': self.employment.view(),
+                'employment_types': np.array(list(self.employment_types), dtype=str),
+                'locations': np.array(self.locations, dtype=str),
+                'latitude': self.latitude.view(),
+                'longitude': self.longitude.view(),
+                'synced_at': np.array([self.synced_at.timestamp() if self.synced_at else 0.0]),
+            }
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        temporary_path = f'{path}.{os.getpid()}.tmp.npz'
+        np.savez(temporary_path, **snapshot)
+        # Readers never see a half-written snapshot
+        os.replace(temporary_path, path)
+
+    def load_snapshot(self, path: str):
+        """Restore a snapshot written by save(); refresh() then catches up with later changes"""
+        start_time = time.time()
+        with np.load(path, allow_pickle=False) as snapshot:
+            indptr = snapshot['doc_indptr']
+            term_ids, frequencies, lengths = snapshot['doc_term_ids'], snapshot['doc_frequencies'], snapshot['doc_lengths']
+            documents = [
+                (term_ids[start:end], frequencies[start:end], lengths[row])
+                for row, (start, end) in enumerate(zip(indptr[:-1], indptr[1:]))
+            ]
+            state = {name: snapshot[name] for name in ('row_job_ids', 'is_remote', 'salary_min', 'employment')}
+            state['locations'] = snapshot['locations'].tolist()
+            for name in ('latitude', 'longitude'):
+                # Snapshots written before listings had coordinates; build_search_index writes a full one
+                state[name] = snapshot[name] if name in snapshot.files else np.full(len(indptr) - 1, np.nan)
+            terms = snapshot['terms'].tolist()
+            employment_types = snapshot['employment_types'].tolist()
+            synced_at = float(snapshot['synced_at'][0])
+
+        with self._lock:
+            self._reset()
+            self.employment_types = {name: code for code, name in enumerate(employment_types)}
+            self._restore(terms, documents, state)
+            self.synced_at = datetime.fromtimestamp(synced_at, tz=dt_timezone.utc) if synced_at else None
+        logger.info(f"Loaded BM25 job index snapshot: {len(self)} jobs in {time.time() - start_time:.2f}s")
+
+    def _restore(self, terms: List[str], documents: List[tuple], state: Dict[str, Any]):
+        """Rebuild posting lists and columns from per-row forward entries"""
+        self.vocabulary = {term: term_id for term_id, term in enumerate(terms)}
+        count = len(documents)
+        all_term_ids = np.concatenate([document[0] for document in documents]) if count else np.zeros(0, np.int32)
+        all_frequencies = (np.concatenate([document[1] for document in documents])
+                           if count else np.zeros(0, np.float32))
+        all_rows = np.repeat(np.arange(count, dtype=np.int32), [len(document[0]) for document in documents])
+
+        # Group the forward entries by term to get every posting list in one sort
+        order = np.argsort(all_term_ids, kind='stable')
+        bounds = np.searchsorted(all_term_ids[order], np.arange(len(terms) + 1))
+        sorted_rows, sorted_frequencies = all_rows[order], all_frequencies[order].astype(np.float32)
+        for term_id in range(len(terms)):
+            start, end = bounds[term_id], bounds[term_id + 1]
+            self.postings_rows.append(array('i', sorted_rows[start:end].tobytes()))
+            self.postings_tfs.append(array('f', sorted_frequencies[start:end].tobytes()))
+            self.document_frequency.append(int(end - start))
+
+        self.documents = list(documents)
+        self.row_job_ids = Column.from_array(np.asarray(state['row_job_ids'], dtype=np.int64))
+        self.alive = Column.from_array(np.ones(count, dtype=bool), False)
+        self.is_remote = Column.from_array(np.asarray(state['is_remote'], dtype=bool), False)
+        self.salary_min = Column.from_array(np.asarray(state['salary_min'], dtype=np.float64), np.nan)
+        self.employment = Column.from_array(np.asarray(state['employment'], dtype=np.int32), -1)
+        self.locations = list(state['locations'])
+        self.latitude = Column.from_array(np.asarray(state['latitude'], dtype=np.float64), np.nan)
+        self.longitude = Column.from_array(np.asarray(state['longitude'], dtype=np.float64), np.nan)
+        self.rows = {int(job_id): row for row, job_id in enumerate(self.row_job_ids.view())}
+        self.length_totals = (np.sum([document[2] for document in documents], axis=0)
+                              if count else np.zeros(len(INDEXED_FIELDS)))
+
+    def _term_id(self, term: str) -> int:
+        term_id = self.vocabulary.get(term)
+        if term_id is None:
+            term_id = self.vocabulary[term] = len(self.postings_rows)
+            self.postings_rows.append(array('i'))
+            self.postings_tfs.append(array('f'))
+            self.document_frequency.append(0)
+        return term_id
+
+    def _remove_row(self, job_id: int):
+        row = self.rows.pop(job_id)
+        term_ids, _, lengths = self.documents[row]
+        for term_id in term_ids:
+            self.document_frequency[term_id] -= 1
+        self.length_totals -= lengths
+        self.alive.data[row] = False
+        self.dead += 1
+
+
+_search_index = None
+_search_index_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+
+
+def get_search_index() -> BM25Index:
+    """Return this worker's BM25 index, restoring a snapshot or building it as needed"""
+    global _search_index
+
+    if _search_index is None:
+        with _search_index_lock:
+            if _search_index is None:
+                index = BM25Index()
+                path = settings.JOB_SEARCH_SNAPSHOT_PATH
+                if path and os.path.exists(path):
+                    try:
+                        index.load_snapshot(path)
+                        index.refresh()
+                    except Exception as e:
+                        logger.warning(f"Could not restore BM25 snapshot, rebuilding: {str(e)}")
+                        index.load()
+                else:
+                    index.load()
+                _search_index = index
+
+    age = (timezone.now() - _search_index.synced_at).total_seconds()
+    # One thread catches up while the others keep serving the current index
+    if age > settings.JOB_SEARCH_REFRESH_INTERVAL and _refresh_lock.acquire(blocking=False):
+        try:
+            _search_index.refresh()
+        except Exception as e:
+            logger.warning(f"BM25 job index refresh failed: {str(e)}")
+        finally:
+            _refresh_lock.release()
+    return _search_index
+
+
+def loaded_search_index() -> Optional[BM25Index]:
+    """The BM25 index if this worker has built one, without building it"""
+    return _search_index
+
+
+def warm_search_index():
+    """Restore or build the BM25 index at worker start instead of on the first search"""
+    if settings.JOB_SEARCH_BACKEND != 'bm25':
+        return
+    try:
+        get_search_index()
+    except Exception as e:
+        logger.warning(f"Could not build BM25 job index at startup: {str(e)}")
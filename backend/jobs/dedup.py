@@ -0,0 +1,225 @@
+import functools
+import hashlib
+import re
+import zlib
+import logging
+import numpy as np
+from collections import defaultdict
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from typing import Dict, List, Iterable, Optional, Set
+from .models import JobListing, JobListingBucket
+
+logger = logging.getLogger(__name__)
+
+WORD_PATTERN = re.compile(r'[a-z0-9+#]+')
+
+# Prime just above 2**32 for the (a * x + b) mod p hash family over 32-bit shingle hashes
+HASH_PRIME = np.uint64(4294967311)
+
+# Bucket lookups per query, below every backend's parameter limit
+LOOKUP_CHUNK = 500
+
+
+def shingle_hashes(title: str, company: str, description: str) -> np.ndarray:
+    """32-bit hashes of the word k-shingles of a listing's title, company and description"""
+    words = WORD_PATTERN.findall(f'{title} {company} {description}'.lower())
+    size = settings.JOB_DEDUP_SHINGLE_SIZE
+    shingles = {' '.join(words[start:start + size]) for start in range(max(len(words) - size + 1, 1))}
+    return np.fromiter((zlib.crc32(shingle.encode('utf-8')) for shingle in shingles), dtype=np.uint64)
+
+
+@functools.lru_cache(maxsize=4)
+def _hash_family(num_perm: int) -> tuple:
+    # Fixed seed: signatures are stored and compared across processes and deploys
+    random = np.random.RandomState(20240514)
+    a = random.randint(1, 2 ** 31, size=num_perm).astype(np.uint64)
+    b = random.randint(0, 2 ** 32, size=num_perm).astype(np.uint64)
+    return a, b
+
+
+def minhash(hashes: np.ndarray) -> np.ndarray:
+    """MinHash signature; the share of equal positions estimates the Jaccard similarity of two shingle sets"""
+    a, b = _hash_family(settings.JOB_DEDUP_NUM_PERM)
+    # a < 2**31 and hashes < 2**32, so a * x + b stays below 2**64
+    return ((np.outer(a, hashes) + b[:, None]) % HASH_PRIME).min(axis=1)
+
+
+def band_buckets(signature: np.ndarray) -> List[int]:
+    """LSH bucket keys, one per band of rows of the signature"""
+    bands = settings.JOB_DEDUP_BANDS
+    rows = len(signature) // bands
+    keys = []
+    for band in range(bands):
+        digest = hashlib.blake2b(
+            band.to_bytes(2, 'little') + signature[band * rows:(band + 1) * rows].tobytes(), digest_size=8
+        ).digest()
+        keys.append(int.from_bytes(digest, 'little', signed=True))
+    return keys
+
+
+def similarity(first: np.ndarray, second: np.ndarray) -> float:
+    return float(np.mean(first == second))
+
+
+def assign_canonicals(job_ids: Iterable[int]) -> Set[int]:
+    """
+    Cluster new or changed listings with their near-duplicates in the catalog
+
+    Each listing's MinHash signature is split into LSH bands; listings
+    sharing a band bucket are candidates, and candidates whose estimated
+    similarity reaches JOB_DEDUP_THRESHOLD are duplicates. A cluster's
+    canonical listing is its earliest one; the others point at it through
+    JobListing.canonical and drop out of search and matching. Listings
+    whose signature is unchanged keep their current clustering, unless
+    their canonical listing changed.
+
+    Args:
+        job_ids: Listings to (re)cluster, e.g. those just ingested
+
+    Returns:
+        Ids among job_ids that are duplicates of another listing
+    """
+    jobs = list(
+        JobListing.objects.filter(id__in=list(job_ids), is_active=True)
+        .only('id', 'title', 'company', 'description', 'canonical', 'dedup_signature')
+        .order_by('id')
+    )
+    signatures = {}
+    for job in jobs:
+        signature = minhash(shingle_hashes(job.title, job.company, job.description))
+        if job.dedup_signature is None or bytes(job.dedup_signature) != signature.tobytes():
+            signatures[job.id] = signature
+    changed = [job for job in jobs if job.id in signatures]
+    if not changed:
+        return {job.id for job in jobs if job.canonical_id is not None}
+
+    # Duplicates of a changed canonical listing are re-clustered against its new text
+    released = JobListing.objects.filter(
+        canonical_id__in=[job.id for job in changed if job.canonical_id is None], is_active=True
+    ).exclude(id__in=list(signatures)).only('id', 'canonical', 'dedup_signature')
+    for job in released:
+        signatures[job.id] = np.frombuffer(bytes(job.dedup_signature), dtype=np.uint64)
+        changed.append(job)
+    changed.sort(key=lambda job: job.id)
+
+    buckets = {job_id: band_buckets(signature) for job_id, signature in signatures.items()}
+    bucket_jobs = _catalog_bucket_jobs({key for keys in buckets.values() for key in keys}, set(signatures))
+    # (signature, cluster root) of every listing seen so far
+    known = _load_known({job_id for job_ids in bucket_jobs.values() for job_id in job_ids})
+    threshold = settings.JOB_DEDUP_THRESHOLD
+    now = timezone.now()
+
+    with transaction.atomic():
+        for job in changed:
+            signature = signatures[job.id]
+            candidates = set().union(*(bucket_jobs.get(key, ()) for key in buckets[job.id])) - {job.id}
+            roots = {
+                known[candidate][1] for candidate in candidates
+                if candidate in known and similarity(signature, known[candidate][0]) >= threshold
+            }
+            root = min(roots | {job.id}) if roots else job.id
+
+            if root == job.id and roots - {job.id}:
+                # The listing predates the clusters it matches and becomes their canonical listing
+                merged = roots - {job.id}
+                JobListing.objects.filter(Q(id__in=merged) | Q(canonical_id__in=merged)).exclude(
+                    id=job.id
+                ).update(canonical=job.id, updated_at=now)
+                known.update({
+                    other: (other_signature, job.id)
+                    for other, (other_signature, other_root) in known.items() if other_root in merged
+                })
+            elif root != job.id:
+                # A canonical listing that turned into a duplicate hands its cluster over
+                JobListing.objects.filter(canonical_id=job.id).update(canonical=root, updated_at=now)
+                known.update({
+                    other: (other_signature, root)
+                    for other, (other_signature, other_root) in known.items() if other_root == job.id
+                })
+
+            job.dedup_signature = signature.tobytes()
+            job.updated_at = now
+            known[job.id] = (signature, root)
+            for key in buckets[job.id]:
+                bucket_jobs[key].add(job.id)
+
+        # Roots as of the end of the batch; later listings may have merged earlier ones' clusters
+        for job in changed:
+            root = known[job.id][1]
+            job.canonical_id = None if root == job.id else root
+        JobListing.objects.bulk_update(changed, ['canonical', 'dedup_signature', 'updated_at'])
+        JobListingBucket.objects.filter(job_id__in=list(signatures)).delete()
+        JobListingBucket.objects.bulk_create(
+            [JobListingBucket(job_id=job_id, bucket=key) for job_id, keys in buckets.items() for key in keys],
+            batch_size=2000,
+        )
+
+    duplicates = {job.id for job in jobs if job.canonical_id is not None}
+    logger.info(f"Clustered {len(changed)} changed listings, {len(duplicates)} of {len(jobs)} are duplicates")
+    return duplicates
+
+
+def promote_orphaned_duplicates(canonical_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Hand the clusters of inactive canonical listings to their earliest active member
+
+    Duplicates stay out of search and matching while their canonical
+    listing is inactive, so without this an expired or delisted canonical
+    would hide every live copy of the posting. The promoted listing becomes
+    canonical and the cluster's other members point at it. The old
+    canonical listing loses its signature, so clustering it again once it
+    is active again lets it take the cluster back.
+
+    Args:
+        canonical_ids: Canonical listings to check; all inactive ones when None
+
+    Returns:
+        Number of clusters handed over
+    """
+    orphans = JobListing.objects.filter(is_active=True, canonical__is_active=False)
+    if canonical_ids is not None:
+        orphans = orphans.filter(canonical_id__in=list(canonical_ids))
+    clusters = defaultdict(list)
+    for job_id, canonical_id in orphans.values_list('id', 'canonical_id'):
+        clusters[canonical_id].append(job_id)
+    if not clusters:
+        return 0
+
+    now = timezone.now()
+    with transaction.atomic():
+        for canonical_id, members in clusters.items():
+            root = min(members)
+            JobListing.objects.filter(id=root).update(canonical=None, updated_at=now)
+            JobListing.objects.filter(canonical_id=canonical_id).exclude(id=root).update(canonical=root, updated_at=now)
+        JobListing.objects.filter(id__in=list(clusters)).update(dedup_signature=None, updated_at=now)
+        JobListingBucket.objects.filter(job_id__in=list(clusters)).delete()
+    logger.info(f"Promoted new canonical listings for {len(clusters)} clusters with inactive canonicals")
+    return len(clusters)
+
+
+def _catalog_bucket_jobs(keys: Set[int], exclude_ids: Set[int]) -> Dict[int, Set[int]]:
+    """Listings outside exclude_ids that share each bucket key"""
+    bucket_jobs = defaultdict(set)
+    keys = list(keys)
+    for start in range(0, len(keys), LOOKUP_CHUNK):
+        rows = JobListingBucket.objects.filter(bucket__in=keys[start:start + LOOKUP_CHUNK]).values_list('bucket', 'job_id')
+        for key, job_id in rows:
+            if job_id not in exclude_ids:
+                bucket_jobs[key].add(job_id)
+    return bucket_jobs
+
+
+def _load_known(job_ids: Set[int]) -> Dict[int, tuple]:
+    """(signature, cluster root) of active candidate listings"""
+    known = {}
+    job_ids = list(job_ids)
+    for start in range(0, len(job_ids), LOOKUP_CHUNK):
+        rows = JobListing.objects.filter(
+            id__in=job_ids[start:start + LOOKUP_CHUNK], is_active=True, dedup_signature__isnull=False
+        ).values_list('id', 'dedup_signature', 'canonical_id')
+        for job_id, signature, canonical_id in rows:
+            known[job_id] = (np.frombuffer(bytes(signature), dtype=np.uint64), canonical_id or job_id)
+    return known
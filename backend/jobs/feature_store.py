@@ -0,0 +1,240 @@
+import json
+import os
+import re
+import shutil
+import time
+import logging
+import numpy as np
+from collections.abc import MutableMapping
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from typing import Dict, List, Any, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Names the published version; replaced atomically so readers see the old version or the new, never a mix
+CURRENT_FILE = 'CURRENT'
+MANIFEST_FILE = 'manifest.json'
+VERSION_PATTERN = re.compile(r'^\d{8}T\d{12}$')
+
+# (version, checked at) of the last read of CURRENT in this process
+_published = [None, 0.0]
+
+
+class Column:
+    """Growable NumPy array with amortised appends"""
+
+    def __init__(self, dtype, fill=0):
+        self.fill = fill
+        self.data = np.full(1024, fill, dtype=dtype)
+        self.size = 0
+
+    @classmethod
+    def from_array(cls, values: np.ndarray, fill=0) -> 'Column':
+        column = cls(values.dtype, fill)
+        column.data = np.concatenate([values, np.full(max(1024, len(values)), fill, dtype=values.dtype)])
+        column.size = len(values)
+        return column
+
+    def append(self, value):
+        if self.size == len(self.data):
+            self.data = np.concatenate([self.data, np.full(len(self.data), self.fill, dtype=self.data.dtype)])
+        self.data[self.size] = value
+        self.size += 1
+
+    def view(self) -> np.ndarray:
+        return self.data[:self.size]
+
+
+class RowMap(MutableMapping):
+    """
+    Job id to row map over a read-only, sorted id array, with changes in memory
+
+    Looking up a published job is a binary search in the shared array, so
+    a worker holds only the jobs added or removed since the store was
+    published instead of a dict over the whole catalog.
+    """
+
+    def __init__(self, base_ids: np.ndarray):
+        self.base_ids = base_ids
+        # Published jobs no longer at their published row, and rows of jobs (re)added since
+        self.removed = set()
+        self.added = {}
+
+    def _base_row(self, job_id: int) -> int:
+        row = int(np.searchsorted(self.base_ids, job_id))
+        if row < len(self.base_ids) and self.base_ids[row] == job_id and job_id not in self.removed:
+            return row
+        return -1
+
+    def __getitem__(self, job_id: int) -> int:
+        if job_id in self.added:
+            return self.added[job_id]
+        row = self._base_row(job_id)
+        if row < 0:
+            raise KeyError(job_id)
+        return row
+
+    def __setitem__(self, job_id: int, row: int):
+        if self._base_row(job_id) >= 0:
+            self.removed.add(job_id)
+        self.added[job_id] = row
+
+    def __delitem__(self, job_id: int):
+        if job_id in self.added:
+            del self.added[job_id]
+        elif self._base_row(job_id) >= 0:
+            self.removed.add(job_id)
+        else:
+            raise KeyError(job_id)
+
+    def __contains__(self, job_id) -> bool:
+        return job_id in self.added or self._base_row(job_id) >= 0
+
+    def __len__(self) -> int:
+        # A published job that was re-added is counted in both removed and added
+        return len(self.base_ids) - len(self.removed) + len(self.added)
+
+    def __iter__(self) -> Iterator[int]:
+        for job_id in self.base_ids.tolist():
+            if job_id not in self.removed:
+                yield job_id
+        yield from list(self.added)
+
+
+class FeatureStore:
+    """
+    One published version of the job feature store: a directory of .npy
+    arrays opened as read-only memory maps, plus a JSON manifest
+
+    Every worker maps the same files, so the OS page cache holds one copy
+    of the catalog's features per node however many workers there are.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, MANIFEST_FILE)) as manifest_file:
+            self.manifest = json.load(manifest_file)
+        self.version = self.manifest['version']
+        self.synced_at = parse_datetime(self.manifest['synced_at'])
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.manifest['arrays']
+
+    def array(self, name: str) -> np.ndarray:
+        return np.load(os.path.join(self.path, f'{name}.npy'), mmap_mode='r')
+
+
+def published_version(root: Optional[str] = None) -> Optional[str]:
+    """
+    Version named by the store's CURRENT file, re-read at most every
+    JOB_FEATURE_STORE_CHECK_INTERVAL seconds
+    """
+    root = root or settings.JOB_FEATURE_STORE_DIR
+    if time.time() - _published[1] > settings.JOB_FEATURE_STORE_CHECK_INTERVAL:
+        try:
+            with open(os.path.join(root, CURRENT_FILE)) as current_file:
+                _published[0] = current_file.read().strip() or None
+        except FileNotFoundError:
+            _published[0] = None
+        _published[1] = time.time()
+    return _published[0]
+
+
+def open_published_store(root: Optional[str] = None) -> Optional[FeatureStore]:
+    """The published feature store version, or None when the store is off or nothing is published"""
+    if not settings.JOB_FEATURE_STORE_ENABLED:
+        return None
+    root = root or settings.JOB_FEATURE_STORE_DIR
+    version = published_version(root)
+    if version is None:
+        return None
+    return FeatureStore(os.path.join(root, version))
+
+
+def publish_feature_store(root: Optional[str] = None) -> FeatureStore:
+    """
+    Build the features of every active, canonical listing and publish them
+    as a new store version
+
+    Writes the job ids (sorted), the job x skill matrix in CSR form with its
+    vocabulary, and, with JOB_SEMANTIC_ENABLED, the job embeddings with
+    their IVF centroids. The version directory is complete before CURRENT
+    points at it; workers swap to it on their next check. Versions beyond
+    JOB_FEATURE_STORE_KEEP are deleted, which doesn't disturb workers
+    still mapping them.
+
+    Returns:
+        The published version
+    """
+    from .models import JobListing
+    from .semantic import LISTING_FIELDS, SemanticIndex
+    from .skill_index import SkillIndex
+
+    root = root or settings.JOB_FEATURE_STORE_DIR
+    started = timezone.now()
+    start_time = time.time()
+    semantic_index = SemanticIndex() if settings.JOB_SEMANTIC_ENABLED else None
+    skill_rows = []
+    batch = []
+    jobs = JobListing.objects.searchable().only(*LISTING_FIELDS, 'skills_required').order_by('id')
+    for job in jobs.iterator(chunk_size=2000):
+        skill_rows.append((job.id, job.skills_required))
+        batch.append(job)
+        if len(batch) >= 2000:
+            if semantic_index is not None:
+                semantic_index.upsert_jobs(batch)
+            batch = []
+    if semantic_index is not None:
+        semantic_index.upsert_jobs(batch)
+        semantic_index.train()
+
+    skill_index = SkillIndex.from_rows(skill_rows)
+    arrays = {'job_ids': np.array([job_id for job_id, _ in skill_rows], dtype=np.int64)}
+    arrays.update(skill_index.store_arrays())
+    manifest = {
+        'jobs': len(skill_rows),
+        'skills': list(skill_index.vocabulary),
+        'synced_at': started.isoformat(),
+        'embedding_model': None,
+    }
+    if semantic_index is not None:
+        arrays.update(semantic_index.store_arrays())
+        manifest['embedding_model'] = settings.JOB_EMBEDDING_MODEL
+        manifest['trained_size'] = semantic_index.trained_size
+
+    store = write_store(root, arrays, manifest)
+    logger.info(f"Published job feature store {store.version}: {manifest['jobs']} jobs "
+                f"in {time.time() - start_time:.2f}s")
+    return store
+
+
+def write_store(root: str, arrays: Dict[str, np.ndarray], manifest: Dict[str, Any]) -> FeatureStore:
+    """Write arrays and manifest as a new version and point CURRENT at it"""
+    version = timezone.now().strftime('%Y%m%dT%H%M%S%f')
+    os.makedirs(root, exist_ok=True)
+    temporary_path = os.path.join(root, f'.{version}.{os.getpid()}.tmp')
+    os.makedirs(temporary_path)
+    for name, values in arrays.items():
+        np.save(os.path.join(temporary_path, f'{name}.npy'), np.ascontiguousarray(values))
+    with open(os.path.join(temporary_path, MANIFEST_FILE), 'w') as manifest_file:
+        json.dump({**manifest, 'version': version, 'arrays': sorted(arrays)}, manifest_file)
+    os.rename(temporary_path, os.path.join(root, version))
+
+    current_path = os.path.join(root, f'{CURRENT_FILE}.{os.getpid()}.tmp')
+    with open(current_path, 'w') as current_file:
+        current_file.write(version)
+    os.replace(current_path, os.path.join(root, CURRENT_FILE))
+    _published[:] = [version, time.time()]
+
+    _prune_versions(root, version)
+    return FeatureStore(os.path.join(root, version))
+
+
+def _prune_versions(root: str, current: str):
+    versions = sorted(name for name in os.listdir(root) if VERSION_PATTERN.match(name) and name != current)
+    for name in versions[:max(len(versions) - settings.JOB_FEATURE_STORE_KEEP + 1, 0)]:
+        # Workers that still map these files keep reading them until they swap
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
@@ -0,0 +1,18 @@
+"""
+Server-side job ingestion from external job search APIs.
+
+Provider adapters (Adzuna, Jooble, CareerJet) stream result pages,
+normalize each item into JobListing fields and upsert them in batches
+keyed on external_id. Runs are rate-limited per provider and resume from
+the last stored page; see ``python manage.py ingest_jobs`` and the
+``jobs.tasks.ingest_jobs`` beat task.
+"""
+from .pipeline import ingest, ingest_all, upsert_listings
+from .providers import PROVIDERS, JobProvider, AdzunaProvider, JoobleProvider, CareerJetProvider, ProviderError
+from .streaming import StreamingJSONError, iter_json_array
+
+__all__ = [
+    'ingest', 'ingest_all', 'upsert_listings',
+    'PROVIDERS', 'JobProvider', 'AdzunaProvider', 'JoobleProvider', 'CareerJetProvider', 'ProviderError',
+    'StreamingJSONError', 'iter_json_array',
+]
@@ -0,0 +1,194 @@
+import time
+import logging
+import httpx
+from django.conf import settings
+from django.db.models import Sum
+from django.utils import timezone
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+from core.geo import locate
+from core.llm.ratelimit import LocalTokenBucket
+from ..dedup import assign_canonicals, promote_orphaned_duplicates
+from ..models import JobListing, IngestionState
+from .providers import PROVIDERS, JobProvider, ProviderError
+from .streaming import StreamingJSONError
+
+logger = logging.getLogger(__name__)
+
+# Refreshed on every upsert; created_at and the id stay as first ingested
+UPSERT_FIELDS = [
+    'source', 'title', 'company', 'location', 'place_id', 'latitude', 'longitude', 'is_remote',
+    'description', 'requirements', 'salary_min', 'salary_max', 'employment_type', 'experience_level', 'skills_required',
+    'apply_url', 'posted_date', 'expires_date', 'is_active', 'updated_at',
+]
+
+# Per-provider request pacing within this process
+_pacers = {}
+
+
+def upsert_listings(listings: Iterable[Dict[str, Any]]) -> Tuple[List[int], List[int]]:
+    """
+    Insert or refresh listings keyed on external_id in batched upserts
+
+    Returns:
+        Ids of all upserted listings, and of those that did not exist before
+    """
+    # One statement may not touch the same row twice; the last copy wins
+    by_external_id = {listing['external_id']: listing for listing in listings}
+    if not by_external_id:
+        return [], []
+
+    existing = set(
+        JobListing.objects.filter(external_id__in=list(by_external_id)).values_list('external_id', flat=True)
+    )
+    jobs = [JobListing(**listing) for listing in by_external_id.values()]
+    # bulk_create skips pre_save, so listings are placed here
+    for job in jobs:
+        locate(job)
+    JobListing.objects.bulk_create(
+        jobs,
+        batch_size=settings.JOB_INGEST_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['external_id'],
+        update_fields=UPSERT_FIELDS,
+    )
+    ids = dict(JobListing.objects.filter(external_id__in=list(by_external_id)).values_list('external_id', 'id'))
+    return list(ids.values()), [job_id for external_id, job_id in ids.items() if external_id not in existing]
+
+
+def quota_left(provider: JobProvider) -> int:
+    """Requests the provider's daily quota still allows, across every query"""
+    used = IngestionState.objects.filter(
+        provider=provider.name, quota_date=timezone.localdate()
+    ).aggregate(total=Sum('requests_today'))['total'] or 0
+    return provider.limits['daily'] - used
+
+
+def ingest(provider: JobProvider, query: str, location: str = '', max_pages: Optional[int] = None,
+           restart: bool = False) -> Dict[str, Any]:
+    """
+    Sweep one provider query page by page into JobListing
+
+    Listings are normalized as each page streams in and upserted once
+    JOB_INGEST_BATCH_SIZE have accumulated; the next page to fetch is saved
+    with each upsert, so a run stopped by an error, the daily quota or a
+    crash resumes where it left off. A short page or max_pages ends the
+    sweep and the next run starts again from page 1. Upserted listings
+    are clustered with their near-duplicates, and new canonical listings
+    are queued for match precomputation.
+
+    Args:
+        provider: Provider adapter to fetch with
+        query: Search keywords
+        location: Location filter passed to the provider
+        max_pages: Pages per sweep; JOB_INGEST_MAX_PAGES by default
+        restart: Start from page 1 even if the last sweep is unfinished
+
+    Returns:
+        Run statistics
+    """
+    from ..tasks import schedule_new_job_matches
+
+    max_pages = max_pages or settings.JOB_INGEST_MAX_PAGES
+    state, _ = IngestionState.objects.get_or_create(provider=provider.name, query=query, location=location)
+    page = 1 if restart else state.next_page
+    stats = {'provider': provider.name, 'query': query, 'location': location, 'start_page': page,
+             'pages': 0, 'listings': 0, 'created': 0, 'duplicates': 0, 'completed': False, 'stopped': None}
+    pending = []
+
+    def flush():
+        job_ids, new_ids = upsert_listings(pending)
+        duplicates = set()
+        if settings.JOB_DEDUP_ENABLED:
+            # Delisted canonical listings hand their clusters over before the batch is clustered
+            promote_orphaned_duplicates(job_ids)
+            duplicates = assign_canonicals(job_ids)
+        stats['created'] += len(new_ids)
+        stats['duplicates'] += len(duplicates)
+        schedule_new_job_matches([job_id for job_id in new_ids if job_id not in duplicates])
+        pending.clear()
+        state.next_page = page
+        state.save(update_fields=['next_page', 'listings_seen', 'quota_date', 'requests_today', 'updated_at'])
+
+    try:
+        while page <= max_pages:
+            if provider.fixtures_dir is None:
+                if quota_left(provider) <= 0:
+                    stats['stopped'] = 'daily quota exhausted'
+                    break
+                _pace(provider)
+                _count_request(state)
+
+            items = list(provider.fetch_page(query, location, page))
+            listings = [listing for listing in items if listing is not None]
+            pending.extend(listings)
+            stats['pages'] += 1
+            stats['listings'] += len(listings)
+            state.listings_seen += len(listings)
+            page += 1
+
+            if len(items) < provider.page_size:
+                stats['completed'] = True
+                break
+            if len(pending) >= settings.JOB_INGEST_BATCH_SIZE:
+                flush()
+        else:
+            stats['completed'] = True
+    except (ProviderError, StreamingJSONError) as e:
+        # The failed page is fetched again on the next run
+        logger.warning(f"Job ingestion from {provider.name} stopped at page {page}: {str(e)}")
+        stats['stopped'] = str(e)
+
+    if stats['completed']:
+        page = 1
+        state.last_completed_at = timezone.now()
+        state.save(update_fields=['last_completed_at'])
+    flush()
+    logger.info(f"Ingested {stats['listings']} {provider.name} listings ({stats['created']} new, "
+                f"{stats['duplicates']} duplicates) "
+                f"for '{query}' in '{location}' from {stats['pages']} pages")
+    return stats
+
+
+def ingest_all(provider_names: Optional[List[str]] = None, queries: Optional[List[tuple]] = None,
+               fixtures_dir: Optional[str] = None, max_pages: Optional[int] = None,
+               restart: bool = False) -> List[Dict[str, Any]]:
+    """
+    Run every (keywords, location) query against each provider
+
+    Providers without credentials are skipped unless reading fixture feeds.
+    """
+    provider_names = provider_names or list(PROVIDERS)
+    queries = queries or settings.JOB_INGEST_QUERIES
+    results = []
+    with httpx.Client(timeout=settings.JOB_INGEST_TIMEOUT,
+                      headers={'User-Agent': settings.JOB_INGEST_USER_AGENT}) as client:
+        for name in provider_names:
+            provider = PROVIDERS[name](client=client, fixtures_dir=fixtures_dir)
+            if fixtures_dir is None and not provider.is_configured():
+                logger.info(f"Skipping job ingestion from {name}: no credentials configured")
+                continue
+            for query, location in queries:
+                results.append(ingest(provider, query, location, max_pages=max_pages, restart=restart))
+    return results
+
+
+def _pace(provider: JobProvider):
+    """Hold requests to the provider's per-second limit"""
+    bucket = _pacers.get(provider.name)
+    if bucket is None:
+        per_second = provider.limits['per_second']
+        bucket = _pacers.setdefault(provider.name, LocalTokenBucket(1, per_second))
+    while True:
+        wait = bucket.take(1)
+        if wait <= 0:
+            return
+        time.sleep(wait)
+
+
+def _count_request(state: IngestionState):
+    today = timezone.localdate()
+    if state.quota_date != today:
+        state.quota_date = today
+        state.requests_today = 0
+    state.requests_today += 1
+    state.save(update_fields=['quota_date', 'requests_today', 'updated_at'])
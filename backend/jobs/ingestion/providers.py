@@ -0,0 +1,351 @@
+import hashlib
+import os
+import re
+import logging
+import httpx
+from datetime import datetime, timezone as dt_timezone
+from email.utils import parsedate_to_datetime
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.html import strip_tags
+from typing import Dict, List, Any, Iterator, Optional
+from ..models import JobListing
+from .streaming import iter_json_array
+
+logger = logging.getLogger(__name__)
+
+# Skills recognised in provider descriptions, which rarely list them separately
+SKILL_VOCABULARY = [
+    'Python', 'JavaScript', 'TypeScript', 'Java', 'Go', 'Rust', 'C++', 'C#', 'Ruby', 'PHP', 'Swift', 'Kotlin',
+    'React', 'Angular', 'Vue.js', 'Node.js', 'Django', 'Flask', 'Spring', 'HTML', 'CSS', 'SQL',
+    'PostgreSQL', 'MySQL', 'MongoDB', 'Redis', 'AWS', 'Azure', 'GCP', 'Docker', 'Kubernetes', 'Terraform',
+    'Git', 'Linux', 'TensorFlow', 'PyTorch', 'Machine Learning', 'Tableau', 'Power BI', 'Excel',
+    'Figma', 'Sketch', 'Adobe XD', 'Photoshop', 'Illustrator', 'SEO', 'Google Analytics',
+    'Content Marketing', 'Social Media', 'Email Marketing', 'Salesforce', 'HubSpot',
+]
+
+SKILL_PATTERNS = [
+    (skill, re.compile(r'(?<![\w+#.])' + re.escape(skill.lower()) + r'(?![\w+#])'))
+    for skill in SKILL_VOCABULARY
+]
+
+# Title keywords for JobListing.experience_level, most specific first
+EXPERIENCE_KEYWORDS = [
+    ('expert', ('principal', 'staff ', 'director', 'head of', 'vp ')),
+    ('senior', ('senior', 'sr.', 'sr ', 'lead')),
+    ('entry', ('junior', 'jr.', 'graduate', 'entry', 'intern', 'trainee', 'apprentice')),
+]
+
+EMPLOYMENT_TYPES = {
+    'full_time': 'full-time', 'full-time': 'full-time', 'full time': 'full-time', 'permanent': 'full-time',
+    'part_time': 'part-time', 'part-time': 'part-time', 'part time': 'part-time',
+    'contract': 'contract', 'contractor': 'contract', 'temporary': 'contract', 'temp': 'contract',
+    'internship': 'internship', 'intern': 'internship',
+}
+
+# CareerJet's one-letter contracttype codes (p = permanent)
+CAREERJET_CONTRACT_TYPES = {'p': 'full-time', 'c': 'contract', 't': 'contract', 'i': 'internship'}
+
+SALARY_NUMBER = re.compile(r'(\d[\d,.]*)\s*(k\b)?', re.IGNORECASE)
+
+
+class ProviderError(Exception):
+    """A provider request failed; the run stops and resumes from the same page next time"""
+
+
+def extract_skills(text: str, limit: int = 10) -> List[str]:
+    text = (text or '').lower()
+    return [skill for skill, pattern in SKILL_PATTERNS if pattern.search(text)][:limit]
+
+
+def infer_experience_level(title: str) -> str:
+    title = f' {(title or "").lower()} '
+    for level, keywords in EXPERIENCE_KEYWORDS:
+        if any(keyword in title for keyword in keywords):
+            return level
+    return 'mid'
+
+
+def normalize_employment_type(*values: Optional[str]) -> str:
+    for value in values:
+        employment_type = EMPLOYMENT_TYPES.get((value or '').strip().lower())
+        if employment_type:
+            return employment_type
+    return 'full-time'
+
+
+def parse_salary(text: Optional[str]) -> tuple:
+    """
+    (min, max) annual salary from free text such as "$50,000 - $70,000" or "£30k";
+    hourly and daily rates are left out rather than guessed
+    """
+    text = (text or '').lower()
+    if not text or any(unit in text for unit in ('hour', '/hr', ' ph', 'per day', 'daily', '/day')):
+        return None, None
+    amounts = []
+    for number, thousands in SALARY_NUMBER.findall(text):
+        try:
+            amount = float(number.replace(',', ''))
+        except ValueError:
+            continue
+        amounts.append(int(amount * 1000 if thousands else amount))
+    amounts = [amount for amount in amounts if amount >= 1000]
+    if not amounts:
+        return None, None
+    return min(amounts), max(amounts)
+
+
+def parse_posted_date(value: Optional[str]) -> datetime:
+    """Provider dates come as ISO 8601 or RFC 2822; unparseable ones count as now"""
+    if value:
+        try:
+            parsed = parse_datetime(value)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            try:
+                parsed = parsedate_to_datetime(value)
+            except (TypeError, ValueError):
+                parsed = None
+        if parsed is not None:
+            return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed, dt_timezone.utc)
+    return timezone.now()
+
+
+def is_remote_listing(*texts: Optional[str]) -> bool:
+    return any(re.search(r'\bremote\b|\bwork from home\b', (text or '').lower()) for text in texts)
+
+
+def listing_fields(source: str, provider_id: Any, title: str, company: str, location: str,
+                   description: str, apply_url: str, posted: Optional[str], salary_min=None, salary_max=None,
+                   employment_type: str = 'full-time') -> Optional[Dict[str, Any]]:
+    """
+    JobListing field values for one provider item, truncated to the column
+    sizes; None when the item lacks a title or apply link
+    """
+    title = strip_tags(title or '').strip()
+    if not title or not apply_url:
+        return None
+    description = strip_tags(description or '').strip()
+    if provider_id in (None, ''):
+        # Some feeds have no stable id; the apply link identifies the posting instead
+        provider_id = hashlib.sha1(apply_url.encode('utf-8')).hexdigest()[:24]
+    if len(apply_url) > JobListing._meta.get_field('apply_url').max_length:
+        return None
+
+    return {
+        'external_id': f'{source}_{provider_id}'[:100],
+        'source': source,
+        'title': title[:200],
+        'company': strip_tags(company or '').strip()[:100] or 'Unknown',
+        'location': (location or '').strip()[:100],
+        'is_remote': is_remote_listing(location, title),
+        'description': description,
+        'requirements': '',
+        'salary_min': int(float(salary_min)) if salary_min else None,
+        'salary_max': int(float(salary_max)) if salary_max else None,
+        'employment_type': employment_type,
+        'experience_level': infer_experience_level(title),
+        'skills_required': extract_skills(f'{title} {description}'),
+        'apply_url': apply_url,
+        'posted_date': parse_posted_date(posted),
+        'expires_date': None,
+        'is_active': True,
+    }
+
+
+class JobProvider:
+    """
+    Adapter for one job search API
+
+    Subclasses describe the request for a results page, where the results
+    array sits in the response and how an item maps onto JobListing.
+    Pages are streamed and parsed item by item. With a fixtures directory,
+    pages are read from <fixtures_dir>/<name>/page_<n>.json instead of the
+    network, and a missing file ends the feed.
+    """
+    name = ''
+    results_key = 'jobs'
+    page_size = 50
+
+    def __init__(self, client: Optional[httpx.Client] = None, fixtures_dir: Optional[str] = None):
+        self.client = client
+        self.fixtures_dir = fixtures_dir
+
+    @property
+    def limits(self) -> Dict[str, Any]:
+        return settings.JOB_INGEST_PROVIDER_LIMITS[self.name]
+
+    def is_configured(self) -> bool:
+        """Whether credentials are set (fixture feeds need none)"""
+        raise NotImplementedError
+
+    def build_request(self, query: str, location: str, page: int) -> httpx.Request:
+        raise NotImplementedError
+
+    def normalize(self, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def fetch_page(self, query: str, location: str, page: int) -> Iterator[Optional[Dict[str, Any]]]:
+        """
+        Yield the normalized listing for each item of one results page
+
+        Unusable or malformed items yield None, so callers can still tell
+        a full page from the last one.
+        """
+        for item in iter_json_array(self._page_text(query, location, page), self.results_key):
+            listing = None
+            try:
+                if isinstance(item, dict):
+                    listing = self.normalize(item)
+            except (TypeError, ValueError, AttributeError) as e:
+                logger.debug(f"Skipping malformed {self.name} item: {str(e)}")
+            yield listing
+
+    def _page_text(self, query: str, location: str, page: int) -> Iterator[str]:
+        if self.fixtures_dir is not None:
+            path = os.path.join(self.fixtures_dir, self.name, f'page_{page}.json')
+            if not os.path.exists(path):
+                yield f'{{"{self.results_key}": []}}'
+                return
+            with open(path, encoding='utf-8') as feed:
+                while True:
+                    chunk = feed.read(65536)
+                    if not chunk:
+                        return
+                    yield chunk
+
+        request = self.build_request(query, location, page)
+        try:
+            response = self.client.send(request, stream=True)
+        except httpx.HTTPError as e:
+            raise ProviderError(f"{self.name} request failed: {str(e)}") from e
+        try:
+            if response.status_code != 200:
+                raise ProviderError(f"{self.name} returned HTTP {response.status_code}")
+            yield from response.iter_text()
+        except httpx.HTTPError as e:
+            raise ProviderError(f"{self.name} response failed: {str(e)}") from e
+        finally:
+            response.close()
+
+
+class AdzunaProvider(JobProvider):
+    name = 'adzuna'
+    results_key = 'results'
+
+    def is_configured(self) -> bool:
+        return bool(settings.ADZUNA_APP_ID and settings.ADZUNA_APP_KEY)
+
+    def build_request(self, query: str, location: str, page: int) -> httpx.Request:
+        return self.client.build_request(
+            'GET',
+            f'{settings.ADZUNA_BASE_URL}/{settings.ADZUNA_COUNTRY}/search/{page}',
+            params={
+                'app_id': settings.ADZUNA_APP_ID,
+                'app_key': settings.ADZUNA_APP_KEY,
+                'what': query,
+                'where': location,
+                'results_per_page': self.page_size,
+                'sort_by': 'date',
+                'content-type': 'application/json',
+            },
+        )
+
+    def normalize(self, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return listing_fields(
+            self.name, item.get('id'),
+            title=item.get('title'),
+            company=(item.get('company') or {}).get('display_name'),
+            location=(item.get('location') or {}).get('display_name'),
+            description=item.get('description'),
+            apply_url=item.get('redirect_url'),
+            posted=item.get('created'),
+            salary_min=item.get('salary_min'),
+            salary_max=item.get('salary_max'),
+            employment_type=normalize_employment_type(item.get('contract_type'), item.get('contract_time')),
+        )
+
+
+class JoobleProvider(JobProvider):
+    name = 'jooble'
+    results_key = 'jobs'
+    page_size = 20
+
+    def is_configured(self) -> bool:
+        return bool(settings.JOOBLE_API_KEY)
+
+    def build_request(self, query: str, location: str, page: int) -> httpx.Request:
+        return self.client.build_request(
+            'POST',
+            f'{settings.JOOBLE_BASE_URL}/{settings.JOOBLE_API_KEY}',
+            json={'keywords': query, 'location': location, 'page': page, 'ResultOnPage': self.page_size},
+        )
+
+    def normalize(self, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        salary_min, salary_max = parse_salary(item.get('salary'))
+        return listing_fields(
+            self.name, item.get('id'),
+            title=item.get('title'),
+            company=item.get('company'),
+            location=item.get('location'),
+            description=item.get('snippet'),
+            apply_url=item.get('link'),
+            posted=item.get('updated'),
+            salary_min=salary_min,
+            salary_max=salary_max,
+            employment_type=normalize_employment_type(item.get('type')),
+        )
+
+
+class CareerJetProvider(JobProvider):
+    name = 'careerjet'
+    results_key = 'jobs'
+
+    def is_configured(self) -> bool:
+        return bool(settings.CAREERJET_AFFILIATE_ID)
+
+    def build_request(self, query: str, location: str, page: int) -> httpx.Request:
+        return self.client.build_request(
+            'GET',
+            settings.CAREERJET_BASE_URL,
+            params={
+                'affid': settings.CAREERJET_AFFILIATE_ID,
+                'keywords': query,
+                'location': location,
+                'pagesize': self.page_size,
+                'page': page,
+                'sort': 'date',
+                # Required by the API to identify the end user; this is a server-side crawl
+                'user_ip': settings.CAREERJET_USER_IP,
+                'user_agent': self.client.headers.get('User-Agent', ''),
+            },
+        )
+
+    def normalize(self, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        salary_min, salary_max = item.get('salary_min'), item.get('salary_max')
+        if not salary_min and not salary_max:
+            salary_min, salary_max = parse_salary(item.get('salary'))
+        if (item.get('contractperiod') or '').lower() == 'p':
+            employment_type = 'part-time'
+        else:
+            employment_type = CAREERJET_CONTRACT_TYPES.get((item.get('contracttype') or '').lower(), 'full-time')
+        return listing_fields(
+            self.name, item.get('jobid'),
+            title=item.get('jobtitle') or item.get('title'),
+            company=item.get('company'),
+            location=item.get('locations'),
+            description=item.get('jobdescription') or item.get('description'),
+            apply_url=item.get('url'),
+            posted=item.get('date'),
+            salary_min=salary_min,
+            salary_max=salary_max,
+            employment_type=employment_type,
+        )
+
+
+PROVIDERS = {
+    provider.name: provider
+    for provider in (AdzunaProvider, JoobleProvider, CareerJetProvider)
+}
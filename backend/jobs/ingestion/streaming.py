@@ -0,0 +1,122 @@
+import json
+from typing import Any, Iterable, Iterator
+
+WHITESPACE = ' \t\r\n'
+
+
+class StreamingJSONError(ValueError):
+    """The feed is not valid JSON or lacks the expected array"""
+
+
+def iter_json_array(chunks: Iterable[str], key: str) -> Iterator[Any]:
+    """
+    Yield the items of the array stored under a top-level key of a JSON
+    object as the text streams in
+
+    Only the item being decoded is buffered, so a large provider page is
+    normalized item by item instead of being parsed whole. Keys of nested
+    objects are never mistaken for the top-level key.
+
+    Args:
+        chunks: Decoded text of the response body, in pieces of any size
+        key: Top-level key holding the array, e.g. 'results'
+    """
+    chunks = iter(chunks)
+    buffer = ''
+    position = 0
+    exhausted = False
+
+    def read_more(keep_from: int) -> bool:
+        """Append the next chunk, dropping the text before keep_from"""
+        nonlocal buffer, position, exhausted
+        for chunk in chunks:
+            if chunk:
+                buffer = buffer[keep_from:] + chunk
+                position -= keep_from
+                return True
+        exhausted = True
+        return False
+
+    # Scan the outer object for the key, skipping over nested values
+    depth = 0
+    in_string = False
+    escaped = False
+    string_start = None
+    last_key = None
+    awaiting_value = False
+    while True:
+        if position >= len(buffer):
+            # Keep a key that is still being read
+            keep_from = position if string_start is None else string_start
+            if not read_more(keep_from):
+                raise StreamingJSONError(f"Feed ended before the '{key}' array")
+            if string_start is not None:
+                string_start -= keep_from
+            continue
+        char = buffer[position]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+                if depth == 1 and not awaiting_value:
+                    last_key = json.loads(buffer[string_start:position + 1])
+                string_start = None
+            position += 1
+            continue
+
+        if char == '"':
+            in_string = True
+            if depth == 1 and not awaiting_value:
+                string_start = position
+        elif char == ':' and depth == 1:
+            awaiting_value = True
+        elif char == ',' and depth == 1:
+            awaiting_value = False
+            last_key = None
+        elif char in '{[':
+            if depth == 1 and awaiting_value and char == '[' and last_key == key:
+                position += 1
+                break
+            depth += 1
+        elif char in '}]':
+            depth -= 1
+            if depth == 0:
+                raise StreamingJSONError(f"Feed has no '{key}' array")
+        position += 1
+
+    decoder = json.JSONDecoder()
+    expect_item = True
+    while True:
+        while position < len(buffer) and buffer[position] in WHITESPACE:
+            position += 1
+        if position >= len(buffer):
+            if not read_more(position):
+                raise StreamingJSONError(f"Feed ended inside the '{key}' array")
+            continue
+
+        char = buffer[position]
+        if char == ']':
+            return
+        if not expect_item:
+            if char != ',':
+                raise StreamingJSONError(f"Expected ',' between items of the '{key}' array")
+            position += 1
+            expect_item = True
+            continue
+
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            item, end = None, None
+        # A value touching the end of the buffer may be cut short (a number, or a truncated item)
+        if end is None or (end >= len(buffer) and not exhausted):
+            if read_more(position):
+                continue
+            if end is None:
+                raise StreamingJSONError(f"Invalid item in the '{key}' array")
+        position = end
+        expect_item = False
+        yield item
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from jobs.feature_store import publish_feature_store
+
+
+class Command(BaseCommand):
+    help = (
+        "Publish a new version of the shared job feature store that workers memory-map "
+        "(JOB_FEATURE_STORE_ENABLED=True). Job ingestion publishes one after every run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--root', default=settings.JOB_FEATURE_STORE_DIR,
+                            help='Store directory; defaults to JOB_FEATURE_STORE_DIR')
+
+    def handle(self, *args, **options):
+        store = publish_feature_store(options['root'])
+        embeddings = 'with' if 'vectors' in store else 'without'
+        self.stdout.write(self.style.SUCCESS(
+            f"Published feature store {store.version}: {store.manifest['jobs']} jobs, "
+            f"{len(store.manifest['skills'])} skills, {embeddings} embeddings, in {store.path}"
+        ))
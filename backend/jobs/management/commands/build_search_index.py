@@ -0,0 +1,25 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from jobs.bm25 import BM25Index
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the BM25 job search index from active listings and write a snapshot "
+        "that workers restore at start (JOB_SEARCH_BACKEND=bm25)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=settings.JOB_SEARCH_SNAPSHOT_PATH,
+                            help='Snapshot path; defaults to JOB_SEARCH_SNAPSHOT_PATH')
+
+    def handle(self, *args, **options):
+        start_time = time.time()
+        index = BM25Index()
+        index.load()
+        index.save(options['output'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {len(index)} jobs ({len(index.vocabulary)} terms) into {options['output']} "
+            f"in {time.time() - start_time:.1f}s"
+        ))
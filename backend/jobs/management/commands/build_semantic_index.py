@@ -0,0 +1,26 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from jobs.semantic import SemanticIndex
+
+
+class Command(BaseCommand):
+    help = (
+        "Embed active listings into the semantic job index and write a snapshot "
+        "that workers restore at start (JOB_SEMANTIC_ENABLED=True)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=settings.JOB_SEMANTIC_SNAPSHOT_PATH,
+                            help='Snapshot path; defaults to JOB_SEMANTIC_SNAPSHOT_PATH')
+
+    def handle(self, *args, **options):
+        start_time = time.time()
+        index = SemanticIndex()
+        index.load()
+        index.save(options['output'])
+        lists = 0 if index.centroids is None else len(index.centroids)
+        self.stdout.write(self.style.SUCCESS(
+            f"Embedded {len(index)} jobs ({lists} IVF lists) into {options['output']} "
+            f"in {time.time() - start_time:.1f}s"
+        ))
@@ -0,0 +1,28 @@
+import time
+from django.core.management.base import BaseCommand
+from jobs.dedup import assign_canonicals, promote_orphaned_duplicates
+from jobs.models import JobListing
+
+
+class Command(BaseCommand):
+    help = (
+        "Cluster active listings with their near-duplicates (MinHash/LSH). Ingestion does this "
+        "for every upserted batch; run once to backfill listings stored before it did, or after bulk "
+        "deactivations to hand the clusters of inactive canonical listings to a live member."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Listings clustered per transaction')
+
+    def handle(self, *args, **options):
+        start_time = time.time()
+        promoted = promote_orphaned_duplicates()
+        job_ids = list(JobListing.objects.filter(is_active=True).order_by('id').values_list('id', flat=True))
+        batch_size = options['batch_size']
+        duplicates = 0
+        for start in range(0, len(job_ids), batch_size):
+            duplicates += len(assign_canonicals(job_ids[start:start + batch_size]))
+        self.stdout.write(self.style.SUCCESS(
+            f"Clustered {len(job_ids)} listings, {duplicates} duplicates, {promoted} clusters re-rooted, "
+            f"in {time.time() - start_time:.1f}s"
+        ))
@@ -0,0 +1,51 @@
+import time
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from core.geo import place_fields
+from core.models import UserProfile
+from jobs.models import JobListing
+
+PLACE_FIELDS = ['place_id', 'latitude', 'longitude']
+
+
+class Command(BaseCommand):
+    help = (
+        "Resolve the location of every job listing and user profile to its gazetteer place and coordinates. "
+        "Saves and ingestion do this as they write; run once to backfill older rows, or after changing "
+        "GAZETTEER_PATH."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows updated per statement')
+
+    def handle(self, *args, **options):
+        start_time = time.time()
+        for model, touch in ((JobListing, True), (UserProfile, False)):
+            changed, placed = self.geocode(model, options['batch_size'], touch)
+            self.stdout.write(f"{model.__name__}: {changed} updated, {placed} with a known place")
+        self.stdout.write(self.style.SUCCESS(f"Geocoded locations in {time.time() - start_time:.1f}s"))
+
+    def geocode(self, model, batch_size: int, touch: bool):
+        """Update rows whose place fields differ from their location's; touch bumps updated_at so indexes catch up"""
+        fields = PLACE_FIELDS + ['updated_at'] if touch else PLACE_FIELDS
+        changed = placed = 0
+        batch = []
+        rows = model.objects.order_by('id').only('id', 'location', *PLACE_FIELDS)
+        for row in rows.iterator(chunk_size=batch_size):
+            values = place_fields(row.location)
+            placed += bool(values['place_id'])
+            if all(getattr(row, field) == value for field, value in values.items()):
+                continue
+            for field, value in values.items():
+                setattr(row, field, value)
+            if touch:
+                row.updated_at = timezone.now()
+            batch.append(row)
+            if len(batch) >= batch_size:
+                model.objects.bulk_update(batch, fields)
+                changed += len(batch)
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, fields)
+            changed += len(batch)
+        return changed, placed
@@ -0,0 +1,45 @@
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from jobs.ingestion import PROVIDERS, ingest_all
+
+
+class Command(BaseCommand):
+    help = (
+        "Fetch job listings from the external providers into the database. Interrupted "
+        "sweeps resume from their last page; --fixtures-dir reads local feeds instead of the APIs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--provider', action='append', choices=sorted(PROVIDERS),
+                            help='Provider to fetch from (repeatable); all by default')
+        parser.add_argument('--query', help='Search keywords; JOB_INGEST_QUERIES by default')
+        parser.add_argument('--location', default='', help='Location for --query')
+        parser.add_argument('--max-pages', type=int, default=None,
+                            help='Pages per sweep; JOB_INGEST_MAX_PAGES by default')
+        parser.add_argument('--fixtures-dir', default=None,
+                            help='Read <dir>/<provider>/page_<n>.json instead of calling the APIs, '
+                                 'e.g. jobs/ingestion/fixtures')
+        parser.add_argument('--restart', action='store_true', help='Start every sweep again from page 1')
+
+    def handle(self, *args, **options):
+        fixtures_dir = options['fixtures_dir']
+        if fixtures_dir is not None and not os.path.isdir(fixtures_dir):
+            raise CommandError(f'No fixtures directory at {fixtures_dir}')
+        queries = [(options['query'], options['location'])] if options['query'] else settings.JOB_INGEST_QUERIES
+
+        results = ingest_all(
+            provider_names=options['provider'],
+            queries=queries,
+            fixtures_dir=fixtures_dir,
+            max_pages=options['max_pages'],
+            restart=options['restart'],
+        )
+        if not results:
+            self.stdout.write(self.style.WARNING('No provider has credentials configured'))
+        for result in results:
+            status = 'sweep complete' if result['completed'] else f"{result['stopped']}, resumes next run"
+            line = (f"{result['provider']} '{result['query']}' in '{result['location']}': "
+                    f"{result['listings']} listings, {result['created']} new, {result['duplicates']} duplicates, "
+                    f"pages {result['start_page']}-{result['start_page'] + result['pages'] - 1}, {status}")
+            self.stdout.write(self.style.SUCCESS(line) if result['stopped'] is None else self.style.WARNING(line))
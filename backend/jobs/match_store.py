@@ -0,0 +1,121 @@
+import hashlib
+import json
+import logging
+from decimal import Decimal, InvalidOperation
+from typing import Dict, List, Any, Iterable, Tuple
+from .models import JobListing, JobMatch, JobApplication
+from .ranking import JobRanker
+
+logger = logging.getLogger(__name__)
+
+# Analyses that are cheap to recompute and must not block a later LLM analysis
+UNSTORED_SOURCES = {'local', 'fallback'}
+# Profile data used only by local ranking; derived from fields that are hashed, and not sent to the LLM
+UNHASHED_PROFILE_FIELDS = ('coordinates',)
+
+
+def content_hash(data: Dict[str, Any]) -> str:
+    encoded = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def profile_hash(user_profile: Dict[str, Any]) -> str:
+    """Hash of the profile fields that feed a match analysis"""
+    return content_hash({
+        field: value for field, value in user_profile.items() if field not in UNHASHED_PROFILE_FIELDS
+    })
+
+
+def job_hash(job_data: Dict[str, Any]) -> str:
+    """Hash of the job content that feeds a match analysis"""
+    return content_hash(job_data)
+
+
+def match_score(analysis: Dict[str, Any]) -> Decimal:
+    """The analysis' match percentage as a 0-100 decimal"""
+    try:
+        score = Decimal(str(analysis.get('match_percentage', 0)))
+    except (InvalidOperation, ValueError):
+        return Decimal('0.00')
+    if not score.is_finite():
+        return Decimal('0.00')
+    return min(max(score, Decimal(0)), Decimal(100)).quantize(Decimal('0.01'))
+
+
+def load_matches(user, user_profile: Dict[str, Any],
+                 jobs_data: Iterable[Dict[str, Any]]) -> Dict[int, JobMatch]:
+    """
+    Stored analyses for these jobs that are still valid
+
+    Args:
+        user: User the matches belong to
+        user_profile: Current profile dictionary of the user
+        jobs_data: Current job dictionaries from get_job_match_data
+
+    Returns:
+        JobMatch rows by job id whose profile and job hashes match the current content
+    """
+    jobs_data = {job_data['id']: job_data for job_data in jobs_data}
+    if not jobs_data:
+        return {}
+
+    current_profile = profile_hash(user_profile)
+    valid = {}
+    for match in JobMatch.objects.filter(user=user, job_id__in=list(jobs_data)):
+        if match.profile_hash == current_profile and match.job_hash == job_hash(jobs_data[match.job_id]):
+            valid[match.job_id] = match
+    return valid
+
+
+def save_matches(user, user_profile: Dict[str, Any],
+                 results: Iterable[Tuple[Dict[str, Any], Dict[str, Any]]]) -> List[JobMatch]:
+    """
+    Store LLM analyses, replacing older ones, and copy their scores onto the
+    user's applications for those jobs
+
+    Args:
+        user: User the matches belong to
+        user_profile: Profile dictionary the analyses were computed from
+        results: (job_data, match_analysis) pairs; local and fallback analyses are skipped
+    """
+    current_profile = profile_hash(user_profile)
+    matches = [
+        JobMatch(
+            user=user,
+            job_id=job_data['id'],
+            score=match_score(analysis),
+            analysis=analysis,
+            profile_hash=current_profile,
+            job_hash=job_hash(job_data),
+            model=str(analysis.get('analysis_source', ''))[:50],
+        )
+        for job_data, analysis in results
+        if analysis.get('analysis_source') not in UNSTORED_SOURCES
+    ]
+    if not matches:
+        return []
+
+    try:
+        JobMatch.objects.bulk_create(
+            matches,
+            update_conflicts=True,
+            unique_fields=['user', 'job'],
+            update_fields=['score', 'analysis', 'profile_hash', 'job_hash', 'model', 'created_at'],
+        )
+        for match in matches:
+            JobApplication.objects.filter(user=user, job_id=match.job_id).update(match_score=match.score)
+    except Exception as e:
+        # Losing a stored match only costs a recomputation later
+        logger.warning(f"Could not store job matches: {str(e)}")
+        return []
+    return matches
+
+
+def application_match_score(user, user_profile: Dict[str, Any], job: JobListing,
+                            job_data: Dict[str, Any]) -> Decimal:
+    """Score for a new application: the stored analysis if still valid, else the local ranking score"""
+    stored = load_matches(user, user_profile, [job_data]).get(job.id)
+    if stored is not None:
+        return stored.score
+    ranker = JobRanker([job])
+    return match_score({'match_percentage': float(ranker.score(user_profile)['score'][0])})
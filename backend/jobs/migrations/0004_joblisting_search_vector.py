@@ -0,0 +1,63 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:02
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+# Weights: A title, B company, C requirements, D description
+SEARCH_VECTOR_SQL = """
+    setweight(to_tsvector('{config}', coalesce({row}title, '')), 'A') ||
+    setweight(to_tsvector('{config}', coalesce({row}company, '')), 'B') ||
+    setweight(to_tsvector('{config}', coalesce({row}requirements, '')), 'C') ||
+    setweight(to_tsvector('{config}', coalesce({row}description, '')), 'D')
+"""
+
+
+def create_search_trigger(apps, schema_editor):
+    """Maintain search_vector in the database so bulk writes and .update() stay searchable"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    config = settings.JOB_SEARCH_CONFIG
+    schema_editor.execute(f"""
+        CREATE OR REPLACE FUNCTION jobs_joblisting_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := {SEARCH_VECTOR_SQL.format(config=config, row='NEW.')};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql;
+    """)
+    schema_editor.execute("""
+        CREATE TRIGGER jobs_joblisting_search_vector_trigger
+        BEFORE INSERT OR UPDATE ON jobs_joblisting
+        FOR EACH ROW EXECUTE FUNCTION jobs_joblisting_search_vector_update();
+    """)
+    schema_editor.execute(
+        f"UPDATE jobs_joblisting SET search_vector = {SEARCH_VECTOR_SQL.format(config=config, row='')};"
+    )
+    schema_editor.execute(
+        "CREATE INDEX jobs_joblisting_search_vector_gin ON jobs_joblisting USING gin (search_vector);"
+    )
+
+
+def drop_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS jobs_joblisting_search_vector_gin;")
+    schema_editor.execute("DROP TRIGGER IF EXISTS jobs_joblisting_search_vector_trigger ON jobs_joblisting;")
+    schema_editor.execute("DROP FUNCTION IF EXISTS jobs_joblisting_search_vector_update();")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0003_jobmatch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='joblisting',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_trigger, drop_search_trigger),
+    ]
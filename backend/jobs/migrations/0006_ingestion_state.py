@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0005_joblisting_posted_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='joblisting',
+            name='apply_url',
+            field=models.URLField(max_length=1000),
+        ),
+        migrations.CreateModel(
+            name='IngestionState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(max_length=50)),
+                ('query', models.CharField(max_length=200)),
+                ('location', models.CharField(blank=True, max_length=100)),
+                ('next_page', models.PositiveIntegerField(default=1)),
+                ('listings_seen', models.PositiveIntegerField(default=0)),
+                ('last_completed_at', models.DateTimeField(blank=True, null=True)),
+                ('quota_date', models.DateField(blank=True, null=True)),
+                ('requests_today', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('provider', 'query', 'location')},
+            },
+        ),
+    ]
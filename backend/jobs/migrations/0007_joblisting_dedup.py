@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0006_ingestion_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='joblisting',
+            name='canonical',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='jobs.joblisting'),
+        ),
+        migrations.AddField(
+            model_name='joblisting',
+            name='dedup_signature',
+            field=models.BinaryField(null=True),
+        ),
+        migrations.CreateModel(
+            name='JobListingBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.BigIntegerField(db_index=True)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dedup_buckets', to='jobs.joblisting')),
+            ],
+        ),
+    ]
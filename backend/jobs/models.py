@@ -1,14 +1,31 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.utils import timezone
 from django.conf import settings
 
 
+class JobListingQuerySet(models.QuerySet):
+    def searchable(self):
+        """Active canonical listings: the ones searched, ranked and matched"""
+        return self.filter(is_active=True, canonical__isnull=True)
+
+
+class JobListingManager(models.Manager.from_queryset(JobListingQuerySet)):
+    def get_queryset(self):
+        # The search vector is only ever read inside the database, the signature only by jobs.dedup
+        return super().get_queryset().defer('search_vector', 'dedup_signature')
+
+
 class JobListing(models.Model):
     title = models.CharField(max_length=200)
     company = models.CharField(max_length=100)
     description = models.TextField()
     requirements = models.TextField()
     location = models.CharField(max_length=100)
+    # Gazetteer place (core.geo) the location names, set on save; blank/null when it names none
+    place_id = models.CharField(max_length=64, blank=True, default='')
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
     is_remote = models.BooleanField(default=False)
     salary_min = models.PositiveIntegerField(null=True, blank=True)
     salary_max = models.PositiveIntegerField(null=True, blank=True)
@@ -21,16 +38,32 @@ class JobListing(models.Model):
     # External data
     external_id = models.CharField(max_length=100, unique=True)
     source = models.CharField(max_length=50)  # API source
-    apply_url = models.URLField()
+    apply_url = models.URLField(max_length=1000)
     
     # Metadata
     posted_date = models.DateTimeField()
     expires_date = models.DateTimeField(null=True, blank=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    
+    # Near-duplicate clustering: duplicates point at the earliest listing of their cluster
+    canonical = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='duplicates')
+    dedup_signature = models.BinaryField(null=True, editable=False)
+    
+    # Weighted title/company/requirements/description vector; a PostgreSQL trigger keeps it current and a GIN index serves queries
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = JobListingManager()
 
     class Meta:
         ordering = ['-posted_date']
+        indexes = [
+            # Keyset pagination of the newest listings
+            models.Index(fields=['-posted_date', '-id'], name='jobs_listing_posted_idx'),
+            # Bounding-box prefilter of radius searches
+            models.Index(fields=['latitude', 'longitude'], name='jobs_listing_geo_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} at {self.company}"
@@ -68,4 +101,62 @@ class JobApplication(models.Model):
         ordering = ['-created_at']
 
     def __str__(self):
-        return f"{self.user.full_name} - {self.job.title}" 
\ No newline at end of file
+        return f"{self.user.full_name} - {self.job.title}" 
+
+
+class JobMatch(models.Model):
+    """Stored match analysis of a job for a user, valid while both content hashes still match"""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='job_matches')
+    job = models.ForeignKey(JobListing, on_delete=models.CASCADE, related_name='matches')
+    score = models.DecimalField(max_digits=5, decimal_places=2)
+    analysis = models.JSONField(default=dict)
+    
+    # Hashes of the profile fields and job content the analysis was computed from
+    profile_hash = models.CharField(max_length=64)
+    job_hash = models.CharField(max_length=64)
+    model = models.CharField(max_length=50, blank=True)
+    
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ['user', 'job']
+        ordering = ['-score']
+        indexes = [
+            models.Index(fields=['user', '-score'], name='jobs_match_user_score_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.full_name} - {self.job.title} ({self.score})"
+
+
+class JobListingBucket(models.Model):
+    """One LSH band bucket of a listing's MinHash signature; listings sharing a bucket are duplicate candidates"""
+    job = models.ForeignKey(JobListing, on_delete=models.CASCADE, related_name='dedup_buckets')
+    bucket = models.BigIntegerField(db_index=True)
+
+    def __str__(self):
+        return f"{self.job_id}: {self.bucket}"
+
+
+class IngestionState(models.Model):
+    """Progress of one provider query sweep, so interrupted runs resume and daily quotas hold across runs"""
+    provider = models.CharField(max_length=50)
+    query = models.CharField(max_length=200)
+    location = models.CharField(max_length=100, blank=True)
+    
+    # Next results page to fetch; back to 1 once a sweep completes
+    next_page = models.PositiveIntegerField(default=1)
+    listings_seen = models.PositiveIntegerField(default=0)
+    last_completed_at = models.DateTimeField(null=True, blank=True)
+    
+    # Provider requests made on quota_date for this query
+    quota_date = models.DateField(null=True, blank=True)
+    requests_today = models.PositiveIntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['provider', 'query', 'location']
+
+    def __str__(self):
+        return f"{self.provider}: {self.query} in {self.location or 'anywhere'} (page {self.next_page})"
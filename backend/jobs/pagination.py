@@ -0,0 +1,91 @@
+import base64
+import binascii
+import json
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.utils.urls import replace_query_param
+from typing import List, Any, Optional, Tuple
+
+# Orderings a cursor can continue: local match score or posting date, each followed by job id
+MATCH_ORDERING = 'match'
+RECENT_ORDERING = 'recent'
+
+
+class KeysetPagination:
+    """
+    Opaque cursor pagination over a (score or posted_date, id) ordering
+
+    The cursor holds the ordering key of the last job on the page, so the
+    next page starts strictly after it: no offsets, and jobs added or
+    removed meanwhile don't shift pages into duplicates or gaps.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, request, ordering: str):
+        self.request = request
+        self.ordering = ordering
+        self.page_size = self.get_page_size()
+        self.after = self.decode_cursor()
+
+    def get_page_size(self) -> int:
+        try:
+            page_size = int(self.request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return settings.JOB_PAGE_SIZE
+        return min(max(page_size, 1), settings.JOB_PAGE_SIZE_MAX)
+
+    def decode_cursor(self) -> Optional[Tuple[Any, int]]:
+        """The (key, job id) to continue after, or None on the first page"""
+        encoded = self.request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            ordering, key, job_id = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            if ordering != self.ordering:
+                raise ValueError(ordering)
+            if ordering == RECENT_ORDERING:
+                key = parse_datetime(key)
+                if key is None:
+                    raise ValueError(encoded)
+            else:
+                key = float(key)
+            return key, int(job_id)
+        except (TypeError, ValueError, UnicodeEncodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, key: Any, job_id: int) -> str:
+        if self.ordering == RECENT_ORDERING:
+            key = key.isoformat()
+        else:
+            key = float(key)
+        encoded = json.dumps([self.ordering, key, int(job_id)], separators=(',', ':'))
+        return base64.urlsafe_b64encode(encoded.encode('ascii')).decode('ascii')
+
+    def get_next_link(self, next_key: Optional[Tuple[Any, int]]) -> Optional[str]:
+        if next_key is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(*next_key))
+
+    def paginate_recent(self, queryset) -> Tuple[List[Any], Optional[Tuple[Any, int]]]:
+        """
+        One page of listings, newest first, straight from the database
+
+        Returns:
+            The page's listings and the (posted_date, id) key of its last
+            listing when more follow
+        """
+        queryset = queryset.order_by('-posted_date', '-id')
+        if self.after is not None:
+            posted_date, job_id = self.after
+            queryset = queryset.filter(Q(posted_date__lt=posted_date) | Q(posted_date=posted_date, id__lt=job_id))
+        # One extra row tells whether there is a next page
+        jobs = list(queryset[:self.page_size + 1])
+        if len(jobs) <= self.page_size:
+            return jobs, None
+        jobs = jobs[:self.page_size]
+        return jobs, (jobs[-1].posted_date, jobs[-1].id)
@@ -0,0 +1,254 @@
+import re
+import logging
+import numpy as np
+from django.conf import settings
+from typing import Dict, List, Any, Optional, Tuple
+from core.geo import haversine_km
+from .skill_index import SkillIndex, normalize_skill
+
+logger = logging.getLogger(__name__)
+
+# Ordinal experience levels shared by UserProfile.experience_level and job postings
+EXPERIENCE_RANKS = {'entry': 0, 'mid': 1, 'senior': 2, 'expert': 3}
+
+EXPERIENCE_KEYWORDS = [
+    (0, ('intern', 'junior', 'entry', 'graduate', 'trainee')),
+    (1, ('mid', 'intermediate', 'associate')),
+    (2, ('senior', 'lead')),
+    (3, ('principal', 'staff', 'expert', 'director', 'head of')),
+]
+
+
+def experience_rank(text: str) -> float:
+    """Map free-text experience requirements to 0-3, or NaN when unknown"""
+    text = (text or '').lower()
+    if text in EXPERIENCE_RANKS:
+        return float(EXPERIENCE_RANKS[text])
+    # Most specific level first so "senior lead" isn't read as entry
+    for rank, keywords in reversed(EXPERIENCE_KEYWORDS):
+        if any(keyword in text for keyword in keywords):
+            return float(rank)
+    years = re.search(r'(\d+)', text)
+    if years:
+        years = int(years.group(1))
+        return float(0 if years < 3 else 1 if years < 6 else 2 if years < 10 else 3)
+    return float('nan')
+
+
+class JobRanker:
+    """
+    Deterministic first-stage job scoring over a set of job listings.
+
+    Job features are packed into arrays once; each user is then scored
+    against every job in a single vectorized pass so only the best few
+    candidates need an LLM analysis. Scores combine skill overlap weighted
+    by skill rarity, experience-level fit, remote/location fit and salary
+    fit, each in [0, 1], into a 0-100 match score.
+
+    Skill overlap comes from a SkillIndex: the worker's catalog index when
+    one is passed (rarity then reflects the whole catalog), otherwise one
+    built over just these jobs. With a SemanticIndex and a profile
+    embedding, embedding similarity is a further factor. On-site jobs are
+    scored by distance when both sides have gazetteer coordinates.
+    """
+
+    def __init__(self, jobs: List[Any], skill_index: Optional[SkillIndex] = None, semantic_index=None):
+        self.jobs = jobs
+        self.semantic_index = semantic_index
+        self.job_ids = np.array([job.id for job in jobs], dtype=np.int64)
+        if skill_index is None:
+            skill_index = SkillIndex.from_jobs(jobs)
+        else:
+            skill_index.ensure(jobs)
+        self.skill_index = skill_index
+
+        self.experience = np.array([experience_rank(job.experience_level) for job in jobs], dtype=np.float32)
+        self.is_remote = np.array([bool(job.is_remote) for job in jobs], dtype=bool)
+        self.locations = np.array([(job.location or '').lower() for job in jobs], dtype=str)
+        self.latitude = np.array(
+            [job.latitude if job.latitude is not None else np.nan for job in jobs], dtype=np.float64
+        )
+        self.longitude = np.array(
+            [job.longitude if job.longitude is not None else np.nan for job in jobs], dtype=np.float64
+        )
+        self.salary_min = np.array(
+            [job.salary_min if job.salary_min else np.nan for job in jobs], dtype=np.float32
+        )
+        self.salary_max = np.array(
+            [job.salary_max if job.salary_max else np.nan for job in jobs], dtype=np.float32
+        )
+        # Postings with only one bound use it for both ends
+        self.salary_max = np.where(np.isnan(self.salary_max), self.salary_min, self.salary_max)
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def score(self, user_profile: Dict[str, Any], profile_vector: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """
+        Score every job for one user
+
+        Args:
+            user_profile: Profile data from get_user_profile_data
+            profile_vector: Profile embedding; adds the 'semantic' factor
+                when the ranker has a semantic index
+
+        Returns:
+            Arrays aligned with the job list: 'score' (0-100) and the
+            per-factor fits 'skills', 'experience', 'location', 'salary'
+            and possibly 'semantic'
+        """
+        weights = settings.JOB_RANK_WEIGHTS
+        factors = {
+            'skills': self._skill_fit(user_profile),
+            'experience': self._experience_fit(user_profile),
+            'location': self._location_fit(user_profile),
+            'salary': self._salary_fit(user_profile),
+        }
+        if profile_vector is not None and self.semantic_index is not None:
+            factors['semantic'] = self._semantic_fit(profile_vector)
+        total_weight = sum(weights.get(name, 0.0) for name in factors) or 1.0
+        combined = sum(weights.get(name, 0.0) * fit for name, fit in factors.items()) / total_weight
+        factors['score'] = np.clip(combined * 100, 0, 100)
+        return factors
+
+    def top_k(self, user_profile: Dict[str, Any], k: int,
+              profile_vector: Optional[np.ndarray] = None) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Indices of the k best jobs, best first, plus the full score arrays
+        """
+        factors = self.score(user_profile, profile_vector)
+        scores = factors['score']
+        k = max(0, min(k, len(scores)))
+        if k == 0:
+            return np.array([], dtype=np.int64), factors
+        # Partial sort, then order only the k survivors; ties keep job order
+        candidates = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        order = candidates[np.lexsort((candidates, -scores[candidates]))]
+        return order, factors
+
+    def page(self, scores: np.ndarray, size: int,
+             after: Optional[Tuple[float, int]] = None) -> Tuple[np.ndarray, bool]:
+        """
+        One keyset page of jobs ordered by score, highest first, then job id
+
+        Args:
+            scores: Score per job, from score()
+            size: Page size
+            after: (score, job id) of the last job on the previous page
+
+        Returns:
+            Indices of the page's jobs in order, and whether more jobs follow
+        """
+        remaining = np.ones(len(scores), dtype=bool)
+        if after is not None:
+            score, job_id = after
+            remaining = (scores < score) | ((scores == score) & (self.job_ids > job_id))
+        candidates = np.flatnonzero(remaining)
+        has_more = len(candidates) > size
+        if has_more:
+            # Keep every job tied with the page's lowest score so ties are cut by id, not partition order
+            threshold = np.partition(-scores[candidates], size - 1)[size - 1]
+            candidates = candidates[-scores[candidates] <= threshold]
+        order = candidates[np.lexsort((self.job_ids[candidates], -scores[candidates]))][:size]
+        return order, has_more
+
+    def local_match(self, index: int, user_profile: Dict[str, Any], factors: Dict[str, np.ndarray]) -> Dict[str, Any]:
+        """Match analysis for one job built from its first-stage scores"""
+        job = self.jobs[index]
+        user_skills = {normalize_skill(skill) for skill in user_profile.get('skills', [])}
+        job_skills = [skill for skill in job.skills_required or [] if normalize_skill(skill)]
+        matching = [skill for skill in job_skills if normalize_skill(skill) in user_skills]
+        missing = [skill for skill in job_skills if normalize_skill(skill) not in user_skills]
+
+        score = int(round(float(factors['score'][index])))
+        skill_fit = int(round(float(factors['skills'][index]) * 100))
+        experience_fit = float(factors['experience'][index])
+        location_fit = float(factors['location'][index])
+
+        return {
+            "match_percentage": score,
+            "match_level": "High" if score >= 80 else "Medium" if score >= 60 else "Low",
+            "skill_match": {
+                "matching_skills": matching,
+                "missing_skills": missing,
+                "skill_match_percentage": skill_fit
+            },
+            "experience_match": {
+                "meets_requirements": experience_fit >= 0.75,
+                "experience_gap": self._experience_gap(index, user_profile),
+                "experience_feedback": "Estimated from experience level"
+            },
+            "location_match": {
+                "location_compatible": location_fit >= 0.75,
+                "remote_compatible": bool(job.is_remote),
+                "location_feedback": "Remote work available" if job.is_remote else f"Based in {job.location}"
+            },
+            "strengths": [f"Matches {len(matching)} of {len(job_skills)} required skills"] if matching else [],
+            "concerns": [f"Missing skills: {', '.join(missing[:5])}"] if missing else [],
+            "recommendations": [],
+            "application_tips": [],
+            "fit_score": {
+                "technical_fit": skill_fit,
+                "cultural_fit": 70,
+                "growth_potential": 75,
+                "overall_fit": score
+            },
+            "analysis_source": "local"
+        }
+
+    def _skill_fit(self, user_profile: Dict[str, Any]) -> np.ndarray:
+        fit = self.skill_index.skill_fit(user_profile.get('skills', []), self.job_ids)
+        # Only a job removed from the index mid-request is missing; treat it as neutral
+        return np.nan_to_num(fit, nan=0.5)
+
+    def _semantic_fit(self, profile_vector: np.ndarray) -> np.ndarray:
+        similarity = self.semantic_index.similarities(profile_vector, self.job_ids)
+        # Word-vector averages rarely fall below the floor, so rescale from it rather than from 0
+        floor = settings.JOB_SEMANTIC_MIN_SIMILARITY
+        fit = np.clip((similarity - floor) / (1.0 - floor), 0, 1)
+        # Jobs not embedded yet are neutral
+        return np.nan_to_num(fit, nan=0.5).astype(np.float32)
+
+    def _experience_fit(self, user_profile: Dict[str, Any]) -> np.ndarray:
+        user_rank = EXPERIENCE_RANKS.get(user_profile.get('experience_level', 'entry'), 0)
+        gap = user_rank - self.experience
+        # Under-qualified costs more than over-qualified
+        fit = np.where(gap >= 0, 1.0 - 0.15 * np.maximum(gap - 1, 0), 1.0 + 0.4 * gap)
+        fit = np.where(np.isnan(self.experience), 0.75, fit)
+        return np.clip(fit, 0, 1).astype(np.float32)
+
+    def _location_fit(self, user_profile: Dict[str, Any]) -> np.ndarray:
+        prefers_remote = user_profile.get('remote_work_preference', True)
+        city = (user_profile.get('location') or '').split(',')[0].strip().lower()
+        if city:
+            same_place = np.char.find(self.locations, city) >= 0
+            onsite_fit = np.where(same_place, 1.0, 0.3)
+        else:
+            onsite_fit = np.full(len(self.jobs), 0.6)
+        coordinates = user_profile.get('coordinates')
+        if coordinates:
+            # Commutable jobs stay close to 1 and fall towards 0.3 over a few JOB_GEO_DISTANCE_SCALE_KM
+            distance = haversine_km(coordinates[0], coordinates[1], self.latitude, self.longitude)
+            distance_fit = 0.3 + 0.7 * np.exp(-distance / settings.JOB_GEO_DISTANCE_SCALE_KM)
+            # Jobs whose location names no known place keep the text match
+            onsite_fit = np.where(np.isnan(distance), onsite_fit, distance_fit)
+        fit = np.where(self.is_remote, 1.0 if prefers_remote else 0.8, onsite_fit)
+        return fit.astype(np.float32)
+
+    def _salary_fit(self, user_profile: Dict[str, Any]) -> np.ndarray:
+        expectation = user_profile.get('salary_expectation')
+        if not expectation:
+            return np.full(len(self.jobs), 0.7, dtype=np.float32)
+        shortfall = (expectation - self.salary_max) / expectation
+        fit = np.where(shortfall <= 0, 1.0, 1.0 - 2.0 * shortfall)
+        # Unstated salaries are neither a plus nor a disqualifier
+        fit = np.where(np.isnan(self.salary_max), 0.7, fit)
+        return np.clip(fit, 0, 1).astype(np.float32)
+
+    def _experience_gap(self, index: int, user_profile: Dict[str, Any]) -> int:
+        required = self.experience[index]
+        if np.isnan(required):
+            return 0
+        user_rank = EXPERIENCE_RANKS.get(user_profile.get('experience_level', 'entry'), 0)
+        return int(max(required - user_rank, 0))
+
@@ -0,0 +1,144 @@
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import F, Q
+from typing import Dict, List, Any, Optional
+from core.geo import bounding_box, distance_expression
+from .models import JobListing
+
+
+def search_listings(queryset, query: str):
+    """
+    Filter job listings to those matching a free-text query, most relevant first
+
+    On PostgreSQL this uses the weighted, GIN-indexed search_vector with
+    websearch syntax ("quoted phrases", -exclusions, OR) and ranks by
+    SearchRank. Other databases (tests, local SQLite) fall back to
+    case-insensitive substring matching over the same fields.
+    """
+    if not query:
+        return queryset
+
+    if connections[queryset.db].vendor == 'postgresql':
+        search_query = SearchQuery(query, search_type='websearch', config=settings.JOB_SEARCH_CONFIG)
+        return queryset.filter(search_vector=search_query).annotate(
+            search_rank=SearchRank(F('search_vector'), search_query)
+        ).order_by('-search_rank', '-posted_date', '-id')
+
+    return queryset.filter(
+        Q(title__icontains=query) | Q(company__icontains=query) |
+        Q(description__icontains=query) | Q(requirements__icontains=query)
+    )
+
+
+def filter_near(queryset, latitude: float, longitude: float, radius_km: float, location: str = ''):
+    """
+    Listings within radius_km of a point, annotated with their distance_km
+
+    The bounding box is a range scan of the (latitude, longitude) index;
+    only rows inside it get the exact great-circle distance. Listings whose
+    location names no gazetteer place still match location as a substring.
+    """
+    min_latitude, max_latitude, min_longitude, max_longitude = bounding_box(latitude, longitude, radius_km)
+    queryset = queryset.annotate(distance_km=distance_expression(latitude, longitude))
+    nearby = Q(
+        latitude__range=(min_latitude, max_latitude), longitude__range=(min_longitude, max_longitude),
+        distance_km__lte=radius_km,
+    )
+    if location:
+        nearby |= Q(latitude__isnull=True, location__icontains=location)
+    return queryset.filter(nearby)
+
+
+def filter_listings(queryset, filters: Dict[str, Any]):
+    """
+    Apply the structured search filters (location, near, remote_only,
+    min_salary, employment_type); 'near' is a (latitude, longitude, radius
+    km) circle that replaces substring matching of location
+    """
+    if filters.get('near'):
+        queryset = filter_near(queryset, *filters['near'], location=filters.get('location', ''))
+    elif filters.get('location'):
+        queryset = queryset.filter(location__icontains=filters['location'])
+    if filters.get('remote_only'):
+        queryset = queryset.filter(is_remote=True)
+    if filters.get('min_salary'):
+        queryset = queryset.filter(salary_min__gte=filters['min_salary'])
+    if filters.get('employment_type'):
+        queryset = queryset.filter(employment_type__iexact=filters['employment_type'])
+    return queryset
+
+
+class DatabaseSearchBackend:
+    """Search in the database: PostgreSQL full-text search, substring matching elsewhere"""
+
+    def search(self, queryset, query: str, filters: Optional[Dict[str, Any]] = None,
+               limit: int = 20) -> List[JobListing]:
+        """
+        Matching job listings from the queryset, most relevant first
+
+        Args:
+            queryset: Job listings to search
+            query: Free-text query; empty matches everything
+            filters: Structured filters, see filter_listings
+            limit: Maximum number of listings to return
+        """
+        queryset = filter_listings(search_listings(queryset, query), filters or {})
+        return list(queryset[:limit])
+
+
+class BM25SearchBackend:
+    """
+    Search with the worker's in-process BM25 index (jobs.bm25)
+
+    The index ranks and filters job ids in memory; only the winning rows
+    are fetched. Queries without text have nothing to rank and go to the
+    database backend.
+    """
+
+    def search(self, queryset, query: str, filters: Optional[Dict[str, Any]] = None,
+               limit: int = 20) -> List[JobListing]:
+        from .bm25 import get_search_index
+
+        if not query.strip():
+            return DatabaseSearchBackend().search(queryset, query, filters, limit)
+
+        job_ids = get_search_index().search(query, filters, limit)
+        # The queryset still applies, so jobs deactivated since the last index sync drop out
+        jobs = queryset.in_bulk(job_ids)
+        return [jobs[job_id] for job_id in job_ids if job_id in jobs]
+
+
+def add_semantic_matches(jobs: List[JobListing], queryset, query: str, filters: Dict[str, Any],
+                         limit: int) -> List[JobListing]:
+    """
+    Append the listings nearest the query's embedding (jobs.semantic) to
+    keyword search results, up to limit listings in all
+
+    Neighbours must reach JOB_SEMANTIC_MIN_SIMILARITY and pass the queryset
+    and filters like the keyword hits.
+    """
+    from .semantic import embed_query, get_semantic_index
+
+    vector = embed_query(query) if query.strip() else None
+    if vector is None or len(jobs) >= limit:
+        return jobs
+
+    seen = {job.id for job in jobs}
+    neighbours = get_semantic_index().search(
+        vector, settings.JOB_SEMANTIC_CANDIDATES, settings.JOB_SEMANTIC_MIN_SIMILARITY
+    )
+    job_ids = [job_id for job_id, _ in neighbours if job_id not in seen][:limit - len(jobs)]
+    found = filter_listings(queryset.filter(id__in=job_ids), filters).in_bulk()
+    return jobs + [found[job_id] for job_id in job_ids if job_id in found]
+
+
+SEARCH_BACKENDS = {
+    'database': DatabaseSearchBackend,
+    'bm25': BM25SearchBackend,
+}
+
+
+def get_search_backend():
+    """The job search backend selected by JOB_SEARCH_BACKEND"""
+    return SEARCH_BACKENDS[settings.JOB_SEARCH_BACKEND]()
@@ -0,0 +1,560 @@
+import functools
+import os
+import threading
+import time
+import logging
+import numpy as np
+from array import array
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from typing import Dict, List, Any, Optional, Tuple
+from .bm25 import field_text
+from .feature_store import Column, RowMap, open_published_store, published_version
+
+logger = logging.getLogger(__name__)
+
+# Embedded text slots; a profile fills the same slots as a listing so both land in one space
+EMBEDDED_FIELDS = ('title', 'skills_required', 'description')
+LISTING_FIELDS = EMBEDDED_FIELDS + ('id', 'is_active', 'canonical')
+
+# k-means over at most this many sampled vectors per centroid
+TRAIN_SAMPLE_PER_LIST = 64
+TRAIN_ITERATIONS = 10
+# Rows assigned to centroids per matrix product
+ASSIGN_CHUNK = 8192
+
+
+@functools.lru_cache(maxsize=1)
+def get_language():
+    """
+    The spaCy pipeline whose static word vectors embed text
+
+    Only its tokenizer and vector table are used, so no pipeline
+    component ever runs.
+    """
+    import spacy
+
+    try:
+        nlp = spacy.load(settings.JOB_EMBEDDING_MODEL)
+    except OSError as e:
+        raise ImproperlyConfigured(
+            f"spaCy model '{settings.JOB_EMBEDDING_MODEL}' is not installed; "
+            f"run: python -m spacy download {settings.JOB_EMBEDDING_MODEL}"
+        ) from e
+    if not nlp.vocab.vectors.shape[0]:
+        raise ImproperlyConfigured(f"spaCy model '{settings.JOB_EMBEDDING_MODEL}' has no word vectors")
+    return nlp
+
+
+def embed_texts(texts: List[str]) -> np.ndarray:
+    """
+    Unit-length mean word vectors, one row per text
+
+    Stop words, punctuation and words without a vector are skipped; a
+    text with no known words gets a zero row.
+    """
+    nlp = get_language()
+    vectors = nlp.vocab.vectors
+    max_chars = settings.JOB_EMBEDDING_MAX_CHARS
+    embedded = np.zeros((len(texts), vectors.shape[1]), dtype=np.float32)
+    docs = nlp.tokenizer.pipe([(text or '')[:max_chars] for text in texts], batch_size=256)
+    for position, doc in enumerate(docs):
+        keys = [token.lower for token in doc if not (token.is_stop or token.is_punct or token.is_space)]
+        if not keys:
+            continue
+        rows = vectors.find(keys=np.array(keys, dtype=np.uint64))
+        rows = rows[rows >= 0]
+        if len(rows):
+            embedded[position] = vectors.data[rows].mean(axis=0)
+    return normalize(embedded)
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def embed_fields(records: List[Dict[str, str]]) -> np.ndarray:
+    """
+    Embed records of EMBEDDED_FIELDS text as the weighted sum of each
+    field's embedding (JOB_EMBEDDING_FIELD_WEIGHTS), so a long description
+    doesn't drown out the title
+    """
+    weights = settings.JOB_EMBEDDING_FIELD_WEIGHTS
+    texts = [record.get(field, '') for record in records for field in EMBEDDED_FIELDS]
+    per_field = embed_texts(texts).reshape(len(records), len(EMBEDDED_FIELDS), -1)
+    field_weights = np.array([weights.get(field, 1.0) for field in EMBEDDED_FIELDS], dtype=np.float32)
+    return normalize(np.einsum('f,nfd->nd', field_weights, per_field))
+
+
+def embed_jobs(jobs: List[Any]) -> np.ndarray:
+    return embed_fields([{field: field_text(job, field) for field in EMBEDDED_FIELDS} for job in jobs])
+
+
+def embed_profile(user) -> Optional[np.ndarray]:
+    """
+    Embedding of a user's profile and latest active resume in the job
+    listing space, or None when none of it has known words
+    """
+    profile = user.profile
+    resume = user.resumes.filter(is_active=True).order_by('-created_at').first()
+    titles = [profile.target_role, profile.current_role]
+    skills = list(profile.skills or []) + list(profile.career_interests or [])
+    summary = [profile.bio, profile.goals]
+    if resume is not None:
+        titles += list(resume.job_titles or [])[:3]
+        skills += list(resume.skills_extracted or [])
+        summary.append(str((resume.parsed_data or {}).get('summary') or ''))
+
+    vector = embed_fields([{
+        'title': ' '.join(title for title in titles if title),
+        'skills_required': ' '.join(str(skill) for skill in skills),
+        'description': ' '.join(text for text in summary if text),
+    }])[0]
+    return vector if vector.any() else None
+
+
+def embed_query(query: str) -> Optional[np.ndarray]:
+    """Embedding of free search text, or None when it has no known words"""
+    vector = embed_texts([query])[0]
+    return vector if vector.any() else None
+
+
+class SemanticIndex:
+    """
+    Approximate nearest-neighbour index over job listing embeddings (IVF).
+
+    Unit vectors are grouped into inverted lists under the nearest of
+    about sqrt(n) spherical k-means centroids; a query scans only the
+    JOB_SEMANTIC_PROBES lists whose centroids are closest to it and
+    compares exact dot products there. Until JOB_SEMANTIC_MIN_TRAIN jobs
+    are indexed every vector is scanned. New jobs join the list of their
+    nearest centroid, and centroids are retrained once the index has
+    doubled since they were trained. Loaded from the feature store, the
+    published vectors are a read-only memory map shared with the other
+    workers; only vectors added since are held in this process.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+        self.synced_at = None
+
+    def _reset(self):
+        self.dimensions = None
+        # Rows below base_size read base_vectors, the rest vectors[row - base_size]
+        self.base_vectors = np.zeros((0, 0), dtype=np.float32)
+        self.base_size = 0
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.row_job_ids = Column(np.int64)
+        self.alive = Column(bool, False)
+        self.assignments = Column(np.int32, -1)
+        self.centroids = None
+        self.lists = []
+        self.trained_size = 0
+        self.rows = {}
+        self.dead = 0
+        self.store_version = None
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, job_id: int):
+        return job_id in self.rows
+
+    def load(self):
+        """(Re)build the index from every active job listing"""
+        from .models import JobListing
+
+        started = timezone.now()
+        start_time = time.time()
+        jobs = JobListing.objects.searchable().only(*LISTING_FIELDS).order_by('id')
+        with self._lock:
+            self._reset()
+            batch = []
+            for job in jobs.iterator(chunk_size=2000):
+                batch.append(job)
+                if len(batch) >= 2000:
+                    self.upsert_jobs(batch)
+                    batch = []
+            self.upsert_jobs(batch)
+            self.train()
+            self.synced_at = started
+        logger.info(f"Built semantic job index: {len(self)} jobs, "
+                    f"{0 if self.centroids is None else len(self.centroids)} lists in {time.time() - start_time:.2f}s")
+
+    def refresh(self):
+        """
+        Catch up with listings changed since the last sync, including bulk
+        writes and other processes that don't reach this worker's signals
+        """
+        from .models import JobListing
+
+        if self.synced_at is None:
+            return self.load()
+
+        started = timezone.now()
+        # Overlap the window slightly so writes committed during the last sync aren't missed
+        since = self.synced_at - timedelta(seconds=settings.JOB_SKILL_INDEX_SYNC_OVERLAP)
+        changed = list(JobListing.objects.filter(updated_at__gte=since).only(*LISTING_FIELDS))
+        self.upsert_jobs([job for job in changed if job.is_active and job.canonical_id is None])
+        for job in changed:
+            if not job.is_active or job.canonical_id is not None:
+                self.remove(job.id)
+
+        active_ids = set(JobListing.objects.searchable().values_list('id', flat=True).iterator())
+        with self._lock:
+            deleted = [job_id for job_id in self.rows if job_id not in active_ids]
+        for job_id in deleted:
+            self.remove(job_id)
+        if len(self) >= settings.JOB_SEMANTIC_MIN_TRAIN and len(self) >= 2 * self.trained_size:
+            self.train()
+        self.synced_at = started
+
+    def upsert_jobs(self, jobs: List[Any]):
+        """Embed and index job listings, replacing any earlier versions of them"""
+        if not jobs:
+            return
+        vectors = embed_jobs(jobs)
+        with self._lock:
+            for job, vector in zip(jobs, vectors):
+                self.upsert(job.id, vector)
+
+    def upsert(self, job_id: int, vector: np.ndarray):
+        """Index one embedding, replacing any earlier one for the job"""
+        with self._lock:
+            if job_id in self.rows:
+                self._remove_row(job_id)
+            if self.dimensions is None:
+                self.dimensions = len(vector)
+                self.vectors = np.zeros((1024, self.dimensions), dtype=np.float32)
+
+            row = self.row_job_ids.size
+            if row - self.base_size == len(self.vectors):
+                self.vectors = np.concatenate([self.vectors, np.zeros_like(self.vectors)])
+            self.vectors[row - self.base_size] = vector
+            self.row_job_ids.append(job_id)
+            self.alive.append(True)
+            if self.centroids is None:
+                self.assignments.append(-1)
+            else:
+                assignment = int(np.argmax(self.centroids @ vector))
+                self.assignments.append(assignment)
+                self.lists[assignment].append(row)
+            self.rows[job_id] = row
+
+    def remove(self, job_id: int):
+        """Drop a job from the index; unknown ids are ignored"""
+        with self._lock:
+            if job_id in self.rows:
+                self._remove_row(job_id)
+                if self.dead > max(settings.JOB_SEMANTIC_COMPACT_RATIO * self.row_job_ids.size,
+                                   settings.JOB_SEMANTIC_COMPACT_MIN):
+                    self.compact()
+
+    def search(self, vector: np.ndarray, limit: int, min_similarity: float = -1.0) -> List[Tuple[int, float]]:
+        """
+        Approximate nearest jobs to an embedding
+
+        Args:
+            vector: Unit-length query embedding
+            limit: Maximum number of jobs to return
+            min_similarity: Cosine similarity a job must reach
+
+        Returns:
+            (job id, cosine similarity) pairs, most similar first
+        """
+        with self._lock:
+            if not self.rows:
+                return []
+            if self.centroids is None:
+                candidates = np.flatnonzero(self.alive.view())
+            else:
+                probes = min(settings.JOB_SEMANTIC_PROBES, len(self.centroids))
+                nearest = np.argpartition(-(self.centroids @ vector), probes - 1)[:probes]
+                candidates = np.concatenate([np.frombuffer(self.lists[int(list_id)], dtype=np.int32)
+                                             for list_id in nearest]).astype(np.int64)
+                candidates = candidates[self.alive.data[candidates]]
+            similarities = self._vectors(candidates) @ vector
+            job_ids = self.row_job_ids.data[candidates]
+
+        keep = similarities >= min_similarity
+        candidates, similarities, job_ids = candidates[keep], similarities[keep], job_ids[keep]
+        if len(candidates) > limit:
+            best = np.argpartition(-similarities, limit - 1)[:limit]
+            similarities, job_ids = similarities[best], job_ids[best]
+        order = np.lexsort((job_ids, -similarities))
+        return [(int(job_ids[position]), float(similarities[position])) for position in order]
+
+    def similarities(self, vector: np.ndarray, job_ids: np.ndarray) -> np.ndarray:
+        """Exact cosine similarity of each job to an embedding; NaN for jobs not indexed"""
+        with self._lock:
+            rows = np.array([self.rows.get(int(job_id), -1) for job_id in job_ids], dtype=np.int64)
+            result = np.full(len(rows), np.nan, dtype=np.float32)
+            known = rows >= 0
+            if known.any():
+                result[known] = self._vectors(rows[known]) @ vector
+        return result
+
+    def train(self):
+        """Fit IVF centroids to the indexed vectors by spherical k-means and rebuild the lists"""
+        with self._lock:
+            live_rows = np.flatnonzero(self.alive.view())
+            if len(live_rows) < settings.JOB_SEMANTIC_MIN_TRAIN:
+                self.centroids = None
+                self.lists = []
+                self.assignments.data[:] = -1
+                self.trained_size = 0
+                return
+
+            start_time = time.time()
+            list_count = settings.JOB_SEMANTIC_LISTS or int(np.sqrt(len(live_rows)))
+            list_count = max(1, min(list_count, len(live_rows)))
+            # Fixed seed: retraining the same catalog gives the same lists in every worker
+            random = np.random.RandomState(0)
+            sample_size = min(len(live_rows), list_count * TRAIN_SAMPLE_PER_LIST)
+            sample = self._vectors(np.sort(random.choice(live_rows, sample_size, replace=False)))
+            centroids = sample[random.choice(sample_size, list_count, replace=False)].copy()
+            for _ in range(TRAIN_ITERATIONS):
+                assignments = np.argmax(sample @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assignments, sample)
+                # An empty list keeps its previous centroid
+                filled = np.bincount(assignments, minlength=list_count) > 0
+                centroids[filled] = normalize(sums[filled])
+            self.centroids = centroids
+            self._assign(live_rows)
+            self.trained_size = len(live_rows)
+        logger.info(f"Trained semantic job index: {list_count} lists over {len(live_rows)} jobs "
+                    f"in {time.time() - start_time:.2f}s")
+
+    def compact(self):
+        """Drop removed rows and rebuild the inverted lists"""
+        with self._lock:
+            live_rows = np.flatnonzero(self.alive.view())
+            state = {
+                'vectors': self._vectors(live_rows),
+                'row_job_ids': self.row_job_ids.view()[live_rows],
+                'assignments': self.assignments.view()[live_rows],
+                'centroids': self.centroids,
+                'trained_size': self.trained_size,
+            }
+            # Still the published version plus later changes, now all held in this process
+            store_version = self.store_version
+            self._reset()
+            self._restore(state)
+            self.store_version = store_version
+
+    def load_store(self, store):
+        """Map a published feature store version; refresh() then catches up with later changes"""
+        model = store.manifest['embedding_model']
+        if model != settings.JOB_EMBEDDING_MODEL:
+            raise ValueError(
+                f"feature store {store.version} embeds with '{model}', not '{settings.JOB_EMBEDDING_MODEL}'"
+            )
+        start_time = time.time()
+        job_ids = store.array('job_ids')
+        centroids = np.array(store.array('centroids'))
+        with self._lock:
+            self._reset()
+            self.base_vectors = store.array('vectors')
+            self.base_size, self.dimensions = self.base_vectors.shape
+            self.vectors = np.zeros((1024, self.dimensions), dtype=np.float32)
+            self.row_job_ids = Column.from_array(np.asarray(job_ids, dtype=np.int64))
+            self.alive = Column.from_array(np.ones(self.base_size, dtype=bool), False)
+            self.assignments = Column.from_array(np.asarray(store.array('assignments'), dtype=np.int32), -1)
+            self.centroids = centroids if len(centroids) else None
+            self.trained_size = store.manifest['trained_size']
+            self.rows = RowMap(job_ids)
+            self._group_lists()
+            self.synced_at = store.synced_at
+            self.store_version = store.version
+        logger.info(f"Mapped semantic job index from feature store {store.version}: {len(self)} jobs "
+                    f"in {time.time() - start_time:.2f}s")
+
+    def store_arrays(self) -> Dict[str, np.ndarray]:
+        """Compacted vectors, list assignments and centroids as feature store arrays"""
+        with self._lock:
+            self.compact()
+            return {
+                'vectors': self.vectors[:self.row_job_ids.size],
+                'assignments': self.assignments.view(),
+                'centroids': self.centroids if self.centroids is not None else np.zeros((0, 0), dtype=np.float32),
+            }
+
+    def save(self, path: str):
+        """Write a compacted snapshot that load_snapshot() can restore without the database or re-embedding"""
+        with self._lock:
+            self.compact()
+            snapshot = {
+                'model': np.array([settings.JOB_EMBEDDING_MODEL]),
+                'vectors': self.vectors[:self.row_job_ids.size],
+                'row_job_ids': self.row_job_ids.view(),
+                'assignments': self.assignments.view(),
+                'centroids': self.centroids if self.centroids is not None else np.zeros((0, 0), dtype=np.float32),
+                'trained_size': np.array([self.trained_size]),
+                'synced_at': np.array([self.synced_at.timestamp() if self.synced_at else 0.0]),
+            }
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        temporary_path = f'{path}.{os.getpid()}.tmp.npz'
+        np.savez(temporary_path, **snapshot)
+        # Readers never see a half-written snapshot
+        os.replace(temporary_path, path)
+
+    def load_snapshot(self, path: str):
+        """Restore a snapshot written by save(); refresh() then catches up with later changes"""
+        start_time = time.time()
+        with np.load(path, allow_pickle=False) as snapshot:
+            model = str(snapshot['model'][0])
+            if model != settings.JOB_EMBEDDING_MODEL:
+                raise ValueError(f"snapshot embeds with '{model}', not '{settings.JOB_EMBEDDING_MODEL}'")
+            centroids = snapshot['centroids']
+            state = {
+                'vectors': snapshot['vectors'],
+                'row_job_ids': snapshot['row_job_ids'],
+                'assignments': snapshot['assignments'],
+                'centroids': centroids if len(centroids) else None,
+                'trained_size': int(snapshot['trained_size'][0]),
+            }
+            synced_at = float(snapshot['synced_at'][0])
+
+        with self._lock:
+            self._reset()
+            self._restore(state)
+            self.synced_at = datetime.fromtimestamp(synced_at, tz=dt_timezone.utc) if synced_at else None
+        logger.info(f"Loaded semantic job index snapshot: {len(self)} jobs in {time.time() - start_time:.2f}s")
+
+    def _restore(self, state: Dict[str, Any]):
+        vectors = np.asarray(state['vectors'], dtype=np.float32)
+        count = len(vectors)
+        if count:
+            self.dimensions = vectors.shape[1]
+            self.vectors = np.concatenate([vectors, np.zeros((max(1024, count), self.dimensions), dtype=np.float32)])
+        self.row_job_ids = Column.from_array(np.asarray(state['row_job_ids'], dtype=np.int64))
+        self.alive = Column.from_array(np.ones(count, dtype=bool), False)
+        self.assignments = Column.from_array(np.asarray(state['assignments'], dtype=np.int32), -1)
+        self.centroids = state['centroids']
+        self.trained_size = state['trained_size']
+        self.rows = {int(job_id): row for row, job_id in enumerate(self.row_job_ids.view())}
+        self._group_lists()
+
+    def _group_lists(self):
+        """Rebuild the inverted lists from the stored assignments in one sort"""
+        self.lists = []
+        if self.centroids is not None:
+            assignments = self.assignments.view()
+            order = np.argsort(assignments, kind='stable').astype(np.int32)
+            bounds = np.searchsorted(assignments[order], np.arange(len(self.centroids) + 1))
+            self.lists = [array('i', order[start:end].tobytes()) for start, end in zip(bounds[:-1], bounds[1:])]
+
+    def _vectors(self, rows: np.ndarray) -> np.ndarray:
+        """Vectors of rows, whether published in the shared base or added since"""
+        if not self.base_size:
+            return self.vectors[rows]
+        in_base = rows < self.base_size
+        if in_base.all():
+            return np.asarray(self.base_vectors[rows])
+        vectors = np.empty((len(rows), self.dimensions), dtype=np.float32)
+        vectors[in_base] = self.base_vectors[rows[in_base]]
+        vectors[~in_base] = self.vectors[rows[~in_base] - self.base_size]
+        return vectors
+
+    def _assign(self, rows: np.ndarray):
+        """Put rows in the list of their nearest centroid, rebuilding every list"""
+        assignments = np.full(self.row_job_ids.size, -1, dtype=np.int32)
+        for start in range(0, len(rows), ASSIGN_CHUNK):
+            chunk = rows[start:start + ASSIGN_CHUNK]
+            assignments[chunk] = np.argmax(self._vectors(chunk) @ self.centroids.T, axis=1)
+        self.assignments.data[:self.row_job_ids.size] = assignments
+        self.lists = [array('i') for _ in range(len(self.centroids))]
+        order = rows[np.argsort(assignments[rows], kind='stable')].astype(np.int32)
+        bounds = np.searchsorted(assignments[order], np.arange(len(self.centroids) + 1))
+        for list_id, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+            self.lists[list_id] = array('i', order[start:end].tobytes())
+
+    def _remove_row(self, job_id: int):
+        row = self.rows.pop(job_id)
+        self.alive.data[row] = False
+        self.dead += 1
+
+
+_semantic_index = None
+_semantic_index_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+
+
+def get_semantic_index() -> SemanticIndex:
+    """Return this worker's semantic index, restoring a snapshot or building it as needed"""
+    global _semantic_index
+
+    if _semantic_index is None:
+        with _semantic_index_lock:
+            if _semantic_index is None:
+                _semantic_index = _build_semantic_index()
+
+    published = published_version() if settings.JOB_FEATURE_STORE_ENABLED else None
+    if published not in (None, _semantic_index.store_version) and _refresh_lock.acquire(blocking=False):
+        # Ingest published a new store version: map it, then swap; requests in flight keep the old index
+        try:
+            _semantic_index = _build_semantic_index()
+        except Exception as e:
+            logger.warning(f"Could not swap semantic job index to feature store {published}: {str(e)}")
+        finally:
+            _refresh_lock.release()
+        return _semantic_index
+
+    age = (timezone.now() - _semantic_index.synced_at).total_seconds()
+    # One thread catches up while the others keep serving the current index
+    if age > settings.JOB_SEMANTIC_REFRESH_INTERVAL and _refresh_lock.acquire(blocking=False):
+        try:
+            _semantic_index.refresh()
+        except Exception as e:
+            logger.warning(f"Semantic job index refresh failed: {str(e)}")
+        finally:
+            _refresh_lock.release()
+    return _semantic_index
+
+
+def _build_semantic_index() -> SemanticIndex:
+    """
+    A catalog index mapped from the published feature store, else restored
+    from its snapshot, else built from the database
+    """
+    index = SemanticIndex()
+    store = open_published_store()
+    if store is not None:
+        try:
+            index.load_store(store)
+            index.refresh()
+            return index
+        except Exception as e:
+            logger.warning(f"Could not map semantic job index from the feature store, loading: {str(e)}")
+
+    path = settings.JOB_SEMANTIC_SNAPSHOT_PATH
+    if path and os.path.exists(path):
+        try:
+            index.load_snapshot(path)
+            index.refresh()
+            return index
+        except Exception as e:
+            logger.warning(f"Could not restore semantic index snapshot, rebuilding: {str(e)}")
+    index.load()
+    return index
+
+
+def loaded_semantic_index() -> Optional[SemanticIndex]:
+    """The semantic index if this worker has built one, without building it"""
+    return _semantic_index
+
+
+def warm_semantic_index():
+    """Restore or build the semantic index at worker start instead of on the first request"""
+    if not settings.JOB_SEMANTIC_ENABLED:
+        return
+    try:
+        get_semantic_index()
+    except Exception as e:
+        logger.warning(f"Could not build semantic job index at startup: {str(e)}")
@@ -0,0 +1,130 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from core.geo import locate
+from core.models import UserProfile
+from .models import JobListing
+from .bm25 import loaded_search_index
+from .dedup import promote_orphaned_duplicates
+from .semantic import loaded_semantic_index
+from .skill_index import loaded_skill_index
+
+# UserProfile fields read by get_user_profile_data; changing any invalidates stored matches
+MATCH_PROFILE_FIELDS = (
+    'skills', 'experience_level', 'career_interests', 'education_level', 'target_role',
+    'location', 'remote_work_preference', 'salary_expectation',
+)
+
+
+@receiver(pre_save, sender=JobListing)
+def locate_job(sender, instance, update_fields=None, **kwargs):
+    """Resolve the listing's location to its gazetteer place and coordinates"""
+    if update_fields is None or 'location' in update_fields:
+        locate(instance)
+
+
+@receiver(post_save, sender=JobListing)
+def index_job_skills(sender, instance, **kwargs):
+    """Update this worker's skill index once the saved listing is committed"""
+    index = loaded_skill_index()
+    if index is None:
+        return
+    if instance.is_active and instance.canonical_id is None:
+        skills = list(instance.skills_required or [])
+        transaction.on_commit(lambda: index.upsert(instance.id, skills))
+    else:
+        transaction.on_commit(lambda: index.remove(instance.id))
+
+
+@receiver(post_delete, sender=JobListing)
+def unindex_job_skills(sender, instance, **kwargs):
+    """Drop a deleted listing from this worker's skill index"""
+    index = loaded_skill_index()
+    if index is not None:
+        job_id = instance.id
+        transaction.on_commit(lambda: index.remove(job_id))
+
+
+@receiver(post_save, sender=JobListing)
+def index_job_text(sender, instance, **kwargs):
+    """Update this worker's BM25 search index once the saved listing is committed"""
+    index = loaded_search_index()
+    if index is None:
+        return
+    if instance.is_active and instance.canonical_id is None:
+        transaction.on_commit(lambda: index.upsert(instance))
+    else:
+        job_id = instance.id
+        transaction.on_commit(lambda: index.remove(job_id))
+
+
+@receiver(post_delete, sender=JobListing)
+def unindex_job_text(sender, instance, **kwargs):
+    """Drop a deleted listing from this worker's BM25 search index"""
+    index = loaded_search_index()
+    if index is not None:
+        job_id = instance.id
+        transaction.on_commit(lambda: index.remove(job_id))
+
+
+@receiver(post_save, sender=JobListing)
+def index_job_embedding(sender, instance, **kwargs):
+    """Embed the saved listing into this worker's semantic index once it is committed"""
+    index = loaded_semantic_index()
+    if index is None:
+        return
+    if instance.is_active and instance.canonical_id is None:
+        transaction.on_commit(lambda: index.upsert_jobs([instance]))
+    else:
+        job_id = instance.id
+        transaction.on_commit(lambda: index.remove(job_id))
+
+
+@receiver(post_delete, sender=JobListing)
+def unindex_job_embedding(sender, instance, **kwargs):
+    """Drop a deleted listing from this worker's semantic index"""
+    index = loaded_semantic_index()
+    if index is not None:
+        job_id = instance.id
+        transaction.on_commit(lambda: index.remove(job_id))
+
+
+@receiver(post_save, sender=JobListing)
+def release_duplicates(sender, instance, **kwargs):
+    """Promote a new canonical listing for the cluster of a listing saved as inactive"""
+    if settings.JOB_DEDUP_ENABLED and not instance.is_active:
+        job_id = instance.id
+        transaction.on_commit(lambda: promote_orphaned_duplicates([job_id]))
+
+
+@receiver(post_save, sender=JobListing)
+def precompute_new_job_matches(sender, instance, created, **kwargs):
+    """Score a new listing against plausible users in the background"""
+    if created and instance.is_active and instance.canonical_id is None:
+        from .tasks import schedule_new_job_matches
+
+        job_id = instance.id
+        transaction.on_commit(lambda: schedule_new_job_matches([job_id]))
+
+
+@receiver(pre_save, sender=UserProfile)
+def detect_match_profile_change(sender, instance, **kwargs):
+    """Note whether a profile save changes any field that feeds job matching"""
+    if not settings.JOB_MATCH_PRECOMPUTE_ENABLED or instance.pk is None:
+        instance._match_fields_changed = False
+        return
+    previous = UserProfile.objects.filter(pk=instance.pk).values(*MATCH_PROFILE_FIELDS).first()
+    instance._match_fields_changed = previous is not None and any(
+        previous[field] != getattr(instance, field) for field in MATCH_PROFILE_FIELDS
+    )
+
+
+@receiver(post_save, sender=UserProfile)
+def precompute_profile_matches(sender, instance, **kwargs):
+    """Re-score the user against the catalog once a match-relevant profile change is committed"""
+    if getattr(instance, '_match_fields_changed', False):
+        from .tasks import schedule_user_rescore
+
+        user_id = instance.user_id
+        transaction.on_commit(lambda: schedule_user_rescore(user_id))
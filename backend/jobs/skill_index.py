@@ -0,0 +1,415 @@
+import threading
+import time
+import logging
+import numpy as np
+from scipy import sparse
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+from .feature_store import RowMap, open_published_store, published_version
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_skill(skill: str) -> str:
+    return ' '.join(str(skill).lower().split())
+
+
+class SkillIndex:
+    """
+    Job x skill incidence matrix over the active catalog, in CSR form.
+
+    Scoring a user's skills against every job is two sparse mat-vecs:
+    rarity-weighted skills the user has, over rarity-weighted skills each
+    job requires. Updates are applied incrementally: removed rows are
+    masked out and new rows collect in a small pending block that is
+    folded back into the main matrix once it grows past a fraction of
+    the catalog. Loaded from the feature store, the main matrix and job ids
+    are read-only memory maps shared with the other workers until the
+    first compaction.
+    """
+
+    def __init__(self):
+        self.vocabulary = {}
+        self.document_frequency = np.zeros(0, dtype=np.int64)
+        self.matrix = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self.row_job_ids = np.zeros(0, dtype=np.int64)
+        self.alive = np.zeros(0, dtype=bool)
+        # Rows added since the last compaction: (job id, columns, alive)
+        self.pending = []
+        self.rows = {}
+        self.dead = 0
+        self.version = 0
+        self.synced_at = None
+        self.store_version = None
+        self._weights = None
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_jobs(cls, jobs: Iterable[Any]) -> 'SkillIndex':
+        """Build an index over job listings already in memory"""
+        return cls.from_rows((job.id, job.skills_required) for job in jobs)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[int, Optional[List[str]]]]) -> 'SkillIndex':
+        """Build an index over (job id, skills) pairs"""
+        index = cls()
+        index._load(rows)
+        return index
+
+    def load(self):
+        """(Re)build the index from every active job listing"""
+        from .models import JobListing
+
+        started = timezone.now()
+        start_time = time.time()
+        rows = JobListing.objects.searchable().values_list('id', 'skills_required')
+        self._load(rows.iterator(chunk_size=2000))
+        self.synced_at = started
+        logger.info(f"Built job skill index: {len(self)} jobs, {len(self.vocabulary)} skills "
+                    f"in {time.time() - start_time:.2f}s")
+
+    def load_store(self, store):
+        """Map a published feature store version; refresh() then catches up with later changes"""
+        start_time = time.time()
+        job_ids = store.array('job_ids')
+        vocabulary = store.manifest['skills']
+        # No copies: scipy keeps arrays that already have matching index dtypes
+        matrix = sparse.csr_matrix(
+            (store.array('skill_data'), store.array('skill_indices'), store.array('skill_indptr')),
+            shape=(len(job_ids), len(vocabulary)), copy=False,
+        )
+        with self._lock:
+            self.vocabulary = {name: column for column, name in enumerate(vocabulary)}
+            self.matrix = matrix
+            self.document_frequency = np.bincount(matrix.indices, minlength=len(vocabulary)).astype(np.int64)
+            self.row_job_ids = job_ids
+            self.alive = np.ones(len(job_ids), dtype=bool)
+            self.rows = RowMap(job_ids)
+            self.pending = []
+            self.dead = 0
+            self._changed(compact=False)
+            self.synced_at = store.synced_at
+            self.store_version = store.version
+        logger.info(f"Mapped job skill index from feature store {store.version}: {len(self)} jobs "
+                    f"in {time.time() - start_time:.2f}s")
+
+    def store_arrays(self) -> Dict[str, np.ndarray]:
+        """The compacted matrix as feature store arrays, rows in job id order as built"""
+        with self._lock:
+            if self.pending or self.dead:
+                self.compact()
+            matrix = self.matrix
+        index_dtype = np.int32 if matrix.nnz < np.iinfo(np.int32).max else np.int64
+        return {
+            'skill_indptr': matrix.indptr.astype(index_dtype),
+            'skill_indices': matrix.indices.astype(index_dtype),
+            'skill_data': matrix.data.astype(np.float32),
+        }
+
+    def refresh(self):
+        """
+        Catch up with listings changed since the last sync, including bulk
+        writes and other processes that don't reach this worker's signals
+        """
+        from .models import JobListing
+
+        if self.synced_at is None:
+            return self.load()
+
+        started = timezone.now()
+        # Overlap the window slightly so writes committed during the last sync aren't missed
+        since = self.synced_at - timedelta(seconds=settings.JOB_SKILL_INDEX_SYNC_OVERLAP)
+        changed = JobListing.objects.filter(updated_at__gte=since).values_list(
+            'id', 'skills_required', 'is_active', 'canonical_id'
+        )
+        for job_id, skills, is_active, canonical_id in changed.iterator(chunk_size=2000):
+            if is_active and canonical_id is None:
+                self.upsert(job_id, skills)
+            else:
+                self.remove(job_id)
+
+        active_ids = set(JobListing.objects.searchable().values_list('id', flat=True).iterator())
+        with self._lock:
+            deleted = [job_id for job_id in self.rows if job_id not in active_ids]
+        for job_id in deleted:
+            self.remove(job_id)
+        self.synced_at = started
+
+    def upsert(self, job_id: int, skills: Optional[List[str]]):
+        """Add a job or replace its skills"""
+        with self._lock:
+            if job_id in self.rows:
+                self._remove_row(job_id)
+            columns = self._columns(skills or [], create=True)
+            self.document_frequency[columns] += 1
+            self.rows[job_id] = len(self.row_job_ids) + len(self.pending)
+            self.pending.append((job_id, columns, True))
+            self._changed()
+
+    def remove(self, job_id: int):
+        """Drop a job from the index; unknown ids are ignored"""
+        with self._lock:
+            if job_id in self.rows:
+                self._remove_row(job_id)
+                self._changed()
+
+    def ensure(self, jobs: Iterable[Any]):
+        """Add any of these jobs the index hasn't seen yet"""
+        for job in jobs:
+            if job.id not in self.rows:
+                self.upsert(job.id, job.skills_required)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, job_id: int):
+        return job_id in self.rows
+
+    def skill_fit(self, skills: List[str], job_ids: Optional[Iterable[int]] = None) -> np.ndarray:
+        """
+        Rarity-weighted share of each job's required skills the user has
+
+        Args:
+            skills: The user's skills
+            job_ids: Jobs to return scores for, in order; every indexed row if None
+
+        Returns:
+            Scores in [0, 1]; jobs without listed skills score 0.5 and jobs
+            missing from the index NaN
+        """
+        fit, _, _, rows = self._score(skills)
+        if job_ids is None:
+            return fit
+        positions = np.array([rows.get(int(job_id), -1) for job_id in job_ids], dtype=np.int64)
+        result = np.full(len(positions), np.nan, dtype=np.float32)
+        # Rows added after the snapshot was scored count as unknown
+        known = (positions >= 0) & (positions < len(fit))
+        result[known] = fit[positions[known]]
+        return result
+
+    def top_jobs(self, skills: List[str], k: int) -> List[int]:
+        """Ids of the k jobs that best match the skills, best first; jobs with no overlap are left out"""
+        fit, totals, row_job_ids, _ = self._score(skills)
+        candidates = np.flatnonzero((totals > 0) & (np.nan_to_num(fit, nan=0.0) > 0))
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-fit[candidates], k - 1)[:k]]
+        order = candidates[np.lexsort((candidates, -fit[candidates]))]
+        return [int(job_id) for job_id in row_job_ids[order]]
+
+    def columns(self, skills: List[str]) -> np.ndarray:
+        """Vocabulary columns of these skills; unknown skills are ignored"""
+        with self._lock:
+            return self._columns(skills, create=False)
+
+    def user_fit(self, users: sparse.csr_matrix) -> np.ndarray:
+        """
+        Skill fit of many users against every job at once
+
+        Args:
+            users: users x vocabulary 0/1 matrix with columns from columns()
+
+        Returns:
+            users x rows array of the same fit as skill_fit; jobs without
+            listed skills score 0 here since they say nothing about anyone
+        """
+        with self._lock:
+            if self.pending or self.dead:
+                self.compact()
+            matrix = self.matrix
+            rarity, totals = self._row_weights()
+
+        weighted = users[:, :matrix.shape[1]].multiply(rarity[:matrix.shape[1]]).tocsr()
+        matched = (weighted @ matrix.T).toarray()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(totals > 0, matched / totals, 0.0).astype(np.float32)
+
+    def _score(self, skills: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Dict[int, int]]:
+        """Fit of every row plus the row weights, job ids and id-to-row map it was computed against"""
+        with self._lock:
+            matrix, pending = self.matrix, list(self.pending)
+            rarity, totals = self._row_weights()
+            alive = np.concatenate([self.alive, np.array([row[2] for row in pending], dtype=bool)])
+            row_job_ids = np.concatenate([self.row_job_ids, np.array([row[0] for row in pending], dtype=np.int64)])
+            rows = self.rows
+            user = np.zeros(len(self.vocabulary), dtype=np.float32)
+            user[self._columns(skills, create=False)] = 1.0
+
+        weights = rarity * user
+        matched = np.concatenate([
+            matrix @ weights[:matrix.shape[1]],
+            self._pending_matrix(pending, len(weights)) @ weights,
+        ])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fit = np.where(totals > 0, matched / totals, 0.5).astype(np.float32)
+        fit[~alive] = np.nan
+        return fit, totals, row_job_ids, rows
+
+    def compact(self):
+        """Fold pending rows into the main matrix and drop removed rows"""
+        with self._lock:
+            width = len(self.vocabulary)
+            main = self.matrix[self.alive] if self.matrix.shape[0] else self.matrix
+            main = sparse.csr_matrix((main.data, main.indices, main.indptr), shape=(main.shape[0], width))
+            live_pending = [row for row in self.pending if row[2]]
+            self.matrix = sparse.vstack(
+                [main, self._pending_matrix(live_pending, width)], format='csr', dtype=np.float32
+            )
+            self.row_job_ids = np.concatenate([
+                self.row_job_ids[self.alive], np.array([row[0] for row in live_pending], dtype=np.int64)
+            ])
+            self.alive = np.ones(len(self.row_job_ids), dtype=bool)
+            self.rows = {int(job_id): row for row, job_id in enumerate(self.row_job_ids)}
+            self.pending = []
+            self.dead = 0
+            self._changed(compact=False)
+
+    def _load(self, rows: Iterable[Tuple[int, Optional[List[str]]]]):
+        vocabulary = {}
+        job_ids = []
+        indices = []
+        indptr = [0]
+        for job_id, skills in rows:
+            for name in {normalize_skill(skill) for skill in skills or []}:
+                if name:
+                    indices.append(vocabulary.setdefault(name, len(vocabulary)))
+            job_ids.append(job_id)
+            indptr.append(len(indices))
+
+        matrix = sparse.csr_matrix(
+            (np.ones(len(indices), dtype=np.float32), np.array(indices, dtype=np.int32), np.array(indptr)),
+            shape=(len(job_ids), len(vocabulary)),
+        )
+        matrix.sort_indices()
+        with self._lock:
+            self.vocabulary = vocabulary
+            self.matrix = matrix
+            self.document_frequency = np.bincount(matrix.indices, minlength=len(vocabulary)).astype(np.int64)
+            self.row_job_ids = np.array(job_ids, dtype=np.int64)
+            self.alive = np.ones(len(job_ids), dtype=bool)
+            self.rows = {job_id: row for row, job_id in enumerate(job_ids)}
+            self.pending = []
+            self.dead = 0
+            self._changed(compact=False)
+
+    def _columns(self, skills: List[str], create: bool) -> np.ndarray:
+        columns = set()
+        for skill in skills:
+            name = normalize_skill(skill)
+            if not name:
+                continue
+            column = self.vocabulary.get(name)
+            if column is None and create:
+                column = self.vocabulary[name] = len(self.vocabulary)
+                self.document_frequency = np.append(self.document_frequency, 0)
+            if column is not None:
+                columns.add(column)
+        return np.array(sorted(columns), dtype=np.int64)
+
+    def _remove_row(self, job_id: int):
+        row = self.rows.pop(job_id)
+        base_rows = len(self.row_job_ids)
+        if row < base_rows:
+            self.alive[row] = False
+            columns = self.matrix.indices[self.matrix.indptr[row]:self.matrix.indptr[row + 1]]
+        else:
+            pending_job_id, columns, _ = self.pending[row - base_rows]
+            self.pending[row - base_rows] = (pending_job_id, columns, False)
+        self.document_frequency[columns] -= 1
+        self.dead += 1
+
+    def _changed(self, compact: bool = True):
+        self.version += 1
+        self._weights = None
+        if compact and len(self.pending) + self.dead > max(
+            settings.JOB_SKILL_INDEX_COMPACT_RATIO * len(self.row_job_ids), settings.JOB_SKILL_INDEX_COMPACT_MIN
+        ):
+            self.compact()
+
+    def _row_weights(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Per-skill rarity and each row's total rarity weight, cached until the index changes"""
+        if self._weights is None:
+            live_jobs = len(self.rows)
+            rarity = (np.log((live_jobs + 1) / (self.document_frequency + 1)) + 1.0).astype(np.float32)
+            totals = np.concatenate([
+                self.matrix @ rarity[:self.matrix.shape[1]],
+                self._pending_matrix(self.pending, len(rarity)) @ rarity,
+            ])
+            self._weights = (rarity, totals)
+        return self._weights
+
+    @staticmethod
+    def _pending_matrix(pending: List[tuple], width: int) -> sparse.csr_matrix:
+        indptr = np.cumsum([0] + [len(columns) for _, columns, _ in pending])
+        indices = np.concatenate([columns for _, columns, _ in pending]) if pending else np.zeros(0, dtype=np.int64)
+        return sparse.csr_matrix(
+            (np.ones(len(indices), dtype=np.float32), indices, indptr), shape=(len(pending), width)
+        )
+
+
+_skill_index = None
+_skill_index_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+
+
+def get_skill_index() -> SkillIndex:
+    """Return this worker's catalog skill index, building or catching it up as needed"""
+    global _skill_index
+
+    if _skill_index is None:
+        with _skill_index_lock:
+            if _skill_index is None:
+                _skill_index = _build_skill_index()
+
+    published = published_version() if settings.JOB_FEATURE_STORE_ENABLED else None
+    if published not in (None, _skill_index.store_version) and _refresh_lock.acquire(blocking=False):
+        # Ingest published a new store version: map it, then swap; requests in flight keep the old index
+        try:
+            _skill_index = _build_skill_index()
+        except Exception as e:
+            logger.warning(f"Could not swap job skill index to feature store {published}: {str(e)}")
+        finally:
+            _refresh_lock.release()
+        return _skill_index
+
+    age = (timezone.now() - _skill_index.synced_at).total_seconds()
+    # One thread catches up while the others keep serving the current index
+    if age > settings.JOB_SKILL_INDEX_REFRESH_INTERVAL and _refresh_lock.acquire(blocking=False):
+        try:
+            _skill_index.refresh()
+        except Exception as e:
+            logger.warning(f"Job skill index refresh failed: {str(e)}")
+        finally:
+            _refresh_lock.release()
+    return _skill_index
+
+
+def _build_skill_index() -> SkillIndex:
+    """A catalog index mapped from the published feature store, or loaded from the database"""
+    index = SkillIndex()
+    store = open_published_store()
+    if store is not None:
+        try:
+            index.load_store(store)
+            index.refresh()
+            return index
+        except Exception as e:
+            logger.warning(f"Could not map job skill index from the feature store, loading: {str(e)}")
+    index.load()
+    return index
+
+
+def loaded_skill_index() -> Optional[SkillIndex]:
+    """The skill index if this worker has built one, without building it"""
+    return _skill_index
+
+
+def warm_skill_index():
+    """Build the skill index at worker start instead of on the first request"""
+    if not settings.JOB_SKILL_INDEX_ENABLED:
+        return
+    try:
+        get_skill_index()
+    except Exception as e:
+        logger.warning(f"Could not build job skill index at startup: {str(e)}")
@@ -0,0 +1,196 @@
+import logging
+import numpy as np
+from datetime import timedelta
+from celery import shared_task
+from scipy import sparse
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from typing import List, Iterable, Optional
+from core.models import UserProfile
+from .feature_store import publish_feature_store
+from .ingestion import ingest_all
+from .models import JobListing
+from .match_store import load_matches, profile_hash, save_matches
+from .ranking import JobRanker
+from .skill_index import SkillIndex, get_skill_index
+from .semantic import get_semantic_index
+from .views import JobMatcher, get_candidate_jobs, get_job_match_data, get_profile_vector, get_user_profile_data
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(task, *args, queue: str):
+    """Queue a task without letting an unreachable broker fail the caller"""
+    try:
+        task.apply_async(args=args, queue=queue)
+    except Exception as e:
+        logger.warning(f"Could not queue {task.name}: {str(e)}")
+
+
+def schedule_user_rescore(user_id: int):
+    """Queue re-scoring of a user whose match-relevant profile fields changed"""
+    if settings.JOB_MATCH_PRECOMPUTE_ENABLED:
+        enqueue(rescore_user_matches, user_id, queue=settings.JOB_MATCH_INTERACTIVE_QUEUE)
+
+
+def schedule_new_job_matches(job_ids: List[int]):
+    """Queue scoring of newly ingested jobs against the users they plausibly suit"""
+    if settings.JOB_MATCH_PRECOMPUTE_ENABLED and job_ids:
+        enqueue(score_new_jobs, list(job_ids), queue=settings.JOB_MATCH_BATCH_QUEUE)
+
+
+def _chunks(items: List[int], size: int) -> Iterable[List[int]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+@shared_task(ignore_result=True)
+def rescore_user_matches(user_id: int) -> int:
+    """
+    Re-score a user against the active catalog
+
+    The user's best local candidates (the same ones the list view would
+    send to the LLM, and a margin beyond) that lack a valid stored match
+    are queued for LLM analysis in chunks, best first.
+
+    Returns:
+        Number of jobs queued
+    """
+    user = get_user_model().objects.select_related('profile').filter(id=user_id).first()
+    if user is None:
+        return 0
+
+    user_profile = get_user_profile_data(user)
+    profile_vector = get_profile_vector(user)
+    jobs = get_candidate_jobs(JobListing.objects.searchable(), user_profile, profile_vector)
+    if not jobs:
+        return 0
+
+    ranker = JobRanker(
+        jobs, skill_index=get_skill_index() if settings.JOB_SKILL_INDEX_ENABLED else None,
+        semantic_index=get_semantic_index() if profile_vector is not None else None
+    )
+    order, _ = ranker.top_k(user_profile, settings.JOB_MATCH_PRECOMPUTE_TOP_K, profile_vector)
+    top = [jobs[index] for index in order]
+    stored = load_matches(user, user_profile, [get_job_match_data(job) for job in top])
+    pending = [job.id for job in top if job.id not in stored]
+
+    current_profile = profile_hash(user_profile)
+    for chunk in _chunks(pending, settings.JOB_MATCH_PRECOMPUTE_CHUNK):
+        enqueue(compute_user_job_matches, user_id, chunk, current_profile,
+                queue=settings.JOB_MATCH_INTERACTIVE_QUEUE)
+    logger.info(f"Queued {len(pending)} job matches for user {user_id} ({len(stored)} already current)")
+    return len(pending)
+
+
+@shared_task(ignore_result=True)
+def score_new_jobs(job_ids: List[int]) -> int:
+    """
+    Queue LLM analyses of new jobs for recently active users they plausibly suit
+
+    A user qualifies for a job when their skills cover at least
+    JOB_MATCH_PRECOMPUTE_MIN_SKILL_FIT of its rarity-weighted required
+    skills. Users are scored against the new jobs a block at a time with
+    one sparse product each; each user gets at most
+    JOB_MATCH_PRECOMPUTE_TOP_K new jobs.
+
+    Returns:
+        Number of (user, job) analyses queued
+    """
+    jobs = list(JobListing.objects.searchable().filter(id__in=job_ids))
+    if not jobs:
+        return 0
+
+    job_index = SkillIndex.from_jobs(jobs)
+    active_since = timezone.now() - timedelta(days=settings.JOB_MATCH_PRECOMPUTE_ACTIVE_DAYS)
+    profiles = UserProfile.objects.filter(user__is_active=True, user__last_login__gte=active_since)
+
+    queued = 0
+    block = []
+    for user_id, skills in profiles.values_list('user_id', 'skills').iterator(chunk_size=2000):
+        columns = job_index.columns(skills or [])
+        if len(columns):
+            block.append((user_id, columns))
+        if len(block) >= settings.JOB_MATCH_PRECOMPUTE_USER_BLOCK:
+            queued += _queue_new_job_matches(job_index, block)
+            block = []
+    if block:
+        queued += _queue_new_job_matches(job_index, block)
+
+    logger.info(f"Queued {queued} matches for {len(jobs)} new jobs")
+    return queued
+
+
+def _queue_new_job_matches(job_index: SkillIndex, block: List[tuple]) -> int:
+    """Score one block of (user id, skill columns) against the new jobs and queue the plausible pairs"""
+    indptr = np.cumsum([0] + [len(columns) for _, columns in block])
+    indices = np.concatenate([columns for _, columns in block])
+    users = sparse.csr_matrix(
+        (np.ones(len(indices), dtype=np.float32), indices, indptr),
+        shape=(len(block), len(job_index.vocabulary)),
+    )
+    # users x jobs matrix of rarity-weighted skill fit
+    fit = job_index.user_fit(users)
+
+    queued = 0
+    for row, (user_id, _) in enumerate(block):
+        scores = fit[row]
+        candidates = np.flatnonzero(scores >= settings.JOB_MATCH_PRECOMPUTE_MIN_SKILL_FIT)
+        if not len(candidates):
+            continue
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')][:settings.JOB_MATCH_PRECOMPUTE_TOP_K]
+        job_ids = [int(job_index.row_job_ids[index]) for index in candidates]
+        for chunk in _chunks(job_ids, settings.JOB_MATCH_PRECOMPUTE_CHUNK):
+            enqueue(compute_user_job_matches, user_id, chunk, None, queue=settings.JOB_MATCH_BATCH_QUEUE)
+        queued += len(job_ids)
+    return queued
+
+
+@shared_task(ignore_result=True)
+def ingest_jobs(provider_names: Optional[List[str]] = None) -> int:
+    """
+    Sweep the configured queries against every provider with credentials
+
+    Scheduled by celery beat (CELERY_BEAT_SCHEDULE); runs pick up where
+    the previous one stopped. With JOB_FEATURE_STORE_ENABLED a new feature
+    store version is published for the workers afterwards.
+
+    Returns:
+        Number of listings fetched
+    """
+    listings = sum(result['listings'] for result in ingest_all(provider_names))
+    if settings.JOB_FEATURE_STORE_ENABLED:
+        publish_feature_store()
+    return listings
+
+
+@shared_task(ignore_result=True)
+def compute_user_job_matches(user_id: int, job_ids: List[int], expected_profile_hash: Optional[str] = None) -> int:
+    """
+    LLM-analyse one chunk of jobs for a user and store the results
+
+    Idempotent: jobs that already have a valid stored match are skipped,
+    and the chunk is dropped if the profile changed after it was queued
+    (the newer rescore covers it).
+
+    Returns:
+        Number of analyses stored
+    """
+    user = get_user_model().objects.select_related('profile').filter(id=user_id).first()
+    if user is None:
+        return 0
+
+    user_profile = get_user_profile_data(user)
+    if expected_profile_hash and profile_hash(user_profile) != expected_profile_hash:
+        return 0
+
+    jobs_data = [get_job_match_data(job) for job in JobListing.objects.searchable().filter(id__in=job_ids)]
+    stored = load_matches(user, user_profile, jobs_data)
+    pending = [job_data for job_data in jobs_data if job_data['id'] not in stored]
+    if not pending:
+        return 0
+
+    analyses = JobMatcher().calculate_job_matches(user_profile, pending)
+    # Fallback analyses are not stored, so failed jobs are retried by the next trigger
+    return len(save_matches(user, user_profile, zip(pending, analyses)))
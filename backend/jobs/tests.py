@@ -0,0 +1,466 @@
+import numpy as np
+from datetime import timedelta
+from urllib.parse import parse_qs, urlparse
+from scipy import sparse
+from types import SimpleNamespace
+from unittest import mock
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from core.models import User
+from rest_framework.test import APIClient
+from .dedup import (
+    assign_canonicals, band_buckets, minhash, promote_orphaned_duplicates, shingle_hashes, similarity
+)
+from .ingestion.pipeline import upsert_listings
+from .ingestion.providers import listing_fields
+from .ingestion.streaming import StreamingJSONError, iter_json_array
+from .match_store import save_matches
+from .models import JobApplication, JobListing, JobMatch
+from .ranking import JobRanker, experience_rank
+from .skill_index import SkillIndex
+from .tasks import score_new_jobs
+from .views import JobMatcher, get_job_match_data, get_user_profile_data
+
+
+def make_job(external_id: str, **fields) -> JobListing:
+    values = {
+        'title': 'Python developer', 'company': 'Acme', 'description': 'Build APIs', 'requirements': 'Python',
+        'location': 'Remote', 'experience_level': 'mid', 'skills_required': ['Python', 'Django'],
+        'source': 'test', 'apply_url': 'https://example.com/apply', 'posted_date': timezone.now(),
+    }
+    values.update(fields)
+    return JobListing.objects.create(external_id=external_id, **values)
+
+
+def make_user(email: str, skills=None) -> User:
+    user = User.objects.create_user(email=email, username=email, password='x', first_name='A', last_name='B')
+    user.profile.skills = skills or []
+    user.profile.save()
+    return user
+
+
+class ScoreNewJobsTests(TestCase):
+    def test_queues_recently_logged_in_users_only(self):
+        job = make_job('job-1')
+        active = make_user('active@example.com', ['python', 'django'])
+        make_user('dormant@example.com', ['python', 'django'])
+        User.objects.filter(id=active.id).update(last_login=timezone.now())
+
+        with mock.patch('jobs.tasks.enqueue') as enqueue:
+            queued = score_new_jobs([job.id])
+
+        self.assertEqual(queued, 1)
+        enqueue.assert_called_once()
+        self.assertEqual(enqueue.call_args.args[1:3], (active.id, [job.id]))
+
+
+class JobDetailViewTests(TestCase):
+    def setUp(self):
+        self.user = make_user('ada@example.com', ['python'])
+        self.job = make_job('job-1')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_returns_stored_match_without_new_analysis(self):
+        analysis = {'match_percentage': 91, 'analysis_source': 'gpt-4'}
+        save_matches(self.user, get_user_profile_data(self.user), [(get_job_match_data(self.job), analysis)])
+
+        with mock.patch.object(JobMatcher, 'calculate_job_match') as calculate:
+            response = self.client.get(f'/api/jobs/{self.job.id}/')
+
+        self.assertEqual(response.status_code, 200)
+        calculate.assert_not_called()
+        self.assertEqual(response.data['match_analysis'], analysis)
+        self.assertEqual(response.data['required_skills'], ['Python', 'Django'])
+
+    def test_stores_new_analysis(self):
+        analysis = {'match_percentage': 64, 'analysis_source': 'gpt-4'}
+        with mock.patch.object(JobMatcher, 'calculate_job_match', return_value=analysis):
+            response = self.client.get(f'/api/jobs/{self.job.id}/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['match_analysis'], analysis)
+        self.assertTrue(JobMatch.objects.filter(user=self.user, job=self.job).exists())
+
+
+
+class ApplyToJobTests(TestCase):
+    def setUp(self):
+        self.user = make_user('ada@example.com', ['python'])
+        self.job = make_job('job-1')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_application_takes_stored_match_score(self):
+        analysis = {'match_percentage': 91, 'analysis_source': 'gpt-4'}
+        save_matches(self.user, get_user_profile_data(self.user), [(get_job_match_data(self.job), analysis)])
+
+        response = self.client.post(f'/api/jobs/{self.job.id}/apply/', {'cover_letter': 'Hello'})
+
+        self.assertEqual(response.status_code, 201)
+        application = JobApplication.objects.get(id=response.data['application_id'])
+        self.assertEqual(application.match_score, 91)
+        self.assertEqual(application.cover_letter, 'Hello')
+
+    def test_application_without_stored_match_is_scored_locally(self):
+        response = self.client.post(f'/api/jobs/{self.job.id}/apply/')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertGreater(JobApplication.objects.get(id=response.data['application_id']).match_score, 0)
+        self.assertEqual(self.client.post(f'/api/jobs/{self.job.id}/apply/').status_code, 400)
+
+    def test_application_detail(self):
+        application_id = self.client.post(f'/api/jobs/{self.job.id}/apply/').data['application_id']
+
+        response = self.client.get(f'/api/jobs/applications/{application_id}/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['job']['id'], self.job.id)
+
+POSTING = (
+    'We are hiring a backend engineer to design and build Python services with Django and PostgreSQL, '
+    'own our public REST APIs, mentor junior developers and improve the reliability of our data pipelines.'
+)
+
+
+class DedupTests(TestCase):
+    def setUp(self):
+        self.original = make_job('adzuna-1', description=POSTING)
+        self.copy = make_job('jooble-1', description=POSTING + ' Apply today.')
+        self.other = make_job('careerjet-1', title='Pastry chef', description='Bake bread and croissants daily.')
+        assign_canonicals([self.original.id, self.copy.id, self.other.id])
+
+    def canonical_of(self, job: JobListing):
+        return JobListing.objects.get(id=job.id).canonical_id
+
+    def test_near_duplicates_point_at_earliest_listing(self):
+        self.assertIsNone(self.canonical_of(self.original))
+        self.assertEqual(self.canonical_of(self.copy), self.original.id)
+        self.assertIsNone(self.canonical_of(self.other))
+        self.assertEqual(set(JobListing.objects.searchable().values_list('id', flat=True)),
+                         {self.original.id, self.other.id})
+
+    def test_reclustering_unchanged_listings_keeps_clusters(self):
+        self.assertEqual(assign_canonicals([self.original.id, self.copy.id]), {self.copy.id})
+        self.assertEqual(self.canonical_of(self.copy), self.original.id)
+
+    def test_deactivated_canonical_hands_cluster_to_live_copy(self):
+        original = JobListing.objects.get(id=self.original.id)
+        original.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            original.save()
+
+        self.assertIsNone(self.canonical_of(self.copy))
+        self.assertIn(self.copy.id, JobListing.objects.searchable().values_list('id', flat=True))
+
+    def test_reactivated_canonical_takes_cluster_back(self):
+        JobListing.objects.filter(id=self.original.id).update(is_active=False)
+        self.assertEqual(promote_orphaned_duplicates(), 1)
+        JobListing.objects.filter(id=self.original.id).update(is_active=True)
+
+        assign_canonicals([self.original.id])
+
+        self.assertIsNone(self.canonical_of(self.original))
+        self.assertEqual(self.canonical_of(self.copy), self.original.id)
+
+    def test_later_copy_joins_existing_cluster(self):
+        late = make_job('adzuna-2', description=POSTING + ' Remote friendly.')
+        assign_canonicals([late.id])
+        self.assertEqual(self.canonical_of(late), self.original.id)
+
+
+class MinHashTests(SimpleTestCase):
+    def shingles(self, description: str) -> np.ndarray:
+        return shingle_hashes('Backend engineer', 'Acme', description)
+
+    def test_signature_agreement_estimates_jaccard(self):
+        first, second = self.shingles(POSTING), self.shingles(POSTING + ' We offer equity and a yearly bonus.')
+        first_set, second_set = set(first.tolist()), set(second.tolist())
+        jaccard = len(first_set & second_set) / len(first_set | second_set)
+        self.assertAlmostEqual(similarity(minhash(first), minhash(second)), jaccard, delta=0.15)
+
+    def test_identical_text_shares_every_bucket(self):
+        signature = minhash(self.shingles(POSTING))
+        self.assertEqual(similarity(signature, minhash(self.shingles(POSTING))), 1.0)
+        self.assertEqual(band_buckets(signature), band_buckets(minhash(self.shingles(POSTING))))
+
+    def test_unrelated_text_shares_no_bucket(self):
+        posting = band_buckets(minhash(self.shingles(POSTING)))
+        other = band_buckets(minhash(self.shingles('Bake bread, croissants and cakes every morning for our cafe.')))
+        self.assertEqual(len(posting), 32)
+        self.assertFalse(set(posting) & set(other))
+
+def stub_job(job_id: int, skills=(), **fields) -> SimpleNamespace:
+    values = {
+        'id': job_id, 'skills_required': list(skills), 'experience_level': 'mid', 'is_remote': False,
+        'location': 'Austin, TX', 'latitude': None, 'longitude': None, 'salary_min': None, 'salary_max': None,
+    }
+    values.update(fields)
+    return SimpleNamespace(**values)
+
+
+PROFILE = {
+    'skills': ['Python', 'Django'], 'experience_level': 'mid', 'location': 'Austin, TX',
+    'remote_work_preference': True, 'salary_expectation': None, 'coordinates': None,
+}
+
+
+class JobRankerTests(SimpleTestCase):
+    def test_experience_rank(self):
+        self.assertEqual(experience_rank('Senior Lead'), 2.0)
+        self.assertEqual(experience_rank('entry'), 0.0)
+        self.assertEqual(experience_rank('4 years'), 1.0)
+        self.assertTrue(np.isnan(experience_rank('')))
+
+    def test_skill_overlap_ranks_first(self):
+        jobs = [stub_job(1, ['Java']), stub_job(2, ['Python', 'Django']), stub_job(3, ['Python', 'Go'])]
+        order, factors = JobRanker(jobs).top_k(PROFILE, 2)
+        self.assertEqual([jobs[index].id for index in order], [2, 3])
+        self.assertEqual(factors['skills'][1], 1.0)
+
+    def test_top_k_breaks_ties_by_job_order(self):
+        jobs = [stub_job(job_id, ['Python']) for job_id in range(1, 6)]
+        order, _ = JobRanker(jobs).top_k(PROFILE, 3)
+        self.assertEqual(order.tolist(), [0, 1, 2])
+
+    def test_salary_shortfall_lowers_fit(self):
+        jobs = [stub_job(1, salary_min=50000, salary_max=60000), stub_job(2, salary_min=90000), stub_job(3)]
+        fit = JobRanker(jobs).score(dict(PROFILE, salary_expectation=80000))['salary']
+        self.assertLess(fit[0], fit[2])
+        self.assertEqual(fit[1], 1.0)
+
+    def test_distance_lowers_onsite_fit(self):
+        jobs = [
+            stub_job(1, location='Austin, TX', latitude=30.27, longitude=-97.74),
+            stub_job(2, location='Dallas, TX', latitude=32.78, longitude=-96.80),
+            stub_job(3, location='Remote', is_remote=True),
+        ]
+        fit = JobRanker(jobs).score(dict(PROFILE, coordinates=(30.27, -97.74)))['location']
+        self.assertGreater(fit[0], 0.99)
+        self.assertLess(fit[1], 0.35)
+        self.assertEqual(fit[2], 1.0)
+
+
+class JobRankerPageTests(SimpleTestCase):
+    """Keyset pages over (score desc, job id asc): every job exactly once, ties cut by id"""
+
+    def setUp(self):
+        # Ids out of order and heavy ties, so partition order would differ from id order
+        self.ranker = JobRanker([stub_job(job_id) for job_id in [7, 3, 9, 1, 5, 2, 8, 4, 6]])
+        self.scores = np.array([50, 80, 50, 50, 80, 20, 50, 80, 50], dtype=np.float32)
+
+    def walk(self, size: int):
+        pages, after = [], None
+        while True:
+            order, has_more = self.ranker.page(self.scores, size, after)
+            pages.append([int(self.ranker.job_ids[index]) for index in order])
+            if not has_more:
+                return pages
+            last = order[-1]
+            after = (float(self.scores[last]), int(self.ranker.job_ids[last]))
+
+    def test_pages_cover_every_job_once_in_order(self):
+        for size in (1, 2, 3, 4, 9, 20):
+            flat = [job_id for page in self.walk(size) for job_id in page]
+            self.assertEqual(flat, [3, 4, 5, 1, 6, 7, 8, 9, 2], size)
+
+    def test_last_page_reports_no_more(self):
+        order, has_more = self.ranker.page(self.scores, 9)
+        self.assertEqual(len(order), 9)
+        self.assertFalse(has_more)
+
+
+CATALOG = {
+    1: ['Python', 'Django', 'PostgreSQL'],
+    2: ['Java', 'Spring'],
+    3: ['python', 'React'],
+    4: [],
+    5: ['Go', 'Kubernetes', 'Python'],
+}
+
+
+class SkillIndexTests(SimpleTestCase):
+    """Incremental updates (pending rows, masked removals) score exactly like a fresh build"""
+
+    def assert_same_fit(self, index: SkillIndex, catalog: dict, skills: list):
+        expected = SkillIndex.from_rows(sorted(catalog.items()))
+        job_ids = sorted(catalog)
+        np.testing.assert_allclose(index.skill_fit(skills, job_ids), expected.skill_fit(skills, job_ids), rtol=1e-6)
+
+    def test_skill_fit(self):
+        index = SkillIndex.from_rows(sorted(CATALOG.items()))
+        fit = index.skill_fit(['PYTHON', 'django'], [1, 2, 4, 99])
+        self.assertGreater(fit[0], 0.5)
+        self.assertEqual(fit[1], 0.0)
+        # No listed skills is neutral, an unknown job is NaN
+        self.assertEqual(fit[2], 0.5)
+        self.assertTrue(np.isnan(fit[3]))
+
+    def test_top_jobs_skip_jobs_without_overlap(self):
+        index = SkillIndex.from_rows(sorted(CATALOG.items()))
+        self.assertEqual(index.top_jobs(['Python', 'Django'], 10)[0], 1)
+        self.assertEqual(set(index.top_jobs(['Python', 'Django'], 10)), {1, 3, 5})
+        self.assertEqual(index.top_jobs(['Python'], 1), [3])
+
+    @override_settings(JOB_SKILL_INDEX_COMPACT_MIN=1000)
+    def test_pending_rows_match_fresh_build(self):
+        index = SkillIndex.from_rows(sorted(CATALOG.items()))
+        catalog = dict(CATALOG)
+        index.upsert(6, ['Python', 'Rust'])
+        index.upsert(1, ['Django'])
+        index.remove(2)
+        index.upsert(6, ['Rust'])
+        index.remove(404)
+        catalog.update({6: ['Rust'], 1: ['Django']})
+        del catalog[2]
+
+        self.assertTrue(index.pending)
+        self.assertEqual(len(index), len(catalog))
+        self.assertNotIn(2, index)
+        self.assert_same_fit(index, catalog, ['Python', 'Django', 'Rust'])
+
+        index.compact()
+        self.assertFalse(index.pending)
+        self.assert_same_fit(index, catalog, ['Python', 'Django', 'Rust'])
+        self.assertEqual(index.top_jobs(['Rust'], 5), [6])
+
+    @override_settings(JOB_SKILL_INDEX_COMPACT_MIN=0, JOB_SKILL_INDEX_COMPACT_RATIO=0.0)
+    def test_automatic_compaction(self):
+        index = SkillIndex.from_rows(sorted(CATALOG.items()))
+        index.upsert(6, ['Rust'])
+        index.remove(3)
+        self.assertFalse(index.pending)
+        catalog = {job_id: skills for job_id, skills in CATALOG.items() if job_id != 3}
+        catalog[6] = ['Rust']
+        self.assert_same_fit(index, catalog, ['Python', 'Rust'])
+
+    def test_user_fit_matches_skill_fit(self):
+        index = SkillIndex.from_rows(sorted(CATALOG.items()))
+        index.upsert(6, ['Rust', 'Python'])
+        users = [['Python', 'Django'], ['Rust'], ['Cobol']]
+        columns = [index.columns(skills) for skills in users]
+        indptr = np.cumsum([0] + [len(column) for column in columns])
+        matrix = sparse.csr_matrix(
+            (np.ones(indptr[-1], dtype=np.float32), np.concatenate(columns), indptr),
+            shape=(len(users), len(index.vocabulary)),
+        )
+        fit = index.user_fit(matrix)
+        job_ids = index.row_job_ids.tolist()
+        for row, skills in enumerate(users):
+            expected = index.skill_fit(skills, job_ids)
+            has_skills = np.array([bool(CATALOG.get(job_id, ['Rust'])) for job_id in job_ids])
+            np.testing.assert_allclose(fit[row][has_skills], expected[has_skills], rtol=1e-6)
+
+
+@override_settings(JOB_MATCH_ON_REQUEST=False, JOB_SKILL_INDEX_ENABLED=False, JOB_SEARCH_BACKEND='database')
+class KeysetPaginationTests(TestCase):
+    """Following next links walks every listing once, in order, for both orderings"""
+
+    def setUp(self):
+        self.user = make_user('ada@example.com', ['Python', 'Django'])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        now = timezone.now()
+        skills = [['Python', 'Django'], ['Python'], ['Java'], ['Python', 'Django'], ['Go'], ['Python'], ['Java']]
+        # Shared posting dates and equal match scores, so both orderings fall back to the id
+        self.jobs = [
+            make_job(f'job-{index}', skills_required=job_skills, posted_date=now - timedelta(days=index // 3))
+            for index, job_skills in enumerate(skills)
+        ]
+
+    def walk(self, path: str, params: dict, key: str = 'jobs'):
+        pages, params = [], dict(params)
+        with mock.patch.object(JobMatcher, 'generate_job_recommendations', return_value=[]):
+            while True:
+                response = self.client.get(path, params)
+                self.assertEqual(response.status_code, 200)
+                pages.append([item['id'] for item in response.data[key]])
+                if not response.data['next']:
+                    return pages
+                params['cursor'] = parse_qs(urlparse(response.data['next']).query)['cursor'][0]
+
+    def test_recent_ordering(self):
+        pages = self.walk('/api/jobs/', {'ordering': 'recent', 'page_size': 3})
+        expected = [job.id for job in sorted(self.jobs, key=lambda job: (job.posted_date, job.id), reverse=True)]
+        self.assertEqual([job_id for page in pages for job_id in page], expected)
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+
+    def test_match_ordering(self):
+        pages = self.walk('/api/jobs/', {'page_size': 2})
+        ids = [job_id for page in pages for job_id in page]
+        self.assertEqual(sorted(ids), sorted(job.id for job in self.jobs))
+        # Jobs whose skills the user fully has come first, ties by id
+        self.assertEqual(ids[:4], [self.jobs[index].id for index in (0, 1, 3, 5)])
+
+    def test_search_pages(self):
+        pages = self.walk('/api/jobs/search/', {'q': 'Python', 'page_size': 3}, key='results')
+        ids = [job_id for page in pages for job_id in page]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(set(ids), {job.id for job in self.jobs})
+
+    def test_cursor_of_other_ordering_is_rejected(self):
+        with mock.patch.object(JobMatcher, 'generate_job_recommendations', return_value=[]):
+            first = self.client.get('/api/jobs/', {'ordering': 'recent', 'page_size': 2})
+            cursor = parse_qs(urlparse(first.data['next']).query)['cursor'][0]
+            self.assertEqual(self.client.get('/api/jobs/', {'cursor': cursor}).status_code, 404)
+            self.assertEqual(self.client.get('/api/jobs/', {'cursor': 'not-a-cursor'}).status_code, 404)
+
+
+FEED = (
+    '{"meta": {"results": [0], "note": "skip \\"results\\" here"}, "count": 3,\n'
+    ' "results": [{"id": 1, "title": "C# [senior]", "tags": ["a", "b"]},\n'
+    '   {"id": 2, "title": "Quote \\" and brace }"}, 12345, "tail"], "page": 1}'
+)
+FEED_ITEMS = [{'id': 1, 'title': 'C# [senior]', 'tags': ['a', 'b']}, {'id': 2, 'title': 'Quote " and brace }'}, 12345, 'tail']
+
+
+class StreamingJSONTests(SimpleTestCase):
+    def test_items_match_whole_parse_at_every_split(self):
+        for split in range(len(FEED) + 1):
+            with self.subTest(split=split):
+                self.assertEqual(list(iter_json_array([FEED[:split], FEED[split:]], 'results')), FEED_ITEMS)
+
+    def test_one_character_chunks(self):
+        self.assertEqual(list(iter_json_array(iter(FEED), 'results')), FEED_ITEMS)
+
+    def test_errors(self):
+        with self.assertRaises(StreamingJSONError):
+            list(iter_json_array(['{"meta": {"results": []}}'], 'results'))
+        with self.assertRaises(StreamingJSONError):
+            list(iter_json_array(['{"results": [{"id": 1}, {"id"'], 'results'))
+        with self.assertRaises(StreamingJSONError):
+            list(iter_json_array(['{"results": [1 2]}'], 'results'))
+
+
+def listing(provider_id, title='Python developer', location='Berlin, Germany'):
+    return listing_fields('test', provider_id, title, 'Acme', location, 'Build APIs in Python',
+                          f'https://example.com/{provider_id}', None)
+
+
+class UpsertListingsTests(TestCase):
+    def test_inserts_then_refreshes_on_external_id(self):
+        all_ids, new_ids = upsert_listings([listing(1), listing(2)])
+        self.assertEqual(sorted(all_ids), sorted(new_ids))
+        self.assertEqual(len(new_ids), 2)
+        first = JobListing.objects.get(external_id='test_1')
+        self.assertEqual(first.place_id, 'de-be-berlin')
+
+        all_ids, new_ids = upsert_listings([listing(1, 'Senior Python developer', 'Remote'), listing(3)])
+        refreshed = JobListing.objects.get(external_id='test_1')
+        self.assertEqual(refreshed.id, first.id)
+        self.assertEqual(refreshed.created_at, first.created_at)
+        self.assertEqual(refreshed.title, 'Senior Python developer')
+        self.assertEqual(refreshed.place_id, '')
+        self.assertIsNone(refreshed.latitude)
+        self.assertEqual(new_ids, [JobListing.objects.get(external_id='test_3').id])
+        self.assertIn(first.id, all_ids)
+        self.assertEqual(JobListing.objects.count(), 3)
+
+    def test_last_copy_in_a_batch_wins(self):
+        all_ids, new_ids = upsert_listings([listing(1, 'First title'), listing(1, 'Second title')])
+        self.assertEqual(all_ids, new_ids)
+        self.assertEqual(len(all_ids), 1)
+        self.assertEqual(JobListing.objects.get().title, 'Second title')
+
+    def test_empty_batch(self):
+        self.assertEqual(upsert_listings([]), ([], []))
@@ -3,110 +3,175 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.conf import settings
-import openai
 import json
+import math
 import logging
 import requests
-from typing import Dict, List, Any
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Any, Optional, Tuple
+from core.geo import resolve_location
+from core.llm import get_gateway, PromptTemplate, record_fallback
+from core.llm.prompts import normalize_whitespace
+from core.llm.resilience import remaining_time
 from .models import JobListing, JobApplication
+from .match_store import application_match_score, load_matches, save_matches
+from .pagination import KeysetPagination, MATCH_ORDERING, RECENT_ORDERING
+from .ranking import JobRanker
+from .search import add_semantic_matches, get_search_backend
+from .semantic import embed_profile, get_semantic_index
+from .skill_index import get_skill_index
 
 logger = logging.getLogger(__name__)
 
+EXPERT_RECRUITER = "You are an expert career counselor and recruiter with deep knowledge of job matching and hiring practices."
+
+# Static prefixes first so every call shares a cacheable prompt prefix
+JOB_MATCH_TEMPLATE = PromptTemplate(
+    'job_match',
+    EXPERT_RECRUITER,
+    "Analyze the match between the user profile and job posting in the next message. Calculate a match percentage and provide detailed analysis.",
+    """
+    Provide analysis in JSON format:
+    {
+        "match_percentage": 85,
+        "match_level": "High",
+        "skill_match": {
+            "matching_skills": ["Python", "React"],
+            "missing_skills": ["Docker", "AWS"],
+            "skill_match_percentage": 75
+        },
+        "experience_match": {
+            "meets_requirements": true,
+            "experience_gap": 0,
+            "experience_feedback": "Good match for experience level"
+        },
+        "location_match": {
+            "location_compatible": true,
+            "remote_compatible": true,
+            "location_feedback": "Remote work available"
+        },
+        "strengths": [
+            "Strong technical skills match",
+            "Experience level aligns well"
+        ],
+        "concerns": [
+            "Missing some preferred skills",
+            "Salary range not specified"
+        ],
+        "recommendations": [
+            "Highlight your Python and React experience",
+            "Consider learning Docker before applying"
+        ],
+        "application_tips": [
+            "Emphasize relevant project experience",
+            "Mention willingness to learn new technologies"
+        ],
+        "fit_score": {
+            "technical_fit": 80,
+            "cultural_fit": 75,
+            "growth_potential": 85,
+            "overall_fit": 80
+        }
+    }
+
+    Be realistic and helpful in your assessment.
+    """
+)
+
+JOB_MATCH_BATCH_TEMPLATE = PromptTemplate(
+    'job_match_batch',
+    EXPERT_RECRUITER,
+    "Analyze the match between the user profile and each of the job postings in the next message. For every job, calculate a match percentage and provide detailed analysis.",
+    """
+    Return a JSON array with exactly one object per job, using the job's ID in "job_id":
+    [
+        {
+            "job_id": "123",
+            "match_percentage": 85,
+            "match_level": "High",
+            "skill_match": {
+                "matching_skills": ["Python", "React"],
+                "missing_skills": ["Docker", "AWS"],
+                "skill_match_percentage": 75
+            },
+            "experience_match": {
+                "meets_requirements": true,
+                "experience_gap": 0,
+                "experience_feedback": "Good match for experience level"
+            },
+            "location_match": {
+                "location_compatible": true,
+                "remote_compatible": true,
+                "location_feedback": "Remote work available"
+            },
+            "strengths": ["Strong technical skills match"],
+            "concerns": ["Missing some preferred skills"],
+            "recommendations": ["Highlight your Python and React experience"],
+            "application_tips": ["Emphasize relevant project experience"],
+            "fit_score": {
+                "technical_fit": 80,
+                "cultural_fit": 75,
+                "growth_potential": 85,
+                "overall_fit": 80
+            }
+        }
+    ]
+
+    Be realistic and helpful in your assessment.
+    """
+)
+
+JOB_RECOMMENDATIONS_TEMPLATE = PromptTemplate(
+    'job_recommendations',
+    "You are an expert career counselor who knows the current job market well. Generate realistic job recommendations.",
+    "Based on the user profile in the next message, suggest 5-8 realistic job opportunities that would be a good match.",
+    """
+    Generate job recommendations in JSON format:
+    [
+        {
+    "title": "Software Developer",
+    "company": "TechCorp Inc",
+    "location": "San Francisco, CA",
+    "is_remote": true,
+    "salary_range": "$80,000 - $120,000",
+    "experience_required": "2-4 years",
+    "required_skills": ["Python", "React", "SQL"],
+    "description": "Join our team to build innovative web applications...",
+    "match_percentage": 85,
+    "why_good_match": "Strong alignment with your Python and React skills",
+    "application_deadline": "2024-02-15",
+    "company_size": "50-200 employees",
+    "industry": "Technology"
+        }
+    ]
+
+    Make the recommendations realistic and diverse, covering different companies and slightly different roles within the user's interests.
+    """
+)
+
+
 class JobMatcher:
     """AI-powered job matching engine using OpenAI GPT-4"""
     
     def __init__(self):
-        self.client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
+        self.llm = get_gateway()
     
     def calculate_job_match(self, user_profile: Dict[str, Any], job_data: Dict[str, Any]) -> Dict[str, Any]:
         """Calculate match percentage between user profile and job"""
         try:
-            prompt = f"""
-            Analyze the match between this user profile and job posting. Calculate a match percentage and provide detailed analysis.
-
-            User Profile:
-            - Skills: {user_profile.get('skills', [])}
-            - Experience Level: {user_profile.get('experience_level', 'entry')}
-            - Career Interests: {user_profile.get('career_interests', [])}
-            - Education: {user_profile.get('education_level', 'bachelor')}
-            - Target Role: {user_profile.get('target_role', '')}
-            - Experience Years: {user_profile.get('experience_years', 0)}
-            - Location Preference: {user_profile.get('location', '')}
-            - Remote Work Preference: {user_profile.get('remote_work_preference', True)}
-
-            Job Posting:
-            - Title: {job_data.get('title', '')}
-            - Company: {job_data.get('company', '')}
-            - Description: {job_data.get('description', '')}
-            - Required Skills: {job_data.get('required_skills', [])}
-            - Experience Required: {job_data.get('experience_required', '')}
-            - Location: {job_data.get('location', '')}
-            - Remote: {job_data.get('is_remote', False)}
-            - Salary Range: {job_data.get('salary_range', '')}
-
-            Provide analysis in JSON format:
-            {{
-                "match_percentage": 85,
-                "match_level": "High",
-                "skill_match": {{
-                    "matching_skills": ["Python", "React"],
-                    "missing_skills": ["Docker", "AWS"],
-                    "skill_match_percentage": 75
-                }},
-                "experience_match": {{
-                    "meets_requirements": true,
-                    "experience_gap": 0,
-                    "experience_feedback": "Good match for experience level"
-                }},
-                "location_match": {{
-                    "location_compatible": true,
-                    "remote_compatible": true,
-                    "location_feedback": "Remote work available"
-                }},
-                "strengths": [
-                    "Strong technical skills match",
-                    "Experience level aligns well"
-                ],
-                "concerns": [
-                    "Missing some preferred skills",
-                    "Salary range not specified"
-                ],
-                "recommendations": [
-                    "Highlight your Python and React experience",
-                    "Consider learning Docker before applying"
-                ],
-                "application_tips": [
-                    "Emphasize relevant project experience",
-                    "Mention willingness to learn new technologies"
-                ],
-                "fit_score": {{
-                    "technical_fit": 80,
-                    "cultural_fit": 75,
-                    "growth_potential": 85,
-                    "overall_fit": 80
-                }}
-            }}
-
-            Be realistic and helpful in your assessment.
-            """
+            builder = JOB_MATCH_TEMPLATE.builder()
+            builder.add('profile', self._format_user_profile(user_profile))
+            builder.add('job', f"Job Posting:\n{self._format_job(job_data)}", priority=10, trimmable=True)
+            prompt = builder.build()
             
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert career counselor and recruiter with deep knowledge of job matching and hiring practices."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                max_tokens=2000,
+            response = self.llm.complete(
+                call_site="job_match",
+                messages=JOB_MATCH_TEMPLATE.messages(prompt),
                 temperature=0.5
             )
             
-            response_text = response.choices[0].message.content
+            response_text = response['content']
             
             # Extract JSON from response
             start_idx = response_text.find('{')
@@ -115,6 +180,7 @@ class JobMatcher:
             if start_idx != -1 and end_idx != -1:
                 json_str = response_text[start_idx:end_idx]
                 match_analysis = json.loads(json_str)
+                match_analysis['analysis_source'] = response['model']
                 return match_analysis
             else:
                 return self._get_fallback_match(user_profile, job_data)
@@ -123,8 +189,254 @@ class JobMatcher:
             logger.error(f"Error calculating job match: {str(e)}")
             return self._get_fallback_match(user_profile, job_data)
     
+    def calculate_job_matches_parallel(self, user_profile: Dict[str, Any], jobs_data: List[Dict[str, Any]],
+                                       max_workers: Optional[int] = None,
+                                       deadline: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Score several jobs concurrently against one user profile
+        
+        Args:
+            user_profile: Dictionary containing user's career information
+            jobs_data: Job dictionaries in the shape expected by calculate_job_match
+            max_workers: Maximum number of in-flight LLM calls
+            deadline: Seconds to wait before falling back for unfinished jobs
+            
+        Returns:
+            Match analyses in the same order as jobs_data
+        """
+        return self._map_with_deadline(
+            lambda job_data: self.calculate_job_match(user_profile, job_data),
+            jobs_data,
+            fallback=lambda job_data: self._get_fallback_match(user_profile, job_data),
+            max_workers=max_workers,
+            deadline=deadline
+        )
+    
+    def calculate_job_matches(self, user_profile: Dict[str, Any], jobs_data: List[Dict[str, Any]],
+                              batch_size: Optional[int] = None,
+                              deadline: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Score many jobs with batched prompts that state the user profile once
+        
+        Jobs are packed into batches of at most batch_size (and at most
+        JOB_MATCH_BATCH_MAX_CHARS of job text), batches are scored concurrently,
+        and any job missing from a batch response gets the local fallback.
+        
+        Returns:
+            Match analyses in the same order as jobs_data
+        """
+        batch_size = batch_size or settings.JOB_MATCH_BATCH_SIZE
+        if batch_size <= 1:
+            return self.calculate_job_matches_parallel(user_profile, jobs_data, deadline=deadline)
+        
+        keyed_jobs = [(str(job_data.get('id', index)), job_data) for index, job_data in enumerate(jobs_data)]
+        batches = self._split_into_batches(keyed_jobs, batch_size)
+        batch_results = self._map_with_deadline(
+            lambda batch: self._calculate_batch_match(user_profile, batch),
+            batches,
+            fallback=lambda batch: {},
+            deadline=deadline
+        )
+        
+        matches = {}
+        for batch_result in batch_results:
+            matches.update(batch_result)
+        
+        results = []
+        for job_key, job_data in keyed_jobs:
+            if job_key in matches:
+                results.append(matches[job_key])
+            else:
+                results.append(self._get_fallback_match(user_profile, job_data))
+        return results
+    
+    def rank_and_match(self, user_profile: Dict[str, Any], jobs: List[JobListing], top_k: int,
+                       user=None, page_size: Optional[int] = None,
+                       after: Optional[Tuple[float, int]] = None,
+                       profile_vector=None) -> Tuple[List[tuple], Optional[Tuple[float, int]]]:
+        """
+        Score jobs locally and send only the best top_k of a page to the LLM
+        
+        With a user, stored analyses that are still valid are reused instead
+        of new LLM calls, and new LLM analyses are stored. Only the page's
+        jobs are analysed, so deep pages cost no more than the first.
+        
+        Args:
+            user_profile: Dictionary containing user's career information
+            jobs: Candidate job listings
+            top_k: Number of best local candidates on the page to analyse with the LLM
+            user: Owner of stored matches, if any
+            page_size: Jobs per page; all of them by default
+            after: (score, job id) keyset of the previous page's last job
+            profile_vector: Profile embedding from get_profile_vector, if any
+            
+        Returns:
+            (job, match_analysis) pairs for the page, best local score first,
+            and the keyset of the page's last job when more follow
+        """
+        if not jobs:
+            return [], None
+        
+        ranker = JobRanker(
+            jobs, skill_index=get_skill_index() if settings.JOB_SKILL_INDEX_ENABLED else None,
+            semantic_index=get_semantic_index() if profile_vector is not None else None
+        )
+        factors = ranker.score(user_profile, profile_vector)
+        order, has_more = ranker.page(factors['score'], page_size or len(jobs), after)
+        
+        jobs_data = {int(index): get_job_match_data(jobs[index]) for index in order}
+        stored = load_matches(user, user_profile, jobs_data.values()) if user is not None else {}
+        top = [int(index) for index in order[:top_k] if jobs[index].id not in stored]
+        
+        analyses = dict(zip(top, self.calculate_job_matches(user_profile, [jobs_data[index] for index in top])))
+        if user is not None:
+            save_matches(user, user_profile, [(jobs_data[index], analysis) for index, analysis in analyses.items()])
+        logger.debug(f"Ranked {len(jobs)} jobs locally, {len(order)} on page, {len(stored)} stored matches, "
+                     f"{len(top)} sent for LLM analysis")
+        
+        results = []
+        for index in order:
+            job = jobs[index]
+            if index in analyses:
+                results.append((job, analyses[index]))
+            elif job.id in stored:
+                results.append((job, stored[job.id].analysis))
+            else:
+                results.append((job, ranker.local_match(index, user_profile, factors)))
+        
+        next_key = None
+        if has_more and len(order):
+            last = order[-1]
+            next_key = (float(factors['score'][last]), int(ranker.job_ids[last]))
+        return results, next_key
+    
+    def _split_into_batches(self, keyed_jobs: List[tuple], batch_size: int) -> List[List[tuple]]:
+        """Greedily pack jobs into batches bounded by job count and text size"""
+        max_chars = settings.JOB_MATCH_BATCH_MAX_CHARS
+        batches = []
+        current = []
+        current_chars = 0
+        
+        for job_key, job_data in keyed_jobs:
+            job_chars = len(job_data.get('description', '') or '')
+            if current and (len(current) >= batch_size or current_chars + job_chars > max_chars):
+                batches.append(current)
+                current = []
+                current_chars = 0
+            current.append((job_key, job_data))
+            current_chars += job_chars
+        
+        if current:
+            batches.append(current)
+        return batches
+    
+    def _calculate_batch_match(self, user_profile: Dict[str, Any], batch: List[tuple]) -> Dict[str, Dict[str, Any]]:
+        """Score one batch of jobs in a single completion, keyed by job id"""
+        try:
+            builder = JOB_MATCH_BATCH_TEMPLATE.builder()
+            builder.add('profile', self._format_user_profile(user_profile))
+            builder.add('jobs_header', "Job Postings:")
+            for job_key, job_data in batch:
+                builder.add(f'job_{job_key}', self._format_job(job_data, job_key), priority=10, trimmable=True)
+            prompt = builder.build()
+            
+            response = self.llm.complete(
+                call_site="job_match_batch",
+                messages=JOB_MATCH_BATCH_TEMPLATE.messages(prompt),
+                max_tokens=settings.JOB_MATCH_BATCH_TOKENS_PER_JOB * len(batch),
+                temperature=0.5
+            )
+            
+            response_text = response['content']
+            
+            # Extract JSON array from response
+            start_idx = response_text.find('[')
+            end_idx = response_text.rfind(']') + 1
+            
+            if start_idx == -1 or end_idx == 0:
+                return {}
+            
+            batch_keys = {job_key for job_key, _ in batch}
+            matches = {}
+            for match_analysis in json.loads(response_text[start_idx:end_idx]):
+                if not isinstance(match_analysis, dict):
+                    continue
+                job_key = str(match_analysis.pop('job_id', ''))
+                if job_key in batch_keys:
+                    match_analysis['analysis_source'] = response['model']
+                    matches[job_key] = match_analysis
+            
+            if len(matches) < len(batch):
+                logger.warning(f"Batch job match returned {len(matches)} of {len(batch)} jobs")
+            return matches
+            
+        except Exception as e:
+            logger.error(f"Error calculating batch job match: {str(e)}")
+            return {}
+    
+    def _format_user_profile(self, user_profile: Dict[str, Any]) -> str:
+        """Format the user profile block shared by match prompts"""
+        return f"""
+            User Profile:
+            - Skills: {user_profile.get('skills', [])}
+            - Experience Level: {user_profile.get('experience_level', 'entry')}
+            - Career Interests: {user_profile.get('career_interests', [])}
+            - Education: {user_profile.get('education_level', 'bachelor')}
+            - Target Role: {user_profile.get('target_role', '')}
+            - Experience Years: {user_profile.get('experience_years', 0)}
+            - Location Preference: {user_profile.get('location', '')}
+            - Remote Work Preference: {user_profile.get('remote_work_preference', True)}
+            """
+    
+    def _format_job(self, job_data: Dict[str, Any], job_key: Optional[str] = None) -> str:
+        """Format a job posting for match prompts; the description goes last so trimming cuts it first"""
+        lines = [f"Job ID: {job_key}"] if job_key is not None else []
+        lines += [
+            f"- Title: {job_data.get('title', '')}",
+            f"- Company: {job_data.get('company', '')}",
+            f"- Required Skills: {job_data.get('required_skills', [])}",
+            f"- Experience Required: {job_data.get('experience_required', '')}",
+            f"- Location: {job_data.get('location', '')}",
+            f"- Remote: {job_data.get('is_remote', False)}",
+            f"- Salary Range: {job_data.get('salary_range', '')}",
+            f"- Description: {normalize_whitespace(job_data.get('description', ''))}",
+        ]
+        return "\n".join(lines)
+    
+    def _map_with_deadline(self, func, items: List[Any], fallback,
+                           max_workers: Optional[int] = None,
+                           deadline: Optional[float] = None) -> List[Any]:
+        """Run func over items on a bounded thread pool, using fallback for items that miss the deadline"""
+        if not items:
+            return []
+        
+        max_workers = max_workers or settings.JOB_MATCH_MAX_CONCURRENCY
+        deadline = settings.JOB_MATCH_DEADLINE if deadline is None else deadline
+        remaining = remaining_time()
+        if remaining is not None:
+            deadline = max(min(deadline, remaining), 0)
+        
+        executor = ThreadPoolExecutor(max_workers=min(max_workers, len(items)), thread_name_prefix='job-match')
+        # Each task runs in a copy of the request context so the LLM calls see the request deadline
+        futures = [executor.submit(contextvars.copy_context().run, func, item) for item in items]
+        done, not_done = wait(futures, timeout=deadline)
+        # Don't block the request on stragglers; finished calls still warm the response cache
+        executor.shutdown(wait=False, cancel_futures=True)
+        
+        if not_done:
+            logger.warning(f"Job match deadline of {deadline}s exceeded for {len(not_done)} of {len(futures)} tasks")
+        
+        results = []
+        for future, item in zip(futures, items):
+            if future in done and future.exception() is None:
+                results.append(future.result())
+            else:
+                results.append(fallback(item))
+        return results
+    
     def _get_fallback_match(self, user_profile: Dict[str, Any], job_data: Dict[str, Any]) -> Dict[str, Any]:
         """Provide fallback match calculation when AI fails"""
+        record_fallback('job_match')
         user_skills = set(skill.lower() for skill in user_profile.get('skills', []))
         job_skills = set(skill.lower() for skill in job_data.get('required_skills', []))
         
@@ -162,15 +474,14 @@ class JobMatcher:
                 "cultural_fit": 70,
                 "growth_potential": 75,
                 "overall_fit": int(base_match)
-            }
+            },
+            "analysis_source": "fallback"
         }
     
     def generate_job_recommendations(self, user_profile: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Generate AI-powered job recommendations based on user profile"""
         try:
             prompt = f"""
-            Based on this user profile, suggest 5-8 realistic job opportunities that would be a good match:
-
             User Profile:
             - Skills: {user_profile.get('skills', [])}
             - Experience Level: {user_profile.get('experience_level', 'entry')}
@@ -179,46 +490,15 @@ class JobMatcher:
             - Target Role: {user_profile.get('target_role', '')}
             - Experience Years: {user_profile.get('experience_years', 0)}
             - Remote Work Preference: {user_profile.get('remote_work_preference', True)}
-
-            Generate job recommendations in JSON format:
-            [
-                {{
-                    "title": "Software Developer",
-                    "company": "TechCorp Inc",
-                    "location": "San Francisco, CA",
-                    "is_remote": true,
-                    "salary_range": "$80,000 - $120,000",
-                    "experience_required": "2-4 years",
-                    "required_skills": ["Python", "React", "SQL"],
-                    "description": "Join our team to build innovative web applications...",
-                    "match_percentage": 85,
-                    "why_good_match": "Strong alignment with your Python and React skills",
-                    "application_deadline": "2024-02-15",
-                    "company_size": "50-200 employees",
-                    "industry": "Technology"
-                }}
-            ]
-
-            Make the recommendations realistic and diverse, covering different companies and slightly different roles within the user's interests.
             """
             
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert career counselor who knows the current job market well. Generate realistic job recommendations."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                max_tokens=3000,
+            response = self.llm.complete(
+                call_site="job_recommendations",
+                messages=JOB_RECOMMENDATIONS_TEMPLATE.messages(prompt),
                 temperature=0.7
             )
             
-            response_text = response.choices[0].message.content
+            response_text = response['content']
             
             # Extract JSON from response
             start_idx = response_text.find('[')
@@ -237,6 +517,7 @@ class JobMatcher:
     
     def _get_fallback_recommendations(self, user_profile: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Provide fallback job recommendations when AI fails"""
+        record_fallback('job_recommendations')
         skills = user_profile.get('skills', [])
         experience_level = user_profile.get('experience_level', 'entry')
         
@@ -277,74 +558,176 @@ class JobMatcher:
         return base_recommendations
 
 
+def get_user_profile_data(user) -> Dict[str, Any]:
+    """Build the user profile dictionary consumed by JobMatcher"""
+    return {
+        'skills': user.profile.skills or [],
+        'experience_level': user.profile.experience_level,
+        'career_interests': user.profile.career_interests or [],
+        'education_level': user.profile.education_level,
+        'target_role': user.profile.target_role,
+        'experience_years': 0,  # Could be calculated from resume
+        'location': user.profile.location,
+        'remote_work_preference': user.profile.remote_work_preference,
+        'salary_expectation': user.profile.salary_expectation,
+        # Gazetteer coordinates of location, for distance-aware ranking only
+        'coordinates': get_profile_coordinates(user)
+    }
+
+
+def get_profile_coordinates(user) -> Optional[Tuple[float, float]]:
+    """(latitude, longitude) of the user's profile location, or None when it names no known place"""
+    if user.profile.latitude is None or user.profile.longitude is None:
+        return None
+    return (user.profile.latitude, user.profile.longitude)
+
+
+def get_search_area(user, location: str, radius_km: str) -> Optional[Tuple[float, float, float]]:
+    """
+    (latitude, longitude, radius km) a job search is limited to, or None
+    when location is matched as text only
+
+    A location the gazetteer knows is the centre; with only ?radius_km= the
+    user's profile place is. The radius defaults to JOB_GEO_DEFAULT_RADIUS_KM
+    and is capped at JOB_GEO_MAX_RADIUS_KM.
+    """
+    if location:
+        place = resolve_location(location)
+        centre = (place.latitude, place.longitude) if place else None
+    elif radius_km:
+        centre = get_profile_coordinates(user)
+    else:
+        centre = None
+    if centre is None:
+        return None
+    try:
+        radius = float(radius_km) if radius_km else settings.JOB_GEO_DEFAULT_RADIUS_KM
+    except ValueError:
+        radius = settings.JOB_GEO_DEFAULT_RADIUS_KM
+    if math.isnan(radius):
+        radius = settings.JOB_GEO_DEFAULT_RADIUS_KM
+    return (*centre, min(max(radius, 1.0), settings.JOB_GEO_MAX_RADIUS_KM))
+
+
+def get_profile_vector(user):
+    """Embedding of the user's profile and resume for semantic retrieval, or None when it is off"""
+    if not settings.JOB_SEMANTIC_ENABLED:
+        return None
+    return embed_profile(user)
+
+
+def format_salary_range(job: JobListing) -> str:
+    return f"${job.salary_min} - ${job.salary_max}" if job.salary_min else ""
+
+
+def get_job_match_data(job: JobListing) -> Dict[str, Any]:
+    """Build the job dictionary consumed by JobMatcher"""
+    return {
+        'id': job.id,
+        'title': job.title,
+        'company': job.company,
+        'location': job.location,
+        'is_remote': job.is_remote,
+        'salary_range': format_salary_range(job),
+        'required_skills': job.skills_required or [],
+        'experience_required': job.experience_level,
+        'description': job.description
+    }
+
+
+def get_candidate_jobs(queryset, user_profile: Dict[str, Any], profile_vector=None) -> List[JobListing]:
+    """
+    Jobs worth ranking for a user; past the candidate cap, the best skill
+    matches across the catalog plus the listings nearest the profile embedding
+    """
+    candidate_ids = []
+    if settings.JOB_SKILL_INDEX_ENABLED:
+        skill_index = get_skill_index()
+        if len(skill_index) > settings.JOB_RANK_MAX_CANDIDATES:
+            candidate_ids = skill_index.top_jobs(user_profile['skills'], settings.JOB_RANK_MAX_CANDIDATES)
+    if profile_vector is not None:
+        semantic_index = get_semantic_index()
+        if len(semantic_index) > settings.JOB_RANK_MAX_CANDIDATES:
+            # Related titles without the exact skill names ("ML engineer" for a machine learning profile)
+            neighbours = semantic_index.search(profile_vector, settings.JOB_SEMANTIC_CANDIDATES,
+                                               settings.JOB_SEMANTIC_MIN_SIMILARITY)
+            candidate_ids = list(dict.fromkeys(list(candidate_ids) + [job_id for job_id, _ in neighbours]))
+    if candidate_ids:
+        return list(queryset.filter(id__in=candidate_ids))
+    return list(queryset[:settings.JOB_RANK_MAX_CANDIDATES])
+
+
+def request_top_k(endpoint: str) -> int:
+    """LLM analyses a list endpoint may start while serving a request"""
+    return settings.JOB_MATCH_TOP_K[endpoint] if settings.JOB_MATCH_ON_REQUEST else 0
+
+
 class JobListView(generics.ListAPIView):
     """List available jobs with AI-powered matching"""
     permission_classes = [permissions.IsAuthenticated]
-    queryset = JobListing.objects.filter(is_active=True)
+    queryset = JobListing.objects.searchable()
 
     def list(self, request, *args, **kwargs):
         user = request.user
+        ordering = RECENT_ORDERING if request.query_params.get('ordering') == RECENT_ORDERING else MATCH_ORDERING
+        paginator = KeysetPagination(request, ordering)
         
         # Get user profile data
-        user_profile = {
-            'skills': user.profile.skills or [],
-            'experience_level': user.profile.experience_level,
-            'career_interests': user.profile.career_interests or [],
-            'education_level': user.profile.education_level,
-            'target_role': user.profile.target_role,
-            'experience_years': 0,  # Could be calculated from resume
-            'location': user.profile.location,
-            'remote_work_preference': user.profile.remote_work_preference
-        }
+        user_profile = get_user_profile_data(user)
+        profile_vector = get_profile_vector(user)
         
-        # Get job recommendations using AI
         matcher = JobMatcher()
-        recommendations = matcher.generate_job_recommendations(user_profile)
+        # AI recommendations are not listings and can't be paged; they lead the first page only
+        recommendations = []
+        if paginator.after is None:
+            recommendations = matcher.generate_job_recommendations(user_profile)
         
-        # Get existing job listings
-        queryset = self.get_queryset()
-        job_listings = []
+        if ordering == RECENT_ORDERING:
+            # Newest first, one page straight from the database; only that page is matched
+            jobs, next_key = paginator.paginate_recent(self.get_queryset())
+            matches, _ = matcher.rank_and_match(
+                user_profile, jobs, request_top_k('job_list'), user=user, profile_vector=profile_vector
+            )
+            analyses = {job.id: match_analysis for job, match_analysis in matches}
+            ranked = [(job, analyses[job.id]) for job in jobs]
+        else:
+            # Rank every candidate locally; only the best few on the page get an LLM analysis unless precomputed
+            jobs = get_candidate_jobs(self.get_queryset(), user_profile, profile_vector)
+            ranked, next_key = matcher.rank_and_match(
+                user_profile, jobs, request_top_k('job_list'), user=user,
+                page_size=paginator.page_size, after=paginator.after, profile_vector=profile_vector
+            )
         
-        for job in queryset:
-            job_data = {
-                'title': job.title,
-                'company': job.company,
-                'location': job.location,
-                'is_remote': job.is_remote,
-                'salary_range': f"${job.salary_min} - ${job.salary_max}" if job.salary_min else "",
-                'required_skills': job.required_skills or [],
-                'description': job.description
-            }
-            
-            # Calculate match for existing jobs
-            match_analysis = matcher.calculate_job_match(user_profile, job_data)
-            
+        job_listings = []
+        for job, match_analysis in ranked:
             job_listings.append({
                 'id': job.id,
                 'title': job.title,
                 'company': job.company,
                 'location': job.location,
                 'is_remote': job.is_remote,
-                'salary_range': job_data['salary_range'],
-                'required_skills': job.required_skills,
+                'salary_range': format_salary_range(job),
+                'required_skills': job.skills_required,
                 'description': job.description,
                 'match_percentage': match_analysis.get('match_percentage', 0),
                 'match_analysis': match_analysis,
                 'posted_date': job.created_at,
-                'application_deadline': job.application_deadline
+                'application_deadline': job.expires_date
             })
         
         # Combine AI recommendations with existing listings
         all_jobs = recommendations + job_listings
         
-        # Sort by match percentage
-        all_jobs.sort(key=lambda x: x.get('match_percentage', 0), reverse=True)
+        # Sort the page by match percentage; the cursor follows the ranking order, so pages don't overlap
+        if ordering == MATCH_ORDERING:
+            all_jobs.sort(key=lambda x: x.get('match_percentage', 0), reverse=True)
         
         return Response({
             'jobs': all_jobs,
             'ai_recommendations_count': len(recommendations),
             'database_jobs_count': len(job_listings),
-            'total_count': len(all_jobs)
+            'total_count': len(all_jobs),
+            'next': paginator.get_next_link(next_key)
         })
 
 
@@ -358,30 +741,19 @@ class JobDetailView(generics.RetrieveAPIView):
         user = request.user
         
         # Get user profile data
-        user_profile = {
-            'skills': user.profile.skills or [],
-            'experience_level': user.profile.experience_level,
-            'career_interests': user.profile.career_interests or [],
-            'education_level': user.profile.education_level,
-            'target_role': user.profile.target_role,
-            'experience_years': 0,
-            'location': user.profile.location,
-            'remote_work_preference': user.profile.remote_work_preference
-        }
+        user_profile = get_user_profile_data(user)
         
-        job_data = {
-            'title': job.title,
-            'company': job.company,
-            'location': job.location,
-            'is_remote': job.is_remote,
-            'salary_range': f"${job.salary_min} - ${job.salary_max}" if job.salary_min else "",
-            'required_skills': job.required_skills or [],
-            'description': job.description
-        }
+        job_data = get_job_match_data(job)
         
-        # Calculate detailed match analysis
-        matcher = JobMatcher()
-        match_analysis = matcher.calculate_job_match(user_profile, job_data)
+        # Reuse the stored analysis while neither the profile nor the job has changed
+        stored = load_matches(user, user_profile, [job_data]).get(job.id)
+        if stored is not None:
+            match_analysis = stored.analysis
+        else:
+            # Calculate detailed match analysis
+            matcher = JobMatcher()
+            match_analysis = matcher.calculate_job_match(user_profile, job_data)
+            save_matches(user, user_profile, [(job_data, match_analysis)])
         
         return Response({
             'id': job.id,
@@ -391,13 +763,13 @@ class JobDetailView(generics.RetrieveAPIView):
             'is_remote': job.is_remote,
             'salary_min': job.salary_min,
             'salary_max': job.salary_max,
-            'required_skills': job.required_skills,
-            'preferred_skills': job.preferred_skills,
+            'required_skills': job.skills_required,
             'description': job.description,
             'requirements': job.requirements,
-            'benefits': job.benefits,
-            'company_description': job.company_description,
-            'application_deadline': job.application_deadline,
+            'employment_type': job.employment_type,
+            'experience_level': job.experience_level,
+            'apply_url': job.apply_url,
+            'application_deadline': job.expires_date,
             'created_at': job.created_at,
             'match_analysis': match_analysis,
             'has_applied': JobApplication.objects.filter(user=user, job=job).exists()
@@ -411,67 +783,57 @@ def search_jobs(request):
     user = request.user
     query = request.query_params.get('q', '')
     location = request.query_params.get('location', '')
+    radius_km = request.query_params.get('radius_km', '')
     remote_only = request.query_params.get('remote', '').lower() == 'true'
     min_salary = request.query_params.get('min_salary', '')
+    employment_type = request.query_params.get('employment_type', '')
     skills = request.query_params.get('skills', '').split(',') if request.query_params.get('skills') else []
     
     # Get user profile
-    user_profile = {
-        'skills': user.profile.skills or [],
-        'experience_level': user.profile.experience_level,
-        'career_interests': user.profile.career_interests or [],
-        'education_level': user.profile.education_level,
-        'target_role': user.profile.target_role,
-        'experience_years': 0,
-        'location': user.profile.location,
-        'remote_work_preference': user.profile.remote_work_preference
-    }
-    
-    # Start with base queryset
-    queryset = JobListing.objects.filter(is_active=True)
-    
-    # Apply filters
-    if query:
-        queryset = queryset.filter(title__icontains=query) | queryset.filter(description__icontains=query)
-    
-    if location:
-        queryset = queryset.filter(location__icontains=location)
-    
-    if remote_only:
-        queryset = queryset.filter(is_remote=True)
+    user_profile = get_user_profile_data(user)
     
+    filters = {
+        'location': location,
+        'remote_only': remote_only,
+        'employment_type': employment_type,
+    }
     if min_salary:
         try:
-            min_sal = int(min_salary)
-            queryset = queryset.filter(salary_min__gte=min_sal)
+            filters['min_salary'] = int(min_salary)
         except ValueError:
             pass
+    # Known places match within a radius, so suburbs and other spellings of the city are found too
+    search_area = get_search_area(user, location, radius_km)
+    if search_area:
+        filters['near'] = search_area
     
-    # Process results with AI matching
+    # Most relevant first, so the candidate cap keeps the best hits
+    jobs = get_search_backend().search(
+        JobListing.objects.searchable(), query, filters, settings.JOB_RANK_MAX_CANDIDATES
+    )
+    if settings.JOB_SEMANTIC_ENABLED:
+        # Listings that say the same thing in other words ("machine learning developer" for "ML engineer")
+        jobs = add_semantic_matches(jobs, JobListing.objects.searchable(), query, filters,
+                                    settings.JOB_RANK_MAX_CANDIDATES)
+    
+    # Rank every candidate locally; only the best few on the page get an LLM analysis
+    paginator = KeysetPagination(request, MATCH_ORDERING)
     matcher = JobMatcher()
-    results = []
+    ranked, next_key = matcher.rank_and_match(
+        user_profile, jobs, request_top_k('search_jobs'), user=user,
+        page_size=paginator.page_size, after=paginator.after, profile_vector=get_profile_vector(user)
+    )
     
-    for job in queryset[:20]:  # Limit to 20 results for performance
-        job_data = {
-            'title': job.title,
-            'company': job.company,
-            'location': job.location,
-            'is_remote': job.is_remote,
-            'salary_range': f"${job.salary_min} - ${job.salary_max}" if job.salary_min else "",
-            'required_skills': job.required_skills or [],
-            'description': job.description
-        }
-        
-        match_analysis = matcher.calculate_job_match(user_profile, job_data)
-        
+    results = []
+    for job, match_analysis in ranked:
         results.append({
             'id': job.id,
             'title': job.title,
             'company': job.company,
             'location': job.location,
             'is_remote': job.is_remote,
-            'salary_range': job_data['salary_range'],
-            'required_skills': job.required_skills,
+            'salary_range': format_salary_range(job),
+            'required_skills': job.skills_required,
             'description': job.description[:200] + "..." if len(job.description) > 200 else job.description,
             'match_percentage': match_analysis.get('match_percentage', 0),
             'match_level': match_analysis.get('match_level', 'Low'),
@@ -484,11 +846,14 @@ def search_jobs(request):
     return Response({
         'results': results,
         'count': len(results),
+        'next': paginator.get_next_link(next_key),
         'query': query,
         'filters_applied': {
             'location': location,
+            'radius_km': search_area[2] if search_area else None,
             'remote_only': remote_only,
             'min_salary': min_salary,
+            'employment_type': employment_type,
             'skills': skills
         }
     })
@@ -514,6 +879,7 @@ class ApplicationListView(generics.ListAPIView):
                 'status': app.status,
                 'cover_letter': app.cover_letter,
                 'notes': app.notes,
+                'match_score': app.match_score,
                 'job_id': app.job.id
             })
         
@@ -544,8 +910,7 @@ class ApplicationDetailView(generics.RetrieveUpdateAPIView):
             'applied_date': application.applied_date,
             'status': application.status,
             'cover_letter': application.cover_letter,
-            'notes': application.notes,
-            'resume_used': application.resume.title if application.resume else None
+            'notes': application.notes
         })
 
 
@@ -564,14 +929,13 @@ def apply_to_job(request, job_id):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         cover_letter = request.data.get('cover_letter', '')
-        resume_id = request.data.get('resume_id', None)
         
         # Create application
         application = JobApplication.objects.create(
             user=user,
             job=job,
             cover_letter=cover_letter,
-            resume_id=resume_id if resume_id else None
+            match_score=application_match_score(user, get_user_profile_data(user), job, get_job_match_data(job))
         )
         
         return Response({
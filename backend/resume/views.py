@@ -4,22 +4,145 @@ from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.core.files.storage import default_storage
 from django.conf import settings
-import openai
 import PyPDF2
 import docx
 import json
 import logging
 import re
 from typing import Dict, List, Any
+from core.llm import get_gateway, PromptTemplate, compact_json, record_fallback
+from core.llm.prompts import normalize_whitespace
 from .models import Resume, ResumeAnalysis
 
 logger = logging.getLogger(__name__)
 
+# Static prefixes first so every call shares a cacheable prompt prefix
+RESUME_PARSE_TEMPLATE = PromptTemplate(
+    'resume_parse',
+    "You are an expert resume parser. Extract structured information from resumes and return only valid JSON.",
+    "Analyze the resume text in the next message and extract structured information in JSON format.",
+    """
+    Please extract and return the following information in JSON format:
+    {
+        "personal_info": {
+            "name": "Full Name",
+            "email": "email@example.com",
+            "phone": "phone number",
+            "location": "city, state/country",
+            "linkedin": "linkedin profile url",
+            "portfolio": "portfolio/website url"
+        },
+        "summary": "Professional summary or objective",
+        "experience": [
+            {
+                "title": "Job Title",
+                "company": "Company Name",
+                "duration": "Start Date - End Date",
+                "description": "Job description and achievements",
+                "years": 2.5
+            }
+        ],
+        "education": [
+            {
+                "degree": "Degree Type",
+                "institution": "School Name",
+                "year": "Graduation Year",
+                "gpa": "GPA if mentioned"
+            }
+        ],
+        "skills": [
+            "skill1", "skill2", "skill3"
+        ],
+        "certifications": [
+            "certification1", "certification2"
+        ],
+        "projects": [
+            {
+                "name": "Project Name",
+                "description": "Project description",
+                "technologies": ["tech1", "tech2"]
+            }
+        ],
+        "languages": ["English", "Spanish"],
+        "total_experience_years": 5.5
+    }
+
+    Only return valid JSON. If information is not available, use empty strings or arrays.
+    """
+)
+
+RESUME_ANALYSIS_TEMPLATE = PromptTemplate(
+    'resume_analysis',
+    "You are an expert career counselor and resume reviewer with deep knowledge of hiring practices and ATS systems.",
+    "Analyze the resume data in the next message and provide comprehensive feedback for improvement.",
+    """
+    Please provide analysis in the following JSON format:
+    {
+        "overall_score": 85,
+        "strengths": [
+            "Strong technical skills in relevant technologies",
+            "Good project experience"
+        ],
+        "weaknesses": [
+            "Missing specific achievements with metrics",
+            "Could improve summary section"
+        ],
+        "suggestions": [
+            "Add quantifiable achievements (e.g., 'Increased efficiency by 30%')",
+            "Include more relevant keywords for ATS optimization"
+        ],
+        "missing_sections": [
+            "Professional summary",
+            "Certifications"
+        ],
+        "keyword_optimization": {
+            "current_keywords": ["Python", "React", "SQL"],
+            "suggested_keywords": ["Machine Learning", "Cloud Computing", "Agile"],
+            "ats_score": 75
+        },
+        "formatting_feedback": [
+            "Use consistent date formatting",
+            "Add more white space for readability"
+        ],
+        "experience_analysis": {
+            "total_years": 3.5,
+            "career_progression": "Good upward trajectory",
+            "gaps": "No significant gaps detected"
+        },
+        "skill_match": {
+            "relevant_skills": ["Python", "React"],
+            "missing_skills": ["Docker", "Kubernetes"],
+            "skill_level": "Intermediate"
+        },
+        "next_steps": [
+            "Add portfolio projects showcasing recent work",
+            "Get AWS certification to strengthen cloud skills"
+        ]
+    }
+
+    Focus on actionable, specific feedback that will help improve the resume's effectiveness.
+    """
+)
+
+
 class ResumeAnalyzer:
     """AI-powered resume analyzer using OpenAI GPT-4"""
     
+    # How much each parsed resume field is worth to the analysis prompt
+    RESUME_FIELD_PRIORITIES = {
+        'experience': 90,
+        'skills': 90,
+        'total_experience_years': 90,
+        'summary': 70,
+        'education': 60,
+        'certifications': 50,
+        'projects': 40,
+        'languages': 20,
+        'personal_info': 10,
+    }
+    
     def __init__(self):
-        self.client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
+        self.llm = get_gateway()
     
     def extract_text_from_pdf(self, file_path: str) -> str:
         """Extract text from PDF file"""
@@ -49,77 +172,17 @@ class ResumeAnalyzer:
     def parse_resume_content(self, text: str) -> Dict[str, Any]:
         """Parse resume content using AI to extract structured data"""
         try:
-            prompt = f"""
-            Analyze the following resume text and extract structured information in JSON format:
-
-            Resume Text:
-            {text}
-
-            Please extract and return the following information in JSON format:
-            {{
-                "personal_info": {{
-                    "name": "Full Name",
-                    "email": "email@example.com",
-                    "phone": "phone number",
-                    "location": "city, state/country",
-                    "linkedin": "linkedin profile url",
-                    "portfolio": "portfolio/website url"
-                }},
-                "summary": "Professional summary or objective",
-                "experience": [
-                    {{
-                        "title": "Job Title",
-                        "company": "Company Name",
-                        "duration": "Start Date - End Date",
-                        "description": "Job description and achievements",
-                        "years": 2.5
-                    }}
-                ],
-                "education": [
-                    {{
-                        "degree": "Degree Type",
-                        "institution": "School Name",
-                        "year": "Graduation Year",
-                        "gpa": "GPA if mentioned"
-                    }}
-                ],
-                "skills": [
-                    "skill1", "skill2", "skill3"
-                ],
-                "certifications": [
-                    "certification1", "certification2"
-                ],
-                "projects": [
-                    {{
-                        "name": "Project Name",
-                        "description": "Project description",
-                        "technologies": ["tech1", "tech2"]
-                    }}
-                ],
-                "languages": ["English", "Spanish"],
-                "total_experience_years": 5.5
-            }}
-
-            Only return valid JSON. If information is not available, use empty strings or arrays.
-            """
+            builder = RESUME_PARSE_TEMPLATE.builder()
+            builder.add('resume', f"Resume Text:\n{normalize_whitespace(text)}", priority=10, trimmable=True)
+            prompt = builder.build()
             
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert resume parser. Extract structured information from resumes and return only valid JSON."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                max_tokens=2000,
+            response = self.llm.complete(
+                call_site="resume_parse",
+                messages=RESUME_PARSE_TEMPLATE.messages(prompt),
                 temperature=0.3
             )
             
-            response_text = response.choices[0].message.content
+            response_text = response['content']
             
             # Extract JSON from response
             start_idx = response_text.find('{')
@@ -138,6 +201,7 @@ class ResumeAnalyzer:
     
     def _extract_basic_info(self, text: str) -> Dict[str, Any]:
         """Fallback method to extract basic info using regex"""
+        record_fallback('resume_parse')
         # Basic email extraction
         email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
         emails = re.findall(email_pattern, text)
@@ -175,78 +239,26 @@ class ResumeAnalyzer:
     def analyze_resume(self, parsed_data: Dict[str, Any], target_role: str = "") -> Dict[str, Any]:
         """Analyze resume and provide AI-powered feedback"""
         try:
-            prompt = f"""
-            Analyze this resume data and provide comprehensive feedback for improvement:
-
-            Resume Data:
-            {json.dumps(parsed_data, indent=2)}
-
-            Target Role: {target_role if target_role else "General career advancement"}
-
-            Please provide analysis in the following JSON format:
-            {{
-                "overall_score": 85,
-                "strengths": [
-                    "Strong technical skills in relevant technologies",
-                    "Good project experience"
-                ],
-                "weaknesses": [
-                    "Missing specific achievements with metrics",
-                    "Could improve summary section"
-                ],
-                "suggestions": [
-                    "Add quantifiable achievements (e.g., 'Increased efficiency by 30%')",
-                    "Include more relevant keywords for ATS optimization"
-                ],
-                "missing_sections": [
-                    "Professional summary",
-                    "Certifications"
-                ],
-                "keyword_optimization": {{
-                    "current_keywords": ["Python", "React", "SQL"],
-                    "suggested_keywords": ["Machine Learning", "Cloud Computing", "Agile"],
-                    "ats_score": 75
-                }},
-                "formatting_feedback": [
-                    "Use consistent date formatting",
-                    "Add more white space for readability"
-                ],
-                "experience_analysis": {{
-                    "total_years": 3.5,
-                    "career_progression": "Good upward trajectory",
-                    "gaps": "No significant gaps detected"
-                }},
-                "skill_match": {{
-                    "relevant_skills": ["Python", "React"],
-                    "missing_skills": ["Docker", "Kubernetes"],
-                    "skill_level": "Intermediate"
-                }},
-                "next_steps": [
-                    "Add portfolio projects showcasing recent work",
-                    "Get AWS certification to strengthen cloud skills"
-                ]
-            }}
-
-            Focus on actionable, specific feedback that will help improve the resume's effectiveness.
-            """
+            builder = RESUME_ANALYSIS_TEMPLATE.builder()
+            builder.add('resume_header', "Resume Data:")
+            # Lowest-value resume fields are trimmed first when the budget is tight
+            for field, value in parsed_data.items():
+                builder.add(
+                    f'resume_{field}',
+                    f'"{field}": {compact_json(value)}',
+                    priority=self.RESUME_FIELD_PRIORITIES.get(field, 30),
+                    trimmable=True
+                )
+            builder.add('target_role', f"Target Role: {target_role if target_role else 'General career advancement'}")
+            prompt = builder.build()
             
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert career counselor and resume reviewer with deep knowledge of hiring practices and ATS systems."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                max_tokens=2500,
+            response = self.llm.complete(
+                call_site="resume_analysis",
+                messages=RESUME_ANALYSIS_TEMPLATE.messages(prompt),
                 temperature=0.5
             )
             
-            response_text = response.choices[0].message.content
+            response_text = response['content']
             
             # Extract JSON from response
             start_idx = response_text.find('{')
@@ -265,6 +277,7 @@ class ResumeAnalyzer:
     
     def _get_fallback_analysis(self) -> Dict[str, Any]:
         """Provide fallback analysis when AI fails"""
+        record_fallback('resume_analysis')
         return {
             "overall_score": 70,
             "strengths": [